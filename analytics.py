@@ -0,0 +1,256 @@
+# ============================================================
+# Vectorized reporting over the history (NumPy)
+# The history is turned into typed columns once (records.HistoryColumns,
+# or it already is one with BANK_COMPACT_RECORDS) and copied into NumPy
+# arrays; later calls only add the rows appended since. Every report is
+# then a handful of array operations, no Python loop over the rows:
+#   daily_totals(db, start, end)   per day x action (Deposit/Withdraw/Transfer)
+#   account_turnover(db)           per account money in / out
+#   top_accounts(db, n)            the n busiest accounts by volume
+#   net_flow(db, n)                net transfers between pairs of accounts
+# Amounts are integer piastres (money.py) and are summed as int64, exact.
+# NumPy comes with Streamlit; the headless modules do not import this one.
+# ============================================================
+import calendar
+import threading
+import time
+import numpy as np
+
+from lazy_history import iter_rows
+from records import HistoryColumns
+from stats import DAILY_ACTIONS
+
+DAY = 86400
+
+
+# the arrays a frame keeps, grown together
+FRAME_COLUMNS = (
+    ("action", np.uint8),
+    ("account", np.int64),
+    ("to_account", np.int64),
+    ("amount", np.int64),
+    ("day", np.int64),
+)
+MIN_CAPACITY = 1024
+
+
+class HistoryFrame:
+    def __init__(self, history):
+        self.source = history  # the db["history"] list these arrays mirror
+        # a compact history (BANK_COMPACT_RECORDS) already is the columns
+        self.cols = history if isinstance(history, HistoryColumns) else HistoryColumns()
+        self.size = 0
+        self.buffers = {name: np.empty(0, dtype=dtype) for name, dtype in FRAME_COLUMNS}
+        self.update()
+
+    def update(self):
+        # only the rows appended since the last call are encoded and copied
+        # in; the buffers double when full, so that is amortized O(new rows)
+        cols = self.cols
+        start, n = self.size, len(self.source)
+        if n == start and hasattr(self, "amount"):
+            return
+        if cols is not self.source:
+            cols.extend(iter_rows(self.source, start, n))
+
+        buffers = self.buffers
+        if n > len(buffers["amount"]):
+            capacity = max(n, 2 * len(buffers["amount"]), MIN_CAPACITY)
+            for name, dtype in FRAME_COLUMNS:
+                grown = np.empty(capacity, dtype=dtype)
+                grown[:start] = buffers[name][:start]
+                buffers[name] = grown
+        if n > start:
+            # slicing an array.array copies: the typed columns never keep an
+            # exported buffer, so they can still grow
+            buffers["action"][start:n] = np.frombuffer(cols.action[start:n], dtype=np.uint8)
+            buffers["account"][start:n] = np.frombuffer(cols.account[start:n], dtype=np.int64)
+            buffers["to_account"][start:n] = np.frombuffer(cols.to_account[start:n], dtype=np.int64)
+            buffers["amount"][start:n] = np.frombuffer(cols.amount[start:n], dtype=np.int64)
+            buffers["day"][start:n] = np.frombuffer(cols.time[start:n], dtype=np.int64) // DAY
+        self.size = n
+
+        # views of the first n rows; an earlier view stays valid as rows
+        # are written past it or the buffers are replaced
+        self.action = buffers["action"][:n]
+        self.account = buffers["account"][:n]
+        self.to_account = buffers["to_account"][:n]
+        self.amount = buffers["amount"][:n]
+        self.day = buffers["day"][:n]
+
+    def __len__(self):
+        return len(self.amount)
+
+    def code(self, action):
+        return self.cols.action_codes.get(action, -1)
+
+    def account_id(self, code):
+        return self.cols.account_id(int(code))
+
+
+# one frame per history list (the process normally has a single db);
+# a reload replaces the list, which starts a new frame
+MAX_FRAMES = 4
+_frames = {}
+_frames_lock = threading.Lock()
+
+
+def history_frame(db):
+    history = db["history"]
+    with _frames_lock:
+        frame = _frames.get(id(history))
+        if frame is None or frame.source is not history or len(history) < len(frame):
+            while len(_frames) >= MAX_FRAMES:
+                del _frames[next(iter(_frames))]
+            frame = _frames[id(history)] = HistoryFrame(history)
+        else:
+            frame.update()
+        return frame
+
+
+DENSE_KEYS = 1 << 22
+SPLIT = 1 << 26
+
+
+def group_sum(keys, values):
+    # exact int64 sums per distinct key -> (sorted keys, sums)
+    if not len(keys):
+        return keys[:0], values[:0]
+
+    # small non-negative keys, not much sparser than the rows: np.bincount,
+    # O(n + high). Its float64 sums are made exact by adding the high and
+    # low 26 bits of the amounts separately, as long as neither half can
+    # pass 2**53
+    low, high = int(keys.min()), int(keys.max())
+    n = len(values)
+    if low >= 0 and high < min(DENSE_KEYS, 4 * n + 1024) and n < SPLIT:
+        biggest = int(np.abs(values).max())
+        if n * ((biggest >> 26) + 1) < 2**53:
+            counts = np.bincount(keys, minlength=high + 1)
+            hi = np.bincount(keys, weights=values >> 26, minlength=high + 1)
+            lo = np.bincount(keys, weights=values & (SPLIT - 1), minlength=high + 1)
+            present = np.flatnonzero(counts)
+            sums = hi[present].astype(np.int64) * SPLIT + lo[present].astype(np.int64)
+            return present.astype(keys.dtype), sums
+
+    # anything else: sort once, then reduceat
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    return keys[starts], np.add.reduceat(values[order], starts)
+
+
+def day_number(day):
+    # same clock as HistoryColumns: the time strings read as UTC
+    return calendar.timegm(time.strptime(str(day)[:10], "%Y-%m-%d")) // DAY
+
+
+def day_text(number):
+    return time.strftime("%Y-%m-%d", time.gmtime(int(number) * DAY))
+
+
+# ---------------------------
+# Reports
+# ---------------------------
+def daily_totals(db, start=None, end=None):
+    # {"day": [...], "Deposit": [...], "Withdraw": [...], "Transfer": [...]},
+    # only days with activity, in date order
+    f = history_frame(db)
+    mask = np.ones(len(f), dtype=bool)
+    if start:
+        mask &= f.day >= day_number(start)
+    if end:
+        mask &= f.day <= day_number(end)
+
+    codes = [f.code(a) for a in DAILY_ACTIONS]
+    mask &= np.isin(f.action, codes)
+    days = f.day[mask]
+    actions = f.action[mask].astype(np.int64)
+
+    first = int(days.min()) if len(days) else 0
+    keys, sums = group_sum((days - first) * 256 + actions, f.amount[mask])
+    unique_days = np.unique(keys // 256)
+    out = {"day": [day_text(d + first) for d in unique_days]}
+    row = np.searchsorted(unique_days, keys // 256)
+    for action, code in zip(DAILY_ACTIONS, codes):
+        column = np.zeros(len(unique_days), dtype=np.int64)
+        hit = keys % 256 == code
+        column[row[hit]] = sums[hit]
+        out[action] = column.tolist()
+    return out
+
+
+def account_turnover(db):
+    # per account: money in (create, deposit, transfer received) and out
+    # (withdraw, transfer sent); returns (account codes, inflow, outflow)
+    f = history_frame(db)
+    credit = np.isin(f.action, [f.code("Create"), f.code("Deposit")])
+    debit = f.action == f.code("Withdraw")
+    transfer = f.action == f.code("Transfer")
+
+    in_keys = np.concatenate([f.account[credit], f.to_account[transfer]])
+    in_amounts = np.concatenate([f.amount[credit], f.amount[transfer]])
+    out_keys = np.concatenate([f.account[debit], f.account[transfer]])
+    out_amounts = np.concatenate([f.amount[debit], f.amount[transfer]])
+
+    accounts = np.union1d(in_keys, out_keys)
+    totals = []
+    for keys, amounts in ((in_keys, in_amounts), (out_keys, out_amounts)):
+        column = np.zeros(len(accounts), dtype=np.int64)
+        k, sums = group_sum(keys, amounts)
+        column[np.searchsorted(accounts, k)] = sums
+        totals.append(column)
+    return accounts, totals[0], totals[1]
+
+
+def top_accounts(db, n=10):
+    # [{"account", "in", "out", "volume"}], busiest first
+    f = history_frame(db)
+    accounts, ins, outs = account_turnover(db)
+    volume = ins + outs
+    if len(volume) > n:
+        best = np.argpartition(-volume, n)[:n]
+    else:
+        best = np.arange(len(volume))
+    best = best[np.argsort(-volume[best], kind="stable")]
+    return [
+        {
+            "account": f.account_id(accounts[i]),
+            "in": int(ins[i]),
+            "out": int(outs[i]),
+            "volume": int(volume[i]),
+        }
+        for i in best
+    ]
+
+
+def net_flow(db, n=10):
+    # net transfers per pair of accounts: for (a, b) with a < b, what a
+    # sent b minus what b sent a; the n largest in absolute value
+    f = history_frame(db)
+    transfer = f.action == f.code("Transfer")
+    src, dst, amount = f.account[transfer], f.to_account[transfer], f.amount[transfer]
+
+    low, high = np.minimum(src, dst), np.maximum(src, dst)
+    signed = np.where(src == low, amount, -amount)
+    if not len(signed):
+        return []
+    # number the accounts 0..k-1, then one int key per (low, high) pair
+    ids, rank = np.unique(np.concatenate([low, high]), return_inverse=True)
+    rank = rank.ravel()
+    pair_keys, net = group_sum(rank[: len(low)] * len(ids) + rank[len(low) :], signed)
+
+    if len(net) > n:
+        best = np.argpartition(-np.abs(net), n)[:n]
+    else:
+        best = np.arange(len(net))
+    best = best[np.argsort(-np.abs(net[best]), kind="stable")]
+
+    out = []
+    for i in best:
+        a_rank, b_rank = divmod(int(pair_keys[i]), len(ids))
+        a, b = f.account_id(ids[a_rank]), f.account_id(ids[b_rank])
+        if net[i] < 0:
+            a, b = b, a
+        out.append({"from": a, "to": b, "net": int(abs(net[i]))})
+    return out
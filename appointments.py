@@ -0,0 +1,238 @@
+# ============================================================
+# Branch appointments: slot index, atomic booking, id sequence
+# A slot is (branch, date, time). The store's Database keeps every live
+# slot (a Pending / Approved booking) in a dict, so a conflict check is
+# one lookup and a day's free slots are len(SLOTS) lookups, whatever the
+# number of appointments. reserve_slot does check + id + append under
+# one lock: two sessions booking the same slot at the same moment get
+# one booking and one "already booked".
+# Ids come from meta["next_appointment_id"] (never reused).
+# The same Database keeps field -> positions indexes for the Manage
+# Appointments queue (appointment_page), and status changes go through
+# set_appointment(s)_status so every index stays right.
+# ============================================================
+import threading
+from datetime import datetime
+from itertools import islice
+
+from metrics import timed
+from storage import (
+    ACTIVE_APPOINTMENT_STATUSES,
+    Database,
+    appointment_slot,
+    ensure_appointment_sequence,
+)
+
+BRANCHES = [
+    "Nasr City",
+    "New Cairo",
+    "Heliopolis",
+    "Maadi",
+    "Dokki",
+    "Mohandessin",
+    "6th of October",
+    "Giza",
+    "Alexandria - Smouha",
+    "Alexandria - Miami",
+    "Mansoura",
+    "Tanta",
+]
+SERVICES = [
+    "Open Account",
+    "Deposit / Withdrawal",
+    "Update Data",
+    "Inquiry",
+    "Complaint",
+]
+# every 30 minutes, 09:00 - 14:00
+SLOTS = [f"{h:02d}:{m:02d}" for h in range(9, 14) for m in (0, 30)] + ["14:00"]
+APPOINTMENT_STATUSES = ["Pending", "Approved", "Rejected"]
+
+appointment_lock = threading.Lock()
+
+
+def slot_key(branch, day, time):
+    return appointment_slot({"branch": branch, "date": day, "time": time})
+
+
+def slot_holder(db, branch, day, time):
+    # the Pending / Approved appointment holding the slot, or None
+    key = slot_key(branch, day, time)
+    if isinstance(db, Database):
+        appt_id = db.slot_holder(key)
+        return None if appt_id is None else db.appointment(appt_id)
+
+    for a in db.get("appointments", []):
+        if a.get("status") in ACTIVE_APPOINTMENT_STATUSES and appointment_slot(a) == key:
+            return a
+    return None
+
+
+def free_slots(db, branch, day):
+    if isinstance(db, Database):
+        db.sync_indexes()
+        taken = db.slot_index
+        return [t for t in SLOTS if slot_key(branch, day, t) not in taken]
+    return [t for t in SLOTS if slot_holder(db, branch, day, t) is None]
+
+
+def get_appointment(db, appt_id):
+    if isinstance(db, Database):
+        return db.appointment(appt_id)
+    return next((a for a in db.get("appointments", []) if a.get("id") == appt_id), None)
+
+
+def next_appointment_id(db):
+    # caller holds appointment_lock
+    ensure_appointment_sequence(db)
+    meta = db["meta"]
+    appt_id = meta["next_appointment_id"]
+    meta["next_appointment_id"] = appt_id + 1
+    return appt_id
+
+
+def validate_booking(name, phone, branch, service, day, time):
+    if not name or not phone:
+        return "Please enter your name and phone number"
+    if branch not in BRANCHES:
+        return "Unknown branch."
+    if service not in SERVICES:
+        return "Unknown service."
+    if time not in SLOTS:
+        return "Invalid time slot."
+    try:
+        datetime.strptime(str(day)[:10], "%Y-%m-%d")
+    except ValueError:
+        return "Invalid date."
+    return None
+
+
+# returns (ok, appointment, message); the caller saves (save_database(db))
+@timed("book_appointment")
+def reserve_slot(db, name, phone, branch, service, day, time):
+    error = validate_booking(name, phone, branch, service, day, time)
+    if error:
+        return False, None, error
+
+    with appointment_lock:
+        if slot_holder(db, branch, day, time) is not None:
+            return False, None, "❌ This time slot is already booked at this branch"
+
+        appt = {
+            "id": next_appointment_id(db),
+            "name": name,
+            "phone": phone,
+            "branch": branch,
+            "service": service,
+            "date": str(day)[:10],
+            "time": time,
+            "status": "Pending",
+            "note": "",
+        }
+        db["appointments"].append(appt)
+        if isinstance(db, Database):
+            db.sync_indexes()
+    return True, appt, "✅ Appointment booked successfully, awaiting confirmation"
+
+
+def _change_status(db, appt, status):
+    # caller holds appointment_lock; returns an error message or None
+    if appt.get("status") == status:
+        return None
+    reviving = appt.get("status") not in ACTIVE_APPOINTMENT_STATUSES
+    if status in ACTIVE_APPOINTMENT_STATUSES and reviving:
+        # bringing back a rejected booking: its slot may be gone by now
+        holder = slot_holder(db, appt["branch"], appt["date"], appt["time"])
+        if holder is not None and holder.get("id") != appt.get("id"):
+            return "❌ This time slot is already booked at this branch"
+
+    if isinstance(db, Database):
+        db.change_appointment_status(appt, status)
+    else:
+        appt["status"] = status
+    return None
+
+
+# returns (ok, appointment, message); save with touched_appointments=[appt]
+@timed("appointment_status")
+def set_appointment_status(db, appt_id, status):
+    if status not in APPOINTMENT_STATUSES:
+        return False, None, "Invalid status."
+
+    with appointment_lock:
+        appt = get_appointment(db, appt_id)
+        if appt is None:
+            return False, None, "Appointment not found."
+        error = _change_status(db, appt, status)
+    if error:
+        return False, appt, error
+    return True, appt, f"Appointment {status.lower()}"
+
+
+# bulk approve / reject: returns (changed appointments, [(id, error)]);
+# save once with touched_appointments=changed (one journal append)
+@timed("appointment_status_bulk")
+def set_appointments_status(db, appt_ids, status):
+    if status not in APPOINTMENT_STATUSES:
+        return [], [(appt_id, "Invalid status.") for appt_id in appt_ids]
+
+    changed, errors = [], []
+    with appointment_lock:
+        for appt_id in appt_ids:
+            appt = get_appointment(db, appt_id)
+            if appt is None:
+                errors.append((appt_id, "Appointment not found."))
+                continue
+            if appt.get("status") == status:
+                continue
+            error = _change_status(db, appt, status)
+            if error:
+                errors.append((appt_id, error))
+            else:
+                changed.append(appt)
+    return changed, errors
+
+
+# ---------------------------
+# Manage Appointments queue: filters + pages
+# ---------------------------
+# branch / day / service / status: None = any. Lazily yields (position,
+# appointment) in booking order; `after` is a cursor (a position) to resume
+# from. With the store's Database only the positions of the most selective
+# filter are visited.
+def iter_appointments(db, branch=None, day=None, status=None, service=None, after=None):
+    filters = {"branch": branch, "date": str(day)[:10] if day else None, "service": service}
+    filters = {k: v for k, v in filters.items() if v is not None}
+    appointments = db.get("appointments", [])
+
+    if isinstance(db, Database):
+        candidates = db.appointment_positions(filters, status, after)
+    else:
+        candidates = range(0 if after is None else after + 1, len(appointments))
+
+    for pos in candidates:
+        a = appointments[pos]
+        if status is not None and a.get("status") != status:
+            continue
+        if any(a.get(k) != v for k, v in filters.items()):
+            continue
+        yield pos, a
+
+
+def appointment_page(db, page_size=25, after=None, **filters):
+    page = list(islice(iter_appointments(db, after=after, **filters), page_size + 1))
+    has_more = len(page) > page_size
+    page = page[:page_size]
+    next_cursor = page[-1][0] if page else after
+    return [a for _, a in page], next_cursor, has_more
+
+
+def status_counts(db):
+    if isinstance(db, Database):
+        db.sync_indexes()
+        return {s: len(db.status_index.get(s, ())) for s in APPOINTMENT_STATUSES}
+    counts = dict.fromkeys(APPOINTMENT_STATUSES, 0)
+    for a in db.get("appointments", []):
+        if a.get("status") in counts:
+            counts[a["status"]] += 1
+    return counts
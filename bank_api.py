@@ -0,0 +1,541 @@
+# ============================================================
+# HTTP/JSON API over bank_service (asyncio, standard library only)
+# Lets integrations post transactions without going through the UI.
+#
+#   GET  /accounts/{id}                      account data
+#   GET  /accounts/{id}/history?limit=&after= one page of its history
+#   GET  /customers/search?q=&limit=         accounts by name, phone,
+#                                            national ID or email
+#   GET  /dashboard?day=YYYY-MM-DD           dashboard metrics
+#   GET  /accounts/{id}/statement?start=&end=&format=csv|parquet
+#   GET  /history/export?start=&end=&action=&account=&format=csv|parquet
+#                                            streamed (chunked) files
+#   POST /accounts   {"name", "phone", "national_id"?, "balance"?}
+#   POST /deposit    {"account", "amount"}
+#   POST /withdraw   {"account", "amount"}
+#   POST /transfer   {"src", "dst", "amount"}
+#   POST /batch      {"transfers": [{"src", "dst", "amount"}, ...], "atomic"?}
+#   GET  /appointments?branch=&date=&status=&service=&limit=&after=
+#                                            one page of the appointments queue
+#   GET  /appointments/slots?branch=&date=   free slots of a branch on a day
+#   POST /appointments {"name", "phone", "branch", "service", "date", "time"}
+#   POST /appointments/{id}/status {"status": "Approved" | "Rejected" | ...}
+#   POST /appointments/status {"ids": [...], "status"}   bulk, one write
+#   GET  /fx/rates                           rate table + every cross rate
+#   POST /fx/convert {"from", "to", "amounts": [...]}     batch conversion
+#   POST /fx/balances {"accounts": [...], "currency"}    balances converted
+#   GET  /metrics                            Prometheus text format
+#
+# Amounts are in pounds both ways (stored as integer piastres, money.py).
+# Set BANK_API_TOKEN to require "Authorization: Bearer <token>".
+# Run: python bank_api.py [--host 127.0.0.1] [--port 8080]
+# The API must be the only writer of the data files it opens (a second
+# process fails with StoreLocked); to serve it next to the UI, set
+# BANK_API_PORT and final2.py starts it in-process.
+# ============================================================
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import threading
+from urllib.parse import parse_qs, urlsplit
+
+import bank_service
+from appointments import BRANCHES
+from metrics import prometheus_text
+from export import EXPORT_FORMATS, parquet_available
+from money import to_piastres, to_pounds
+from storage import StoreLocked
+
+MAX_BODY = 10 * 1024 * 1024
+API_TOKEN = os.environ.get("BANK_API_TOKEN")
+
+STATUS_TEXT = {
+    200: "OK",
+    201: "Created",
+    400: "Bad Request",
+    401: "Unauthorized",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    422: "Unprocessable Entity",
+    500: "Internal Server Error",
+}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def require(body, *fields):
+    missing = [f for f in fields if f not in body]
+    if missing:
+        raise ApiError(400, f"Missing field(s): {', '.join(missing)}")
+
+
+def number(value, field):
+    # checked here, but passed on as sent (JSON number or numeric string):
+    # a float() on the way would round it differently from to_piastres
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ApiError(400, f"{field} must be a number")
+    try:
+        to_piastres(value)
+    except ValueError:
+        raise ApiError(400, f"{field} must be a number")
+    return value
+
+
+def text(value, field):
+    if not isinstance(value, str):
+        raise ApiError(400, f"{field} must be a string")
+    return value
+
+
+def flag(body, field, default):
+    value = body.get(field, default)
+    if not isinstance(value, bool):
+        raise ApiError(400, f"{field} must be true or false")
+    return value
+
+
+def integer(params, field, default=None, minimum=0):
+    # a query parameter that has to be a whole number (limit, after)
+    value = params.get(field)
+    if value in (None, ""):
+        return default
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ApiError(400, f"{field} must be an integer")
+    if value < minimum:
+        raise ApiError(400, f"{field} must be at least {minimum}")
+    return value
+
+
+def page_limit(params, default, maximum):
+    return min(integer(params, "limit", default, minimum=1), maximum)
+
+
+def pounds_row(h):
+    return {**h, "amount": to_pounds(h.get("amount", 0))}
+
+
+class Download:
+    # a streamed response: chunks are pulled one at a time, off the loop
+    def __init__(self, chunks, content_type, filename):
+        self.chunks = chunks
+        self.content_type = content_type
+        self.filename = filename
+
+
+def export_format(params):
+    fmt = params.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        raise ApiError(400, f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    if fmt == "parquet" and not parquet_available():
+        raise ApiError(400, "Parquet export is not available (pyarrow is not installed)")
+    return fmt
+
+
+def result(ok, msg, **extra):
+    if not ok:
+        raise ApiError(422, msg)
+    return 200, {"ok": True, "message": msg, **extra}
+
+
+# ---------------------------
+# Handlers (run on worker threads: the bank functions block on locks / fsync)
+# ---------------------------
+def get_account(params, body, acc_id):
+    acc = bank_service.get_account(acc_id)
+    if acc is None:
+        raise ApiError(404, "Account not found.")
+    return 200, {"id": acc_id, **acc, "balance": to_pounds(acc.get("balance", 0))}
+
+
+def get_customer_search(params, body):
+    require(params, "q")
+    limit = page_limit(params, 20, 100)
+    return 200, {
+        "rows": [
+            {"id": acc_id, **acc, "balance": to_pounds(acc.get("balance", 0))}
+            for acc_id, acc in bank_service.find_customers(params["q"], limit)
+        ]
+    }
+
+
+def get_history(params, body, acc_id):
+    if bank_service.get_account(acc_id) is None:
+        raise ApiError(404, "Account not found.")
+    limit = page_limit(params, 50, 1000)
+    after = integer(params, "after")
+    rows, cursor, has_more = bank_service.get_account_history(acc_id, limit, after)
+    return 200, {"rows": [pounds_row(h) for h in rows], "next": cursor if has_more else None}
+
+
+def get_dashboard(params, body):
+    metrics = bank_service.get_dashboard(params.get("day"))
+    return 200, {k: v if k == "total_accounts" else to_pounds(v) for k, v in metrics.items()}
+
+
+def get_statement(params, body, acc_id):
+    if bank_service.get_account(acc_id) is None:
+        raise ApiError(404, "Account not found.")
+    fmt = export_format(params)
+    chunks, content_type = bank_service.statement_export(
+        acc_id, params.get("start"), params.get("end"), fmt
+    )
+    return 200, Download(chunks, content_type, f"statement-{acc_id}.{fmt}")
+
+
+def get_history_export(params, body):
+    fmt = export_format(params)
+    chunks, content_type = bank_service.history_export(
+        fmt,
+        start=params.get("start"),
+        end=params.get("end"),
+        action=params.get("action"),
+        acc_id=params.get("account"),
+    )
+    return 200, Download(chunks, content_type, f"history.{fmt}")
+
+
+def post_account(params, body):
+    require(body, "name", "phone")
+    ok, acc_id, msg = bank_service.open_account(
+        text(body["name"], "name"),
+        text(body["phone"], "phone"),
+        text(body.get("national_id", ""), "national_id"),
+        number(body.get("balance", 50.0), "balance"),
+    )
+    if not ok:
+        raise ApiError(422, msg)
+    return 201, {"ok": True, "message": msg, "account": acc_id}
+
+
+def post_deposit(params, body):
+    require(body, "account", "amount")
+    return result(*bank_service.deposit(body["account"], number(body["amount"], "amount")))
+
+
+def post_withdraw(params, body):
+    require(body, "account", "amount")
+    return result(*bank_service.withdraw(body["account"], number(body["amount"], "amount")))
+
+
+def post_transfer(params, body):
+    require(body, "src", "dst", "amount")
+    return result(
+        *bank_service.transfer(body["src"], body["dst"], number(body["amount"], "amount"))
+    )
+
+
+def post_batch(params, body):
+    require(body, "transfers")
+    if not isinstance(body["transfers"], list):
+        raise ApiError(400, "transfers must be a list")
+    atomic = flag(body, "atomic", True)
+    rows = []
+    for i, t in enumerate(body["transfers"], 1):
+        if not isinstance(t, dict) or not {"src", "dst", "amount"} <= t.keys():
+            raise ApiError(400, f"Transfer {i} needs src, dst and amount")
+        amount = to_piastres(number(t["amount"], f"Transfer {i} amount"))
+        rows.append((i, str(t["src"]), str(t["dst"]), amount))
+
+    ok, posted, errors = bank_service.post_transfers(rows, atomic=atomic)
+    return (200 if ok else 422), {"ok": ok, "posted": posted, "errors": errors}
+
+
+def get_appointments(params, body):
+    limit = page_limit(params, 25, 1000)
+    after = integer(params, "after")
+    rows, cursor, has_more = bank_service.list_appointments(
+        limit,
+        after,
+        branch=params.get("branch"),
+        day=params.get("date"),
+        status=params.get("status"),
+        service=params.get("service"),
+    )
+    return 200, {"rows": rows, "next": cursor if has_more else None}
+
+
+def get_slots(params, body):
+    require(params, "branch", "date")
+    if params["branch"] not in BRANCHES:
+        raise ApiError(404, "Unknown branch.")
+    return 200, {
+        "branch": params["branch"],
+        "date": params["date"],
+        "free": bank_service.available_slots(params["branch"], params["date"]),
+    }
+
+
+def post_appointment(params, body):
+    fields = ("name", "phone", "branch", "service", "date", "time")
+    require(body, *fields)
+    ok, appt, msg = bank_service.book_appointment(*(text(body[f], f) for f in fields))
+    if not ok:
+        raise ApiError(422, msg)
+    return 201, {"ok": True, "message": msg, "appointment": appt}
+
+
+def post_appointment_status(params, body, appt_id):
+    require(body, "status")
+    try:
+        appt_id = int(appt_id)
+    except ValueError:
+        raise ApiError(404, "Appointment not found.")
+    ok, appt, msg = bank_service.update_appointment_status(appt_id, body["status"])
+    if not ok:
+        raise ApiError(422, msg)
+    return 200, {"ok": True, "message": msg, "appointment": appt}
+
+
+def post_appointments_status(params, body):
+    require(body, "ids", "status")
+    if not isinstance(body["ids"], list):
+        raise ApiError(400, "ids must be a list")
+    changed, errors = bank_service.update_appointments_status(body["ids"], body["status"])
+    return (200 if not errors else 422), {
+        "ok": not errors,
+        "changed": [a["id"] for a in changed],
+        "errors": [{"id": appt_id, "error": msg} for appt_id, msg in errors],
+    }
+
+
+def get_fx_rates(params, body):
+    table = bank_service.fx_rates()
+    return 200, {
+        "base": table.base,
+        "source": table.source,
+        "updated": table.updated,
+        "rates": table.rates,
+        "cross": table.cross,
+    }
+
+
+def post_fx_convert(params, body):
+    require(body, "from", "to", "amounts")
+    if not isinstance(body["amounts"], list):
+        raise ApiError(400, "amounts must be a list")
+    try:
+        amounts = [to_piastres(a) for a in body["amounts"]]
+        converted = bank_service.convert_amounts(amounts, body["from"], body["to"])
+    except ValueError as e:
+        raise ApiError(400, str(e))
+    return 200, {
+        "from": body["from"],
+        "to": body["to"],
+        "amounts": [to_pounds(a) for a in converted],
+    }
+
+
+def post_fx_balances(params, body):
+    require(body, "accounts", "currency")
+    if not isinstance(body["accounts"], list):
+        raise ApiError(400, "accounts must be a list")
+    try:
+        balances = bank_service.balances_in([str(a) for a in body["accounts"]], body["currency"])
+    except ValueError as e:
+        raise ApiError(400, str(e))
+    return 200, {
+        "currency": body["currency"],
+        "balances": {acc_id: to_pounds(v) for acc_id, v in balances.items()},
+    }
+
+
+def get_metrics(params, body):
+    # plain text, not JSON
+    return 200, prometheus_text()
+
+
+ROUTES = [
+    ("GET", re.compile(r"^/accounts/([^/]+)$"), get_account),
+    ("GET", re.compile(r"^/accounts/([^/]+)/history$"), get_history),
+    ("GET", re.compile(r"^/accounts/([^/]+)/statement$"), get_statement),
+    ("GET", re.compile(r"^/history/export$"), get_history_export),
+    ("GET", re.compile(r"^/customers/search$"), get_customer_search),
+    ("GET", re.compile(r"^/dashboard$"), get_dashboard),
+    ("POST", re.compile(r"^/accounts$"), post_account),
+    ("POST", re.compile(r"^/deposit$"), post_deposit),
+    ("POST", re.compile(r"^/withdraw$"), post_withdraw),
+    ("POST", re.compile(r"^/transfer$"), post_transfer),
+    ("POST", re.compile(r"^/batch$"), post_batch),
+    ("GET", re.compile(r"^/appointments$"), get_appointments),
+    ("GET", re.compile(r"^/appointments/slots$"), get_slots),
+    ("POST", re.compile(r"^/appointments$"), post_appointment),
+    ("POST", re.compile(r"^/appointments/status$"), post_appointments_status),
+    ("POST", re.compile(r"^/appointments/([^/]+)/status$"), post_appointment_status),
+    ("GET", re.compile(r"^/fx/rates$"), get_fx_rates),
+    ("POST", re.compile(r"^/fx/convert$"), post_fx_convert),
+    ("POST", re.compile(r"^/fx/balances$"), post_fx_balances),
+    ("GET", re.compile(r"^/metrics$"), get_metrics),
+]
+
+
+def route(method, path):
+    allowed = False
+    for route_method, pattern, handler in ROUTES:
+        match = pattern.match(path)
+        if match:
+            if route_method == method:
+                return handler, match.groups()
+            allowed = True
+    raise ApiError(405 if allowed else 404, "Method not allowed" if allowed else "Not found")
+
+
+# ---------------------------
+# HTTP/1.1 plumbing (keep-alive, Content-Length bodies only)
+# ---------------------------
+async def read_request(reader):
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, target, _version = request_line.decode("latin-1").split()
+    except ValueError:
+        raise ApiError(400, "Malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise ApiError(400, "Invalid Content-Length")
+    if length < 0:
+        raise ApiError(400, "Invalid Content-Length")
+    if length > MAX_BODY:
+        raise ApiError(413, "Body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+
+def write_response(writer, status, payload, keep_alive):
+    if isinstance(payload, str):
+        data, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4"
+    else:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        content_type = "application/json"
+    head = (
+        f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+        f"Content-Type: {content_type}; charset=utf-8\r\n"
+        f"Content-Length: {len(data)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + data)
+
+
+async def write_download(writer, status, download, keep_alive):
+    # Transfer-Encoding: chunked, one HTTP chunk per export chunk, so the
+    # file is never held in memory
+    head = (
+        f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+        f"Content-Type: {download.content_type}\r\n"
+        f'Content-Disposition: attachment; filename="{download.filename}"\r\n'
+        "Transfer-Encoding: chunked\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1"))
+    while True:
+        chunk = await asyncio.to_thread(next, download.chunks, None)
+        if chunk is None:
+            break
+        if chunk:
+            writer.write(f"{len(chunk):X}\r\n".encode("latin-1") + chunk + b"\r\n")
+            await writer.drain()
+    writer.write(b"0\r\n\r\n")
+
+
+async def dispatch(method, target, headers, body):
+    if API_TOKEN and headers.get("authorization") != f"Bearer {API_TOKEN}":
+        raise ApiError(401, "Missing or invalid token")
+
+    url = urlsplit(target)
+    params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+    handler, args = route(method, url.path)
+
+    if body:
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            raise ApiError(400, "Body is not valid JSON")
+        if not isinstance(payload, dict):
+            raise ApiError(400, "Body must be a JSON object")
+    else:
+        payload = {}
+
+    return await asyncio.to_thread(handler, params, payload, *args)
+
+
+async def handle_connection(reader, writer):
+    try:
+        while True:
+            try:
+                request = await read_request(reader)
+            except ApiError as e:
+                write_response(writer, e.status, {"ok": False, "error": e.message}, False)
+                break
+            if request is None:
+                break
+
+            method, target, headers, body = request
+            keep_alive = headers.get("connection", "").lower() != "close"
+            try:
+                status, payload = await dispatch(method, target, headers, body)
+            except ApiError as e:
+                status, payload = e.status, {"ok": False, "error": e.message}
+            except Exception as e:  # keep the server up, report the failure
+                status, payload = 500, {"ok": False, "error": str(e)}
+
+            if isinstance(payload, Download):
+                await write_download(writer, status, payload, keep_alive)
+            else:
+                write_response(writer, status, payload, keep_alive)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host="127.0.0.1", port=8080):
+    bank_service.get_database()  # load once before taking requests
+    server = await asyncio.start_server(handle_connection, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def start_in_thread(host="127.0.0.1", port=8080):
+    # used by final2.py to serve the API from the UI process (same db)
+    thread = threading.Thread(
+        target=lambda: asyncio.run(serve(host, port)), name="bank-api", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+
+    print(f"Bank API listening on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except StoreLocked as e:
+        sys.exit(str(e))
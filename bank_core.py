@@ -0,0 +1,515 @@
+# ============================================================
+# Bank core: the domain functions of the bank (no Streamlit here)
+# Each section is labeled with the team member name.
+# final2.py imports everything from here and only renders the UI.
+# ============================================================
+import csv
+import io
+import threading
+import weakref
+from contextlib import contextmanager
+from datetime import datetime, date
+from bisect import bisect_right
+from itertools import islice
+
+from metrics import timed
+from money import format_money, to_piastres
+from search import DEFAULT_LIMIT, CustomerIndex
+from stats import apply_row, day_totals, ensure_stats
+from storage import Database, ensure_account_sequence
+
+
+# ============================================================
+# Concurrency
+# Every Streamlit session runs on its own thread over the same db.
+# A balance change holds the lock of each account it touches, taken in
+# sorted order so two opposite transfers can never deadlock; independent
+# accounts go in parallel. Appending to history is serialized.
+# ============================================================
+class _AccountLock:
+    # threading.Lock can't be weakly referenced; this wrapper can
+    __slots__ = ("lock", "__weakref__")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+
+
+class AccountLocks:
+    # a lock lives only while someone holds or waits for it, so ids that
+    # do not exist (API calls, batch files) can't pile up locks
+    def __init__(self):
+        self.locks = weakref.WeakValueDictionary()
+        self.guard = threading.Lock()
+
+    def get(self, acc_id):
+        with self.guard:
+            lock = self.locks.get(acc_id)
+            if lock is None:
+                lock = self.locks[acc_id] = _AccountLock()
+        return lock
+
+    @contextmanager
+    def hold(self, *acc_ids):
+        locks = [self.get(a) for a in sorted({str(a) for a in acc_ids})]
+        for lock in locks:
+            lock.lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.lock.release()
+
+
+account_locks = AccountLocks()
+history_lock = threading.Lock()
+account_id_lock = threading.Lock()
+
+
+def add_history(db, action, account_id, amount=0, to_acc=None):
+    row = {
+        "action": action,
+        "account": account_id,
+        "to_account": to_acc,
+        "amount": int(amount),
+        "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    with history_lock:
+        if isinstance(db, Database):
+            # the caller still holds the account locks, so this is the
+            # exact state that goes with the row when it is saved
+            db.capture_accounts(len(db["history"]), row)
+        db["history"].append(row)
+        if isinstance(db, Database):
+            db.sync_indexes()
+        if "meta" in db:
+            apply_row(db["meta"], row)
+
+
+# ============================================================
+#  محمد رافع
+# منطق التحويل , نفس الحساب ,
+# ============================================================
+class Account_Rafaa:
+    def __init__(self, acc_id, owner, balance=0, status="Active"):
+        self.acc_id = acc_id
+        self.owner = owner
+        self.balance = balance  # piastres, see money.py
+        self.status = status
+
+    def is_active(self):
+        return self.status == "Active"
+
+    def can_receive(self):
+        return self.status in ("Active", "Frozen")
+
+    def __repr__(self):
+        return f"{self.acc_id}:{format_money(self.balance)}({self.status})"
+
+
+class Bank_Rafaa:
+    def __init__(self, db):
+        self.db = db
+        self.accounts = db["accounts"]
+
+    def get(self, acc_id):
+        return self.accounts.get(acc_id)
+
+    # the transfer rules; returns the error message or None.
+    # amt is in piastres; `balance` lets a batch check against the
+    # source's projected balance.
+    def check_transfer(self, src, dst, amt, balance=None):
+        if src == dst:
+            return "You can't transfer to the same account."
+
+        s = self.get(src)
+        r = self.get(dst)
+
+        if not s or not r:
+            return "One of the accounts does not exist."
+
+        if amt <= 0:
+            return "Amount must be greater than 0 LE."
+
+        if s.get("status") != "Active":
+            return f"Source account is not active ({s.get('status')})."
+
+        if r.get("status") not in ("Active", "Frozen"):
+            return f"Reciver account does not accept transfers ({r.get('status')})."
+
+        if balance is None:
+            balance = s.get("balance", 0)
+        if balance < amt:
+            return "Insufficient balance."
+
+        return None
+
+    # amt in pounds (number or text), like every public bank function
+    @timed("transfer")
+    def transfer(self, src, dst, amt):
+        if src == dst:
+            return False, "You can't transfer to the same account."
+        try:
+            amt = to_piastres(amt)
+        except ValueError as e:
+            return False, str(e)
+
+        with account_locks.hold(src, dst):
+            error = self.check_transfer(src, dst, amt)
+            if error:
+                return False, error
+
+            s = self.get(src)
+            r = self.get(dst)
+            s["balance"] -= amt
+            r["balance"] += amt
+
+            add_history(self.db, "Transfer", src, amt, to_acc=dst)
+            return True, f"Transferred {format_money(amt, 'EGP')} from {src} to {dst}."
+
+
+# ============================================================
+# Batch posting (salaries / bulk payments)
+# A CSV of src,dst,amount rows is checked against the same rules as
+# Bank_Rafaa.transfer (with the balances the earlier rows leave behind),
+# then applied all-or-nothing or row by row. The caller saves once.
+# Row amounts are piastres (parse_batch_csv reads the text exactly).
+# ============================================================
+BATCH_COLUMNS = ("src", "dst", "amount")
+
+
+def parse_batch_csv(text):
+    rows, errors = [], []
+    reader = csv.reader(io.StringIO(text))
+    for line_no, fields in enumerate(reader, 1):
+        fields = [f.strip() for f in fields]
+        if not any(fields):
+            continue
+        if line_no == 1 and [f.lower() for f in fields[: len(BATCH_COLUMNS)]] == list(BATCH_COLUMNS):
+            continue  # header, in any case ("Src,Dst,Amount")
+        if len(fields) < 3:
+            errors.append({"row": line_no, "error": "Expected src,dst,amount."})
+            continue
+        try:
+            amount = to_piastres(fields[2])
+        except ValueError:
+            errors.append({"row": line_no, "error": f"Invalid amount: {fields[2]}"})
+            continue
+        rows.append((line_no, fields[0], fields[1], amount))
+    return rows, errors
+
+
+@timed("post_batch")
+def post_batch(db, rows, atomic=True):
+    bank = Bank_Rafaa(db)
+    accounts = db["accounts"]
+    involved = {r[1] for r in rows} | {r[2] for r in rows}
+    errors, accepted = [], []
+
+    with account_locks.hold(*involved):
+        projected = {}
+        for line_no, src, dst, amt in rows:
+            balance = projected.get(src)
+            if balance is None and src in accounts:
+                balance = accounts[src].get("balance", 0)
+            error = bank.check_transfer(src, dst, amt, balance=balance)
+            if error:
+                errors.append({"row": line_no, "src": src, "dst": dst, "error": error})
+                continue
+
+            projected[src] = balance - amt
+            projected[dst] = projected.get(dst, accounts[dst].get("balance", 0)) + amt
+            accepted.append((src, dst, amt))
+
+        if atomic and errors:
+            return False, 0, errors
+
+        for src, dst, amt in accepted:
+            accounts[src]["balance"] -= amt
+            accounts[dst]["balance"] += amt
+            add_history(db, "Transfer", src, amt, to_acc=dst)
+
+    return True, len(accepted), errors
+
+
+# ============================================================
+# Author: مصطفى عيد
+# صحه البيانات , انشاء , تحديث  , حفظ
+# ============================================================
+def validate_name_eid(name: str) -> bool:
+    return bool(name.strip()) and all(c.isalpha() or c.isspace() for c in name)
+
+
+def validate_phone_eid(phone: str) -> bool:
+    phone = str(phone).strip()
+    if not phone.isdigit():
+        return False
+    if len(phone) != 11:
+        return False
+    if not phone.startswith(("010", "011", "012", "015")):
+        return False
+    return True
+
+
+# O(1): ids come from the persisted sequence in db["meta"] (started from
+# the existing numeric ids the first time), handed out under a lock so two
+# sessions opening accounts at the same moment never get the same number
+def generate_account_id_eid(db, start_from=1001) -> str:
+    with account_id_lock:
+        ensure_account_sequence(db, start_from)
+        meta = db["meta"]
+        accounts = db.get("accounts", {})
+
+        acc_id = meta["next_account_id"]
+        while str(acc_id) in accounts:
+            # an id added behind the sequence's back (e.g. an import)
+            acc_id += 1
+        meta["next_account_id"] = acc_id + 1
+        return str(acc_id)
+
+
+@timed("create_account")
+def create_account_auto_id_eid(db, name, phone, national_id="", balance=50.0):
+    try:
+        balance = to_piastres(balance)
+    except ValueError as e:
+        return False, None, str(e)
+    if balance < 0:
+        return False, None, "Invalid initial balance."
+
+    if not validate_name_eid(name):
+        return False, None, "Invalid name (letters and spaces only)."
+
+    if not validate_phone_eid(phone):
+        return (
+            False,
+            None,
+            "Invalid phone number (Must begain with 010 | 011 | 012 | 015). ",
+        )
+
+    acc_id = generate_account_id_eid(db)
+
+    with account_locks.hold(acc_id):
+        db["accounts"][acc_id] = {
+            "name": name,
+            "phone": phone,
+            "national_id": national_id,
+            "balance": balance,
+            "status": "Active",
+            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
+        add_history(db, "Create", acc_id, amount=balance)
+    return True, acc_id, "Account created successfully ✅"
+
+
+@timed("update_status")
+def update_status_eid(db, acc_id, new_status):
+    with account_locks.hold(acc_id):
+        acc = db["accounts"].get(acc_id)
+        if not acc:
+            return False, "Account not found."
+
+        if new_status not in ("Active", "Frozen", "Closed"):
+            return False, "Invalid status."
+
+        acc["status"] = new_status
+        add_history(db, "Update Status", acc_id, amount=0)
+        return True, f"Status updated to {new_status} ✅"
+
+
+# ============================================================
+# Author: أبو الجبل
+#  سحب ايداع حاله حفظ
+# ============================================================
+@timed("deposit")
+def deposit_abo_elgabal(db, acc_id, amount):
+    try:
+        amount = to_piastres(amount)
+    except ValueError as e:
+        return False, str(e)
+    if amount <= 0:
+        return False, "Invalid deposit amount."
+
+    with account_locks.hold(acc_id):
+        acc = db["accounts"].get(acc_id)
+        if not acc:
+            return False, "Account not found."
+
+        # If Closed, no operations are allowed
+        if acc.get("status") == "Closed":
+            return False, "Account is Closed and does not accept operations."
+
+        acc["balance"] += amount
+        add_history(db, "Deposit", acc_id, amount=amount)
+        return True, f"Deposited {format_money(amount, 'EGP')} ✅"
+
+
+@timed("withdraw")
+def withdraw_abo_elgabal(db, acc_id, amount):
+    try:
+        amount = to_piastres(amount)
+    except ValueError as e:
+        return False, str(e)
+    if amount <= 0:
+        return False, "Invalid withdrawal amount."
+
+    with account_locks.hold(acc_id):
+        acc = db["accounts"].get(acc_id)
+        if not acc:
+            return False, "Account not found."
+
+        # Active فقط للسحب
+        if acc.get("status") != "Active":
+            return (
+                False,
+                f"Account is not active ({acc.get('status')}) and does not allow withdrawal.",
+            )
+
+        if acc["balance"] < amount:
+            return False, "Insufficient balance."
+
+        acc["balance"] -= amount
+        add_history(db, "Withdraw", acc_id, amount=amount)
+        return True, f"Withdrawn {format_money(amount, 'EGP')} ✅"
+
+
+# ============================================================
+# Author: مصطفى الفيشاوي
+# Transaction history helpers (account history / filters)
+# ============================================================
+def get_account_history_feshawy(db, acc_id):
+    # O(k) through the per-account index when the db came from the store
+    if isinstance(db, Database):
+        return db.account_history(acc_id)
+
+    return [
+        h
+        for h in db["history"]
+        if h.get("account") == acc_id or h.get("to_account") == acc_id
+    ]
+
+
+# start / end: dates or "YYYY-MM-DD[ HH:MM:SS]" strings, both inclusive.
+# Lazily yields (position, row) in history order, applying every filter in
+# one pass; `after` is a cursor (a history position) to resume from.
+def iter_history(db, start=None, end=None, action=None, acc_id=None, after=None):
+    start = str(start) if start else None
+    end = str(end) if end else None
+    history = db["history"]
+
+    if isinstance(db, Database):
+        if acc_id:
+            positions = db.account_positions(acc_id)
+            first = bisect_right(positions, after) if after is not None else 0
+            candidates = islice(positions, first, None)
+        else:
+            if after is not None and after < len(history):
+                # no need to walk the days before the cursor
+                cursor_day = history[after]["time"][:10]
+                if not start or cursor_day > start:
+                    start_day = cursor_day
+                else:
+                    start_day = start
+            else:
+                start_day = start
+            candidates = db.day_positions(start_day, end)
+    else:
+        candidates = range(0 if after is None else after + 1, len(history))
+
+    for pos in candidates:
+        if after is not None and pos <= after:
+            continue
+        h = history[pos]
+        if acc_id and not isinstance(db, Database):
+            if h.get("account") != acc_id and h.get("to_account") != acc_id:
+                continue
+        t = h["time"]
+        if start and t < start:
+            continue
+        if end and t[: len(end)] > end:
+            continue
+        if action and h["action"] != action:
+            continue
+        yield pos, h
+
+
+def query_history(db, start=None, end=None, action=None, acc_id=None):
+    for _, h in iter_history(db, start, end, action, acc_id):
+        yield h
+
+
+# one page of matching rows + the cursor for the next page;
+# only page_size + 1 rows are ever materialized
+def history_page(db, page_size=50, after=None, **filters):
+    page = list(islice(iter_history(db, after=after, **filters), page_size + 1))
+    has_more = len(page) > page_size
+    page = page[:page_size]
+    next_cursor = page[-1][0] if page else after
+    return [h for _, h in page], next_cursor, has_more
+
+
+# ============================================================
+# Author: صبحي
+# Dashboard metrics (based on real db not random)
+# ============================================================
+
+
+def get_dashboard_metrics_sobhy(db, day=None):
+    # reads the running aggregates kept by add_history (see stats.py),
+    # so this is O(1) whatever the size of the history; amounts in piastres
+    ensure_stats(db)
+    stats = db["meta"]["stats"]
+
+    day_str = day or date.today().strftime("%Y-%m-%d")
+    totals = day_totals(db, day_str)
+
+    return {
+        "total_accounts": stats["account_count"],
+        "total_balance": stats["total_balance"],
+        "today_deposits": totals["Deposit"],
+        "today_withdraws": totals["Withdraw"],
+        "today_transfers": totals["Transfer"],
+    }
+
+
+# ============================================================
+# Author: بطه
+# Customer data validation + attach to account
+# ============================================================
+def validate_customer_batta(name: str, phone: str, email: str) -> bool:
+    if name == "" or phone == "" or email == "":
+        return False
+    if not str(phone).isdigit():
+        return False
+    if "@" not in email:
+        return False
+    return True
+
+
+@timed("customer_update")
+def add_customer_to_account_batta(db, acc_id: str, name: str, phone: str, email: str):
+    if acc_id not in db["accounts"]:
+        return False, "Account not found."
+
+    if not validate_customer_batta(name, phone, email):
+        return False, "Invalid customer data."
+
+    with account_locks.hold(acc_id):
+        db["accounts"][acc_id]["customer"] = {"name": name, "phone": phone, "email": email}
+        add_history(db, "Customer Update", acc_id, amount=0)
+    return True, "Customer data saved successfully ✅"
+
+
+# account ids for a teller's query: an account number, phone, national ID,
+# email or (part of) a name; see search.py
+@timed("customer_search")
+def search_customers(db, query, limit=DEFAULT_LIMIT):
+    query = str(query).strip()
+    if not query:
+        return []
+    exact = [query] if query in db["accounts"] else []
+    if isinstance(db, Database):
+        found = db.search_customers(query, limit)
+    else:
+        found = CustomerIndex.build(db["accounts"]).search(query, limit)
+    return (exact + [a for a in found if a != query])[:limit]
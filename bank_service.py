@@ -0,0 +1,215 @@
+# ============================================================
+# Bank service: the headless entry point to the bank
+# Opens the configured store, owns the one shared in-memory database and
+# wraps each domain operation together with its save. Used by final2.py
+# (Streamlit UI) and bank_api.py (HTTP/JSON); nothing here imports
+# Streamlit, so it can be imported, scripted and benchmarked directly.
+# ============================================================
+import os
+import threading
+
+from appointments import (
+    appointment_page,
+    free_slots,
+    reserve_slot,
+    set_appointment_status,
+    set_appointments_status,
+)
+from bank_core import (
+    Bank_Rafaa,
+    create_account_auto_id_eid,
+    deposit_abo_elgabal,
+    get_dashboard_metrics_sobhy,
+    history_page,
+    post_batch,
+    search_customers,
+    update_status_eid,
+    withdraw_abo_elgabal,
+)
+from export import CONTENT_TYPES, export_history, export_statement
+from fx import convert_balances, convert_many, fx
+from metrics import timed
+from storage import open_store
+from verify import verify_balances
+
+# ============================================================
+# Database
+# ============================================================
+DB_FILE = "database.json"
+JOURNAL_FILE = "database.journal"
+SQLITE_FILE = "database.db"
+# replayed balances of the last verification, so the next one only
+# replays the rows added since (verify.py)
+VERIFY_FILE = "database.verify.json"
+
+# "journal" (default, database.json + journal) or "sqlite" (database.db).
+# Move existing data over with: python storage_sqlite.py migrate
+STORAGE_BACKEND = os.environ.get("BANK_STORAGE", "journal")
+# BANK_LAZY_HISTORY=1 (journal backend): the history is kept in its own
+# line file, memory-mapped and parsed on demand (lazy_history.py), so
+# startup time does not grow with the history
+LAZY_HISTORY = os.environ.get("BANK_LAZY_HISTORY", "0") == "1"
+# BANK_COMPACT_RECORDS=1: the loaded accounts and history are kept as
+# slotted records and typed columns (records.py), a fraction of the
+# memory of the dicts
+COMPACT_RECORDS = os.environ.get("BANK_COMPACT_RECORDS", "0") == "1"
+if STORAGE_BACKEND == "sqlite":
+    store = open_store(SQLITE_FILE, backend="sqlite", compact_records=COMPACT_RECORDS)
+else:
+    store = open_store(
+        DB_FILE, JOURNAL_FILE, lazy_history=LAZY_HISTORY, compact_records=COMPACT_RECORDS
+    )
+
+
+@timed("load_database")
+def load_database():
+    return store.load()
+
+
+# only the records added since the last save are appended to the journal;
+# appointments edited in place have to be passed in explicitly
+@timed("save_database")
+def save_database(data, touched_appointments=()):
+    store.commit(data, touched_appointments)
+
+
+# One in-memory copy of the database for the whole process, shared by every
+# session / request. The store holds the data files' writer lock, so no
+# other process changes them underneath (storage.lock_data_file).
+_shared_db = None
+_shared_db_lock = threading.Lock()
+
+
+def get_database():
+    global _shared_db
+    with _shared_db_lock:
+        if _shared_db is None:
+            _shared_db = load_database()
+        return _shared_db
+
+
+# ============================================================
+# Operations (domain function + save), same (ok, ...) results
+# Amounts in pounds; post_transfers rows and every value read back
+# (balances, history, dashboard) are integer piastres (money.py).
+# ============================================================
+def open_account(name, phone, national_id="", balance=50.0):
+    db = get_database()
+    ok, acc_id, msg = create_account_auto_id_eid(
+        db, name=name, phone=phone, national_id=national_id, balance=balance
+    )
+    if ok:
+        save_database(db)
+    return ok, acc_id, msg
+
+
+def _saved(db, result):
+    if result[0]:
+        save_database(db)
+    return result
+
+
+def deposit(acc_id, amount):
+    db = get_database()
+    return _saved(db, deposit_abo_elgabal(db, acc_id, amount))
+
+
+def withdraw(acc_id, amount):
+    db = get_database()
+    return _saved(db, withdraw_abo_elgabal(db, acc_id, amount))
+
+
+def transfer(src, dst, amount):
+    db = get_database()
+    return _saved(db, Bank_Rafaa(db).transfer(src, dst, amount))
+
+
+def update_status(acc_id, new_status):
+    db = get_database()
+    return _saved(db, update_status_eid(db, acc_id, new_status))
+
+
+def post_transfers(rows, atomic=True):
+    db = get_database()
+    ok, posted, errors = post_batch(db, rows, atomic=atomic)
+    if ok and posted:
+        save_database(db)
+    return ok, posted, errors
+
+
+def get_account(acc_id):
+    acc = get_database()["accounts"].get(acc_id)
+    return dict(acc) if acc is not None else None
+
+
+def get_account_history(acc_id, page_size=50, after=None):
+    return history_page(get_database(), page_size=page_size, after=after, acc_id=acc_id)
+
+
+def find_customers(query, limit=20):
+    # (account id, account data) for every match, best first
+    db = get_database()
+    accounts = db["accounts"]
+    return [(a, dict(accounts[a])) for a in search_customers(db, query, limit) if a in accounts]
+
+
+def get_dashboard(day=None):
+    return get_dashboard_metrics_sobhy(get_database(), day=day)
+
+
+def book_appointment(name, phone, branch, service, day, time):
+    db = get_database()
+    return _saved(db, reserve_slot(db, name, phone, branch, service, day, time))
+
+
+def update_appointment_status(appt_id, status):
+    db = get_database()
+    ok, appt, msg = set_appointment_status(db, appt_id, status)
+    if ok:
+        save_database(db, touched_appointments=[appt])
+    return ok, appt, msg
+
+
+def update_appointments_status(appt_ids, status):
+    db = get_database()
+    changed, errors = set_appointments_status(db, appt_ids, status)
+    if changed:
+        save_database(db, touched_appointments=changed)
+    return changed, errors
+
+
+def available_slots(branch, day):
+    return free_slots(get_database(), branch, day)
+
+
+def list_appointments(page_size=25, after=None, **filters):
+    return appointment_page(get_database(), page_size=page_size, after=after, **filters)
+
+
+# FX: amounts in hundredths of their currency (money.py / fx.py)
+def fx_rates():
+    return fx.table()
+
+
+def convert_amounts(amounts, src, dst):
+    return convert_many(amounts, src, dst)
+
+
+def balances_in(acc_ids, currency):
+    return convert_balances(get_database(), acc_ids, currency)
+
+
+@timed("verify_balances")
+def verify_bank(workers=None, incremental=True):
+    return verify_balances(
+        get_database(), workers=workers, checkpoint=VERIFY_FILE if incremental else None
+    )
+
+
+# Exports: (chunks, content type); the chunks are produced lazily
+def history_export(fmt="csv", **filters):
+    return export_history(get_database(), fmt, **filters), CONTENT_TYPES[fmt]
+
+
+def statement_export(acc_id, start=None, end=None, fmt="csv"):
+    return export_statement(get_database(), acc_id, start, end, fmt), CONTENT_TYPES[fmt]
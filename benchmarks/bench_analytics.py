@@ -0,0 +1,93 @@
+# ============================================================
+# analytics.py (NumPy) vs the list-comprehension way
+# For every size: the one-time column build, then each report with
+# NumPy and the same report as a plain Python pass over db["history"].
+# Run: python benchmarks/bench_analytics.py --history 100000 1000000 3000000
+# ============================================================
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analytics  # noqa: E402
+from generate_data import generate_database  # noqa: E402
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - t0, result
+
+
+def python_daily(db):
+    totals = defaultdict(lambda: defaultdict(int))
+    for h in db["history"]:
+        if h["action"] in ("Deposit", "Withdraw", "Transfer"):
+            totals[h["time"][:10]][h["action"]] += h["amount"]
+    return totals
+
+
+def python_top(db, n=10):
+    volume = defaultdict(int)
+    for h in db["history"]:
+        action = h["action"]
+        if action in ("Create", "Deposit", "Withdraw"):
+            volume[h["account"]] += h["amount"]
+        elif action == "Transfer":
+            volume[h["account"]] += h["amount"]
+            volume[h["to_account"]] += h["amount"]
+    return sorted(volume.items(), key=lambda kv: -kv[1])[:n]
+
+
+def python_net_flow(db, n=10):
+    net = defaultdict(int)
+    for h in db["history"]:
+        if h["action"] == "Transfer":
+            a, b = h["account"], h["to_account"]
+            if a < b:
+                net[a, b] += h["amount"]
+            else:
+                net[b, a] -= h["amount"]
+    return sorted(net.items(), key=lambda kv: -abs(kv[1]))[:n]
+
+
+def bench(history, seed):
+    db = generate_database(max(100, history // 100), history, 0, seed=seed)
+    rows = len(db["history"])
+    build_s, _ = timed(lambda: analytics.history_frame(db))
+
+    results = []
+    for name, fast, slow in (
+        ("daily_totals", lambda: analytics.daily_totals(db), lambda: python_daily(db)),
+        ("top_accounts", lambda: analytics.top_accounts(db, 10), lambda: python_top(db)),
+        ("net_flow", lambda: analytics.net_flow(db, 10), lambda: python_net_flow(db)),
+    ):
+        fast_s, fast_result = timed(fast)
+        slow_s, slow_result = timed(slow)
+        results.append((name, fast_s, slow_s))
+        if name == "top_accounts":
+            assert [t["account"] for t in fast_result] == [k for k, _ in slow_result]
+    return rows, build_s, results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--history", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    for n in args.history:
+        rows, build_s, results = bench(n, args.seed)
+        print(f"{rows} rows: column build {build_s:.2f}s (once, then incremental)")
+        for name, fast_s, slow_s in results:
+            print(
+                f"  {name:<14} numpy {fast_s * 1000:>8.1f} ms   python {slow_s * 1000:>8.1f} ms"
+                f"   x{slow_s / fast_s:.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
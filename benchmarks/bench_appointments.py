@@ -0,0 +1,123 @@
+# ============================================================
+# Appointment booking (appointments.py)
+#   * conflict check: the old loop over db["appointments"] vs the slot
+#     index, at several sizes
+#   * free slots of a branch / day through the index
+#   * one page of the Manage Appointments queue (branch + status filter)
+#     vs filtering the whole list
+#   * race: N threads booking the same slots at once; every slot must end
+#     up with exactly one live booking and every id must be unique
+# Run: python benchmarks/bench_appointments.py --appointments 5000 50000 500000
+# ============================================================
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from appointments import (  # noqa: E402
+    BRANCHES,
+    SERVICES,
+    SLOTS,
+    appointment_page,
+    free_slots,
+    reserve_slot,
+)
+from generate_data import generate_database  # noqa: E402
+from storage import ACTIVE_APPOINTMENT_STATUSES, Database, appointment_slot  # noqa: E402
+
+
+def linear_conflict(db, branch, day, slot):
+    for a in db["appointments"]:
+        if (
+            a["branch"] == branch
+            and a["date"] == day
+            and a["time"] == slot
+            and a["status"] in ["Pending", "Approved"]
+        ):
+            return True
+    return False
+
+
+def per_op(fn, queries):
+    t0 = time.perf_counter()
+    for q in queries:
+        fn(*q)
+    return (time.perf_counter() - t0) / len(queries)
+
+
+def bench(appointments, seed):
+    db = Database(generate_database(100, 100, appointments, seed=seed))
+    t0 = time.perf_counter()
+    db.sync_indexes()
+    build_s = time.perf_counter() - t0
+
+    rnd = random.Random(seed)
+    queries = [
+        (rnd.choice(BRANCHES), a["date"], rnd.choice(SLOTS))
+        for a in rnd.choices(db["appointments"], k=200)
+    ]
+    linear = per_op(lambda b, d, s: linear_conflict(db, b, d, s), queries)
+    indexed = per_op(lambda b, d, s: (b, d, s) in db.slot_index, queries)
+    free = per_op(lambda b, d, s: free_slots(db, b, d), queries)
+    scan_page = per_op(
+        lambda b, d, s: [
+            a for a in db["appointments"] if a["branch"] == b and a["status"] == "Pending"
+        ][:25],
+        queries[:20],
+    )
+    page = per_op(lambda b, d, s: appointment_page(db, 25, branch=b, status="Pending"), queries)
+    print(
+        f"{appointments:>8} appointments: index build {build_s * 1000:.1f} ms | conflict check "
+        f"loop {linear * 1e6:.1f} us, index {indexed * 1e6:.2f} us (x{linear / indexed:.0f}) | "
+        f"free_slots {free * 1e6:.1f} us | queue page scan {scan_page * 1000:.2f} ms, "
+        f"indexed {page * 1000:.2f} ms"
+    )
+
+
+def race(threads, seed):
+    db = Database(generate_database(100, 100, 0, seed=seed))
+    day = "2030-01-01"
+    barrier = threading.Barrier(threads)
+    wins = []
+
+    def worker(n):
+        barrier.wait()
+        for branch in BRANCHES[:3]:
+            for slot in SLOTS:
+                ok, appt, _ = reserve_slot(
+                    db, f"client {n}", "01000000000", branch, SERVICES[0], day, slot
+                )
+                if ok:
+                    wins.append(appt["id"])
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+
+    live = [a for a in db["appointments"] if a["status"] in ACTIVE_APPOINTMENT_STATUSES]
+    slots = {appointment_slot(a) for a in live}
+    assert len(slots) == len(live) == 3 * len(SLOTS), "double booking"
+    assert len(set(wins)) == len(wins), "duplicate ids"
+    print(f"race: {threads} threads x {3 * len(SLOTS)} slots -> {len(wins)} bookings, no double booking")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--appointments", type=int, nargs="+", default=[5_000, 50_000, 500_000])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    for n in args.appointments:
+        bench(n, args.seed)
+    race(args.threads, args.seed)
+
+
+if __name__ == "__main__":
+    main()
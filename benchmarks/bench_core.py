@@ -0,0 +1,175 @@
+# ============================================================
+# Benchmark suite for the banking core
+# For every scale it generates a synthetic bank (generate_data.py) and
+# measures each core operation: ops/sec, p50 / p99 latency and the peak
+# memory allocated while running it (tracemalloc, separate short pass).
+# Results are written as JSON so runs before / after a change can be
+# compared:
+#   python benchmarks/bench_core.py --scales small medium --out before.json
+#   python benchmarks/bench_core.py --compare before.json after.json
+# ============================================================
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_core import (  # noqa: E402
+    Bank_Rafaa,
+    deposit_abo_elgabal,
+    get_account_history_feshawy,
+    get_dashboard_metrics_sobhy,
+)
+from generate_data import generate_database  # noqa: E402
+from storage import JournalStore, write_snapshot  # noqa: E402
+
+SCALES = {
+    "small": {"accounts": 1_000, "history": 10_000, "appointments": 500},
+    "medium": {"accounts": 10_000, "history": 100_000, "appointments": 5_000},
+    "large": {"accounts": 100_000, "history": 1_000_000, "appointments": 50_000},
+}
+MEMORY_PASS_OPS = 50
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+
+def measure(op, ops):
+    samples = []
+    for i in range(ops):
+        t0 = time.perf_counter()
+        op(i)
+        samples.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    for i in range(min(ops, MEMORY_PASS_OPS)):
+        op(i)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    total = sum(samples)
+    return {
+        "ops": ops,
+        "ops_per_sec": round(ops / total, 1) if total else None,
+        "p50_ms": round(percentile(samples, 50) * 1000, 4),
+        "p99_ms": round(percentile(samples, 99) * 1000, 4),
+        "peak_mem_kb": round(peak / 1024, 1),
+    }
+
+
+def bench_scale(name, sizes, ops, seed):
+    rnd = random.Random(seed)
+    results = {"scale": name, **sizes}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "database.json")
+        t0 = time.perf_counter()
+        write_snapshot(path, generate_database(seed=seed, **sizes))
+        results["generate_s"] = round(time.perf_counter() - t0, 2)
+
+        store = JournalStore(path)
+        load_times = []
+        for _ in range(3):
+            t0 = time.perf_counter()
+            db = store.load()
+            load_times.append(time.perf_counter() - t0)
+        results["load_database_s"] = round(min(load_times), 3)
+
+        ids = list(db["accounts"])
+        active = [k for k in ids if db["accounts"][k]["status"] == "Active"]
+        bank = Bank_Rafaa(db)
+        today = date.today().strftime("%Y-%m-%d")
+        operations = {
+            "transfer": lambda i: bank.transfer(*rnd.sample(active, 2), 1.0),
+            "get_account_history": lambda i: get_account_history_feshawy(db, rnd.choice(ids)),
+            "dashboard_metrics": lambda i: get_dashboard_metrics_sobhy(db, day=today),
+            "save_database": lambda i: (
+                deposit_abo_elgabal(db, rnd.choice(active), 1.0),
+                store.commit(db),
+            ),
+        }
+
+        results["operations"] = {}
+        for op_name, op in operations.items():
+            results["operations"][op_name] = measure(op, ops)
+            print(f"  {name:<7} {op_name:<20} {results['operations'][op_name]}")
+        store.wait_for_compaction()
+
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(before_path, after_path):
+    with open(before_path, encoding="utf-8") as f:
+        before = {r["scale"]: r for r in json.load(f)["results"]}
+    with open(after_path, encoding="utf-8") as f:
+        after = {r["scale"]: r for r in json.load(f)["results"]}
+
+    for scale in before.keys() & after.keys():
+        for op, old in before[scale]["operations"].items():
+            new = after[scale]["operations"].get(op)
+            if not new:
+                continue
+            speedup = (new["ops_per_sec"] or 0) / (old["ops_per_sec"] or 1)
+            print(
+                f"{scale:<7} {op:<20} {old['ops_per_sec']:>12} -> {new['ops_per_sec']:>12} ops/s"
+                f"  (x{speedup:.2f})  p99 {old['p99_ms']} -> {new['p99_ms']} ms"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", nargs="+", default=["small", "medium"], choices=SCALES)
+    parser.add_argument("--ops", type=int, default=1000, help="operations per measurement")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=None, help="results file (JSON)")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = [bench_scale(s, SCALES[s], args.ops, args.seed) for s in args.scales]
+    report = {
+        "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "results": results,
+    }
+
+    out = args.out or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        "results",
+        f"core-{datetime.now():%Y%m%d-%H%M%S}.json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    print(f"Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
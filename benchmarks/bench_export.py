@@ -0,0 +1,45 @@
+# ============================================================
+# Streaming export (export.py): time, output size and peak memory of a
+# full history export at several sizes. The peak should stay flat while
+# the history (and the file) grows.
+# Run: python benchmarks/bench_export.py --history 100000 1000000
+# ============================================================
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from export import EXPORT_FORMATS, export_history, parquet_available  # noqa: E402
+from generate_data import generate_database  # noqa: E402
+from storage import Database  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--history", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    formats = [f for f in EXPORT_FORMATS if f != "parquet" or parquet_available()]
+    for n in args.history:
+        db = Database(generate_database(max(100, n // 100), n, 0, seed=args.seed))
+        db.sync_indexes()
+        for fmt in formats:
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            size = sum(len(chunk) for chunk in export_history(db, fmt))
+            elapsed = time.perf_counter() - t0
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(
+                f"{len(db['history']):>9} rows {fmt:<8} {size / 2**20:>8.1f} MB out "
+                f"{elapsed:>6.2f}s  {len(db['history']) / elapsed:>9.0f} rows/s  "
+                f"peak {peak / 2**20:.1f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# ============================================================
+# FX conversion (fx.py)
+#   * one amount at a time, the old way: rates dict rebuilt + two divisions
+#   * convert(): cached table, precomputed cross rate
+#   * convert_many(): a list, then a NumPy array, in one call
+# Run: python benchmarks/bench_fx.py --amounts 1000000
+# ============================================================
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fx import convert, convert_many, fx  # noqa: E402
+
+
+def old_convert(amount, src, dst):
+    currency_rates = {
+        "EGP": 1,
+        "USD": 47.5,
+        "EUR": 55.8,
+        "GBP": 63.8,
+        "SAR": 12.7,
+        "AED": 13.0,
+        "KWD": 155,
+    }
+    return amount * currency_rates[src] / currency_rates[dst]
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--amounts", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    amounts = [rnd.randrange(1, 10**9) for _ in range(args.amounts)]
+    table = fx.table()
+    results = {
+        "old, per amount": timed(lambda: [old_convert(a, "USD", "EGP") for a in amounts]),
+        "convert, per amount": timed(lambda: [convert(a, "USD", "EGP", table) for a in amounts]),
+        "convert_many, list": timed(lambda: convert_many(amounts, "USD", "EGP", table)),
+    }
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+    if np is not None:
+        array = np.array(amounts, dtype=np.int64)
+        results["convert_many, NumPy"] = timed(lambda: convert_many(array, "USD", "EGP", table))
+
+    print(f"{args.amounts} amounts, rates from {table.source}")
+    for name, seconds in results.items():
+        print(f"  {name:<22} {seconds * 1000:>9.1f} ms  {args.amounts / seconds / 1e6:>7.2f} M/s")
+
+
+if __name__ == "__main__":
+    main()
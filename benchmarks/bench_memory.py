@@ -0,0 +1,97 @@
+# ============================================================
+# Memory of the JSON-shaped database vs the compact records (records.py),
+# i.e. the live store with and without BANK_COMPACT_RECORDS=1
+# For every size: json.loads a generated database (so the strings are
+# real separate objects, like after load_database), measures what the
+# history and the accounts take, converts them to HistoryColumns and
+# AccountTable, measures again and checks the round trip gives back the
+# same data.
+# Run: python benchmarks/bench_memory.py --history 10000 100000 1000000
+# ============================================================
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate_data import generate_database  # noqa: E402
+from records import AccountTable, HistoryColumns  # noqa: E402
+
+
+def traced(build):
+    # bytes still allocated by the object build() returns
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, after - before
+
+
+def bench(history, seed):
+    accounts = max(100, history // 100)
+    text = json.dumps(generate_database(accounts, history, 0, seed=seed))
+
+    db, _ = traced(lambda: json.loads(text))
+    _, history_json = traced(lambda: json.loads(json.dumps(db["history"])))
+    _, history_compact = traced(lambda: HistoryColumns.from_rows(db["history"]))
+
+    t0 = time.perf_counter()
+    cols = HistoryColumns.from_rows(db["history"])
+    encode_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    back = cols.to_rows()
+    decode_s = time.perf_counter() - t0
+    assert back == db["history"], "round trip changed the data"
+
+    _, accounts_json = traced(lambda: json.loads(json.dumps(db["accounts"])))
+    # from fresh dicts: the records keep the strings, the dicts are freed
+    table, accounts_compact = traced(
+        lambda: AccountTable.from_dict(json.loads(json.dumps(db["accounts"])))
+    )
+    assert {a: acc.to_dict() for a, acc in table.items()} == db["accounts"], "accounts changed"
+
+    return {
+        "history": history,
+        "accounts": accounts,
+        "history_json_mb": history_json / 2**20,
+        "history_compact_mb": history_compact / 2**20,
+        "bytes_per_row_json": history_json / history,
+        "bytes_per_row_compact": history_compact / history,
+        "accounts_json_mb": accounts_json / 2**20,
+        "accounts_compact_mb": accounts_compact / 2**20,
+        "encode_s": encode_s,
+        "decode_s": decode_s,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--history", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(
+        f"{'rows':>9} {'history json':>13} {'compact':>9} {'B/row':>11} "
+        f"{'accounts':>9} {'json':>9} {'compact':>9} {'encode':>8} {'decode':>8}"
+    )
+    for n in args.history:
+        r = bench(n, args.seed)
+        print(
+            f"{n:>9} {r['history_json_mb']:>10.1f} MB {r['history_compact_mb']:>6.1f} MB "
+            f"{r['bytes_per_row_json']:>5.0f}->{r['bytes_per_row_compact']:<4.0f} "
+            f"{r['accounts']:>9} {r['accounts_json_mb']:>6.1f} MB "
+            f"{r['accounts_compact_mb']:>6.1f} MB "
+            f"{r['encode_s']:>7.2f}s {r['decode_s']:>7.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# ============================================================
+# Integer piastres (money.py) vs Decimal vs float
+#   transfer:  check + debit + credit on two balances
+#   aggregate: total of N history amounts (the dashboard rebuild path)
+# and how far each one's total is from the exact one.
+# Run: python benchmarks/bench_money.py --rows 1000000
+# ============================================================
+import argparse
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from money import format_money  # noqa: E402
+
+
+def best_of(fn, repeat=3):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return min(times), result
+
+
+def transfers(balances, amounts):
+    def run():
+        src, dst = balances
+        for amt in amounts:
+            if src[0] >= amt:
+                src[0] -= amt
+                dst[0] += amt
+        return src[0] + dst[0]
+
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    piastres = [round(rnd.lognormvariate(0, 1.1) * 60_000) for _ in range(args.rows)]
+    kinds = {
+        "int piastres": (piastres, 3_000_000_000_000),
+        "Decimal": ([Decimal(p).scaleb(-2) for p in piastres], Decimal("30000000000.00")),
+        "float": ([p / 100 for p in piastres], 30_000_000_000.0),
+    }
+    exact = sum(piastres)
+
+    print(f"{args.rows} amounts, exact total {format_money(exact)} EGP")
+    print(f"{'':<14} {'transfer':>12} {'aggregate':>12} {'time vs int':>14} {'total error':>16}")
+    baseline = None
+    for name, (amounts, start) in kinds.items():
+        t_transfer, _ = best_of(transfers(([start], [start]), amounts))
+        t_sum, total = best_of(lambda: sum(amounts))
+        if baseline is None:
+            baseline = (t_transfer, t_sum)
+        error = abs(Decimal(total) * (1 if name == "int piastres" else 100) - exact)
+        print(
+            f"{name:<14} {args.rows / t_transfer / 1e6:>8.2f} M/s {args.rows / t_sum / 1e6:>8.1f} M/s"
+            f" {t_transfer / baseline[0]:>6.2f} /{t_sum / baseline[1]:>6.2f}"
+            f" {float(error):>10.6f} pt"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# ============================================================
+# Customer search (search.py)
+#   * index build over all accounts (paid once, by the first search)
+#   * lookups by phone, national ID, email and name prefix (Latin and
+#     Arabic) vs scanning every account and its customer record
+#   * keeping it current: account creates and customer updates per second
+# Run: python benchmarks/bench_search.py --accounts 100000 1000000
+# ============================================================
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_core import (  # noqa: E402
+    add_customer_to_account_batta,
+    create_account_auto_id_eid,
+    search_customers,
+)
+from generate_data import generate_database  # noqa: E402
+from search import normalize_name  # noqa: E402
+from storage import Database  # noqa: E402
+
+
+def scan(db, query):
+    # what finding a customer costs without the index
+    q = normalize_name(query)
+    found = []
+    for acc_id, acc in db["accounts"].items():
+        customer = acc.get("customer") or {}
+        fields = (acc.get("phone"), acc.get("national_id"), customer.get("phone"), customer.get("email"))
+        if query in fields or q in normalize_name(acc.get("name", "")):
+            found.append(acc_id)
+    return found
+
+
+def per_op(fn, queries):
+    t0 = time.perf_counter()
+    for q in queries:
+        fn(q)
+    return (time.perf_counter() - t0) / len(queries)
+
+
+def bench(n, seed):
+    db = Database(generate_database(n, 0, 0, seed=seed))
+    rnd = random.Random(seed)
+    ids = list(db["accounts"])
+    for acc_id in rnd.sample(ids, min(len(ids), 1000)):
+        acc = db["accounts"][acc_id]
+        add_customer_to_account_batta(db, acc_id, acc["name"], acc["phone"], f"c{acc_id}@example.com")
+
+    t0 = time.perf_counter()
+    search_customers(db, "x")
+    build_s = time.perf_counter() - t0
+
+    sample = [db["accounts"][a] for a in rnd.sample(ids, 200)]
+    kinds = {
+        "phone": [a["phone"] for a in sample],
+        "national id": [a["national_id"] for a in sample],
+        "email": [f"c{a}@example.com" for a in rnd.sample(ids, 200)],
+        "name": [a["name"].split()[0][:3] for a in sample],
+        "arabic": ["احمد", "مصط", "محمد علي", "نور"] * 50,
+    }
+    line = f"{n:>8} accounts: build {build_s:.2f}s |"
+    for kind, queries in kinds.items():
+        line += f" {kind} {per_op(lambda q: search_customers(db, q), queries) * 1e6:.0f} us |"
+    line += f" scan {per_op(lambda q: scan(db, q), kinds['phone'][:3]) * 1000:.0f} ms |"
+
+    t0 = time.perf_counter()
+    for i in range(1000):
+        create_account_auto_id_eid(db, "Nour Hamdy", "01011112222")
+    for acc_id in ids[:1000]:
+        add_customer_to_account_batta(db, acc_id, "Laila Adel", "01055556666", f"u{acc_id}@example.com")
+    search_customers(db, "laila")
+    line += f" 2000 writes kept current {(time.perf_counter() - t0) * 1000:.0f} ms"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--accounts", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    for n in args.accounts:
+        bench(n, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# ============================================================
+# Startup: whole-file load vs lazy history (lazy_history.py)
+# For every size the same bank (1000 accounts) is written both ways, then
+# each is opened in a fresh process, which reports:
+#   load      JournalStore.load() (what a cold start / new process pays)
+#   rss       resident memory right after the load
+#   page      then the first History page (builds the history indexes
+#             on the lazy side, once per process)
+# Run: python benchmarks/bench_startup.py --history 100000 1000000 3000000
+# ============================================================
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate_data import generate_database  # noqa: E402
+from storage import JournalStore, write_snapshot  # noqa: E402
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(path, lazy):
+    # runs in its own process
+    from bank_core import history_page
+
+    t0 = time.perf_counter()
+    db = JournalStore(path, lazy_history=lazy).load()
+    load_s = time.perf_counter() - t0
+    rss = rss_mb()
+    t0 = time.perf_counter()
+    history_page(db, page_size=50)
+    page_s = time.perf_counter() - t0
+    print(json.dumps({"load_s": load_s, "rss_mb": rss, "page_s": page_s}))
+
+
+def run_child(path, lazy):
+    out = subprocess.check_output(
+        [sys.executable, os.path.abspath(__file__), "--child", path] + (["--lazy"] if lazy else [])
+    )
+    return json.loads(out)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--history", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--child")
+    parser.add_argument("--lazy", action="store_true")
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.lazy)
+        return
+
+    print(f"{'rows':>9} {'mode':<6} {'load':>9} {'rss':>9} {'1st page':>10}")
+    for n in args.history:
+        with tempfile.TemporaryDirectory() as tmp:
+            whole = os.path.join(tmp, "whole", "database.json")
+            split = os.path.join(tmp, "split", "database.json")
+            os.makedirs(os.path.dirname(whole))
+            os.makedirs(os.path.dirname(split))
+            data = generate_database(1000, n, 0, seed=args.seed)
+            rows = len(data["history"])
+            write_snapshot(whole, data)
+            write_snapshot(split, data)
+            del data
+            store = JournalStore(split, lazy_history=True)
+            store.load()  # splits the snapshot
+            store.close()
+
+            for mode, path, lazy in (("whole", whole, False), ("lazy", split, True)):
+                r = run_child(path, lazy)
+                print(
+                    f"{rows:>9} {mode:<6} {r['load_s'] * 1000:>7.0f}ms {r['rss_mb']:>7.1f}MB"
+                    f" {r['page_s'] * 1000:>8.0f}ms"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# ============================================================
+# Storage benchmark: per-operation save latency vs. history size
+# Compares the old full rewrite of database.json against the journal store.
+# Run: python benchmarks/bench_storage.py [--rows 10000 100000 1000000] [--ops 3000]
+# ============================================================
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from money import MONEY_UNIT  # noqa: E402
+from storage import JournalStore  # noqa: E402
+
+ACCOUNTS = 1000
+LEGACY_SAMPLES = 5
+
+
+def make_database(rows):
+    accounts = {
+        str(1001 + i): {
+            "name": f"Customer {i}",
+            "phone": f"010{i:08d}",
+            "national_id": "",
+            "balance": 1_000_000,
+            "status": "Active",
+            "created_at": "2025-01-01 09:00:00",
+        }
+        for i in range(ACCOUNTS)
+    }
+    ids = list(accounts)
+    start = datetime(2025, 1, 1)
+    history = [
+        {
+            "action": "Deposit",
+            "account": random.choice(ids),
+            "to_account": None,
+            "amount": 10_000,
+            "time": (start + timedelta(seconds=30 * i)).strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        for i in range(rows)
+    ]
+    return {
+        "accounts": accounts,
+        "history": history,
+        "appointments": [],
+        "meta": {"money_unit": MONEY_UNIT},
+    }
+
+
+def one_operation(db):
+    acc_id = random.choice(list(db["accounts"]))
+    db["accounts"][acc_id]["balance"] += 100
+    db["history"].append(
+        {
+            "action": "Deposit",
+            "account": acc_id,
+            "to_account": None,
+            "amount": 100,
+            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+    )
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+
+def summary(samples):
+    return {
+        "ops": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3),
+    }
+
+
+def bench_legacy(path, db):
+    samples = []
+    for _ in range(LEGACY_SAMPLES):
+        one_operation(db)
+        t0 = time.perf_counter()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(db, f, indent=4, ensure_ascii=False)
+        samples.append(time.perf_counter() - t0)
+    return summary(samples)
+
+
+def bench_journal(path, ops):
+    store = JournalStore(path)
+    db = store.load()
+    samples = []
+    for _ in range(ops):
+        one_operation(db)
+        t0 = time.perf_counter()
+        store.commit(db)
+        samples.append(time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    store.wait_for_compaction()
+    result = summary(samples)
+    result["compaction_drain_s"] = round(time.perf_counter() - t0, 3)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--ops", type=int, default=3000)
+    parser.add_argument("--out", default=None, help="write results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "database.json")
+            db = make_database(rows)
+            legacy = bench_legacy(path, db)
+            journal = bench_journal(path, args.ops)
+
+        results.append({"history_rows": rows, "full_rewrite": legacy, "journal": journal})
+        print(
+            f"{rows:>9} rows | full rewrite p99 {legacy['p99_ms']:>10.2f} ms"
+            f" | journal p50 {journal['p50_ms']:.2f} ms p99 {journal['p99_ms']:.2f} ms"
+            f" max {journal['max_ms']:.2f} ms"
+        )
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
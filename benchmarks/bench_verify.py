@@ -0,0 +1,64 @@
+# ============================================================
+# Balance verification (verify.py)
+#   * full replay, in process and with a pool of N workers
+#   * incremental: a checkpoint, then 1% more history replayed from it
+#   * a corrupted balance has to be reported
+# Run: python benchmarks/bench_verify.py --history 1000000 3000000 --workers 4
+# ============================================================
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_core import deposit_abo_elgabal  # noqa: E402
+from generate_data import generate_database  # noqa: E402
+from storage import Database  # noqa: E402
+from verify import verify_balances  # noqa: E402
+
+
+def bench(n, workers, seed):
+    db = Database(generate_database(1000, n, 0, seed=seed))
+    rows = len(db["history"])
+    line = f"{rows:>9} rows:"
+    for w in sorted({1, workers}):
+        t0 = time.perf_counter()
+        report = verify_balances(db, workers=w)
+        assert not report["mismatches"], report["mismatches"][:5]
+        line += f" {w} worker(s) {time.perf_counter() - t0:.2f}s |"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        checkpoint = os.path.join(tmp, "verify.json")
+        verify_balances(db, workers=workers, checkpoint=checkpoint)
+        rnd = random.Random(seed)
+        ids = list(db["accounts"])
+        for _ in range(max(1, rows // 100)):
+            deposit_abo_elgabal(db, rnd.choice(ids), 100)
+        t0 = time.perf_counter()
+        report = verify_balances(db, workers=workers, checkpoint=checkpoint)
+        assert report["from_checkpoint"] and not report["mismatches"]
+        line += f" incremental ({report['replayed']} rows) {time.perf_counter() - t0:.3f}s |"
+
+    acc = next(iter(db["accounts"].values()))
+    acc["balance"] += 1
+    report = verify_balances(db, workers=workers)
+    assert len(report["mismatches"]) == 1 and report["mismatches"][0]["diff"] == 1
+    print(line + " corruption found")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--history", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    for n in args.history:
+        bench(n, args.workers, args.seed)
+
+
+if __name__ == "__main__":
+    main()
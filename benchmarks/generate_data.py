@@ -0,0 +1,213 @@
+# ============================================================
+# Synthetic database.json generator
+# Builds a bank that looks like ours, just bigger:
+#   * a few accounts do most of the activity (Zipf-like weights)
+#   * amounts are log-normal (many small, few very large)
+#   * history is a replayable simulation: every balance equals its
+#     Create + Deposits - Withdrawals +/- Transfers, in time order,
+#     working hours only, and no rule of bank_core is broken
+#   * appointments over the 12 branches, at most one live booking per slot
+# Run: python benchmarks/generate_data.py --accounts 10000 --history 1000000
+#          --appointments 5000 --out database.json
+# ============================================================
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from appointments import BRANCHES, SERVICES, SLOTS  # noqa: E402
+from money import MONEY_UNIT  # noqa: E402
+from storage import write_snapshot  # noqa: E402
+
+FIRST_NAMES = [
+    "Ahmed", "Mohamed", "Omar", "Mostafa", "Hassan", "Mahmoud", "Youssef", "Ali",
+    "Sara", "Mona", "Nour", "Laila", "Fatma", "Aya", "Heba", "Salma",
+    "أحمد", "محمد", "عمر", "مصطفى", "سارة", "منى", "نور", "فاطمة",
+]
+LAST_NAMES = [
+    "Hassan", "Ibrahim", "Mahmoud", "Ali", "Saleh", "Fathy", "Nabil", "Adel",
+    "حسن", "إبراهيم", "محمود", "علي",
+]
+
+# share of each event type in the generated history (Create rows come first)
+EVENT_MIX = [
+    ("Deposit", 0.35),
+    ("Withdraw", 0.25),
+    ("Transfer", 0.34),
+    ("Customer Update", 0.03),
+    ("Update Status", 0.03),
+]
+# draws of an account before a Closed one is reopened instead
+REDRAWS = 8
+
+
+def random_phone(rnd):
+    return rnd.choice(("010", "011", "012", "015")) + f"{rnd.randrange(10**8):08d}"
+
+
+def money(rnd, median):
+    # piastres (median given in pounds)
+    return round(rnd.lognormvariate(0, 1.1) * median * 100)
+
+
+def timestamps(rnd, count, start, days):
+    # working hours only (09:00-17:00), sorted
+    secs = sorted(rnd.randrange(days * 8 * 3600) for _ in range(count))
+    out = []
+    for s in secs:
+        day, rest = divmod(s, 8 * 3600)
+        t = start + timedelta(days=day, hours=9, seconds=rest)
+        out.append(t.strftime("%Y-%m-%d %H:%M:%S"))
+    return out
+
+
+def generate_database(accounts=1000, history=100_000, appointments=500, days=365, seed=42):
+    rnd = random.Random(seed)
+    end = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = end - timedelta(days=days - 1)
+
+    ids = [str(1001 + i) for i in range(accounts)]
+    # activity weights: account k is ~1/k^0.8 as busy as the busiest one
+    order = ids[:]
+    rnd.shuffle(order)
+    cum, total = [], 0.0
+    for rank in range(1, accounts + 1):
+        total += 1 / rank**0.8
+        cum.append(total)
+
+    def pick(k=1):
+        return rnd.choices(order, cum_weights=cum, k=k)
+
+    events = [e for e, _ in EVENT_MIX]
+    event_weights = [w for _, w in EVENT_MIX]
+    times = timestamps(rnd, accounts + max(history - accounts, 0), start, days)
+
+    db = {"accounts": {}, "history": [], "appointments": [], "meta": {"money_unit": MONEY_UNIT}}
+    acc_table, rows = db["accounts"], db["history"]
+
+    for acc_id, t in zip(ids, times):
+        balance = max(5000, money(rnd, 5000))
+        acc_table[acc_id] = {
+            "name": f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}",
+            "phone": random_phone(rnd),
+            "national_id": f"{rnd.randrange(10**13, 10**14)}",
+            "balance": balance,
+            "status": "Active",
+            "created_at": t,
+        }
+        rows.append(
+            {"action": "Create", "account": acc_id, "to_account": None, "amount": balance, "time": t}
+        )
+
+    for t in times[accounts:]:
+        event = rnd.choices(events, weights=event_weights)[0]
+        # one row per timestamp, so --history is exact: a Closed account is
+        # redrawn, and if the draws keep landing on closed ones it is
+        # reopened (a legal Update Status) instead of losing the event
+        for _ in range(REDRAWS):
+            acc_id = pick()[0]
+            acc = acc_table[acc_id]
+            if acc["status"] != "Closed":
+                break
+        else:
+            event = "Reopen"
+        row = {"action": event, "account": acc_id, "to_account": None, "amount": 0, "time": t}
+
+        if event == "Reopen":
+            acc["status"] = "Active"
+            row["action"] = "Update Status"
+            rows.append(row)
+            continue
+
+        if event == "Transfer":
+            dst = pick()[0]
+            amount = money(rnd, 800)
+            if (
+                dst == acc_id
+                or acc["status"] != "Active"
+                or acc_table[dst]["status"] not in ("Active", "Frozen")
+                or acc["balance"] < amount
+            ):
+                event = "Deposit"
+            else:
+                acc["balance"] -= amount
+                acc_table[dst]["balance"] += amount
+                row.update(to_account=dst, amount=amount)
+
+        if event == "Withdraw":
+            amount = money(rnd, 500)
+            if acc["status"] != "Active" or acc["balance"] < amount:
+                event = "Deposit"
+            else:
+                acc["balance"] -= amount
+                row["amount"] = amount
+
+        if event == "Update Status":
+            # mostly short freezes; closing is rare
+            acc["status"] = rnd.choices(["Active", "Frozen", "Closed"], weights=[6, 3, 1])[0]
+
+        if event == "Customer Update":
+            acc["customer"] = {
+                "name": acc["name"],
+                "phone": random_phone(rnd),
+                "email": f"customer{acc_id}@example.com",
+            }
+
+        if event == "Deposit":
+            amount = money(rnd, 600)
+            acc["balance"] += amount
+            row["amount"] = amount
+
+        row["action"] = event
+        rows.append(row)
+
+    taken = set()
+    for appt_id in range(1, appointments + 1):
+        day = (start + timedelta(days=rnd.randrange(days + 30))).strftime("%Y-%m-%d")
+        branch, slot = rnd.choice(BRANCHES), rnd.choice(SLOTS)
+        status = rnd.choices(["Pending", "Approved", "Rejected"], weights=[3, 5, 2])[0]
+        if status != "Rejected":
+            if (branch, day, slot) in taken:
+                status = "Rejected"
+            else:
+                taken.add((branch, day, slot))
+        db["appointments"].append(
+            {
+                "id": appt_id,
+                "name": rnd.choice(FIRST_NAMES),
+                "phone": random_phone(rnd),
+                "branch": branch,
+                "service": rnd.choice(SERVICES),
+                "date": day,
+                "time": slot,
+                "status": status,
+                "note": "",
+            }
+        )
+
+    return db
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--history", type=int, default=100_000, help="total history rows")
+    parser.add_argument("--appointments", type=int, default=500)
+    parser.add_argument("--days", type=int, default=365, help="history spread over the last N days")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="database.json")
+    args = parser.parse_args()
+
+    db = generate_database(args.accounts, args.history, args.appointments, args.days, args.seed)
+    write_snapshot(args.out, db)
+    print(
+        f"Wrote {args.out}: {len(db['accounts'])} accounts, "
+        f"{len(db['history'])} history rows, {len(db['appointments'])} appointments"
+    )
+
+
+if __name__ == "__main__":
+    main()
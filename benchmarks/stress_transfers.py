@@ -0,0 +1,116 @@
+# ============================================================
+# Concurrency stress test for the banking core
+# Many threads hammer the same shared db with transfers, deposits and
+# withdrawals (and save after each one, like the UI does), then we check:
+#   * total balance == initial + deposits - withdrawals (money is conserved)
+#   * no balance went negative
+#   * every successful operation has exactly one history row
+#   * the journal on disk replays to exactly the same balances
+# Run: python benchmarks/stress_transfers.py [--threads 16] [--ops 2000]
+# ============================================================
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_core import Bank_Rafaa, deposit_abo_elgabal, withdraw_abo_elgabal  # noqa: E402
+from money import format_money, to_piastres  # noqa: E402
+from storage import JournalStore  # noqa: E402
+
+ACCOUNTS = 20
+START_BALANCE = 100_000  # piastres
+
+
+def worker(db, store, ops, seed, totals, lock):
+    rnd = random.Random(seed)
+    bank = Bank_Rafaa(db)
+    ids = list(db["accounts"])
+    deposited = withdrawn = 0
+    succeeded = 0
+
+    for _ in range(ops):
+        kind = rnd.random()
+        amount = float(rnd.randint(1, 300))
+        if kind < 0.7:
+            src, dst = rnd.sample(ids, 2)
+            ok, _ = bank.transfer(src, dst, amount)
+        elif kind < 0.85:
+            ok, _ = deposit_abo_elgabal(db, rnd.choice(ids), amount)
+            if ok:
+                deposited += to_piastres(amount)
+        else:
+            ok, _ = withdraw_abo_elgabal(db, rnd.choice(ids), amount)
+            if ok:
+                withdrawn += to_piastres(amount)
+        if ok:
+            succeeded += 1
+            store.commit(db)
+
+    with lock:
+        totals["deposited"] += deposited
+        totals["withdrawn"] += withdrawn
+        totals["succeeded"] += succeeded
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--ops", type=int, default=2000, help="operations per thread")
+    args = parser.parse_args()
+
+    # switch threads as often as possible to shake out races
+    sys.setswitchinterval(1e-6)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = JournalStore(os.path.join(tmp, "database.json"))
+        db = store.load()
+        for i in range(ACCOUNTS):
+            db["accounts"][str(1001 + i)] = {
+                "name": f"Customer {i}",
+                "phone": f"010{i:08d}",
+                "balance": START_BALANCE,
+                "status": "Active",
+                "created_at": "2025-01-01 09:00:00",
+            }
+        store.compact(db)
+        initial = sum(acc["balance"] for acc in db["accounts"].values())
+
+        totals = {"deposited": 0, "withdrawn": 0, "succeeded": 0}
+        lock = threading.Lock()
+        threads = [
+            threading.Thread(target=worker, args=(db, store, args.ops, seed, totals, lock))
+            for seed in range(args.threads)
+        ]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+        store.close()
+
+        balances = {k: acc["balance"] for k, acc in db["accounts"].items()}
+        final = sum(balances.values())
+        expected = initial + totals["deposited"] - totals["withdrawn"]
+
+        assert final == expected, f"balance not conserved: {final} != {expected}"
+        assert min(balances.values()) >= 0, "negative balance"
+        assert len(db["history"]) == totals["succeeded"], "history rows != successful operations"
+
+        replayed = JournalStore(store.snapshot_path).load()
+        assert {k: acc["balance"] for k, acc in replayed["accounts"].items()} == balances
+        assert len(replayed["history"]) == len(db["history"])
+
+    print(
+        f"OK: {args.threads} threads, {totals['succeeded']} successful operations "
+        f"in {elapsed:.2f}s, total balance conserved ({format_money(final)})"
+    )
+
+
+if __name__ == "__main__":
+    main()
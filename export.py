@@ -0,0 +1,240 @@
+# ============================================================
+# Streaming export: full history and per-account statements
+# A generator pipeline, so memory stays the same whatever the size of
+# the history:
+#   records   history_records(db, **filters)       one dict per row
+#             statement_records(db, acc_id, start, end)   + running balance
+#   encoding  csv_chunks(records, columns)         bytes, chunk by chunk
+#             parquet_chunks(records, columns)     one row group per chunk
+#   sink      export_to_file(path, chunks) / the HTTP API (chunked response)
+#             / the UI (a file under static/, downloaded from the static route)
+# Rows come from bank_core.iter_history (the History filters and the
+# get_account_history_feshawy rows of an account), read lazily.
+# ============================================================
+import csv
+import io
+import os
+from decimal import Decimal
+
+from bank_core import iter_history
+from money import format_money
+
+CHUNK_ROWS = 5000
+EXPORT_FORMATS = ("csv", "parquet")
+
+HISTORY_COLUMNS = ("time", "action", "account", "to_account", "amount")
+STATEMENT_COLUMNS = ("time", "action", "counterparty", "debit", "credit", "balance")
+MONEY_COLUMNS = {"amount", "debit", "credit", "balance"}
+
+
+def parquet_available():
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+# ---------------------------
+# Records
+# ---------------------------
+def history_records(db, start=None, end=None, action=None, acc_id=None):
+    for _, h in iter_history(db, start, end, action, acc_id):
+        yield {c: h.get(c) for c in HISTORY_COLUMNS}
+
+
+def balance_effect(row, acc_id):
+    # (debit, credit) of one history row for acc_id, in piastres
+    action, amount = row["action"], row.get("amount", 0)
+    if action in ("Create", "Deposit"):
+        return 0, amount
+    if action == "Withdraw":
+        return amount, 0
+    if action == "Transfer":
+        if row.get("account") == acc_id:
+            return amount, 0
+        return 0, amount
+    return 0, 0
+
+
+def opening_balance(start, balance):
+    return {
+        "time": start,
+        "action": "Opening Balance",
+        "counterparty": None,
+        "debit": None,
+        "credit": None,
+        "balance": balance,
+    }
+
+
+def statement_records(db, acc_id, start=None, end=None):
+    # every row of the account (as get_account_history_feshawy), with the
+    # balance after it. Rows before `start` only build the opening balance.
+    start = str(start) if start else None
+    end = str(end) if end else None
+    balance = 0
+    opening_sent = False
+
+    for _, h in iter_history(db, acc_id=acc_id):
+        t = h["time"]
+        if end and t[: len(end)] > end:
+            break
+        debit, credit = balance_effect(h, acc_id)
+        balance += credit - debit
+        if start and t < start:
+            continue
+
+        if not opening_sent:
+            opening_sent = True
+            if start:
+                yield opening_balance(start, balance - credit + debit)
+        if h.get("account") == acc_id:
+            counterparty = h.get("to_account")
+        else:
+            counterparty = h.get("account")
+        yield {
+            "time": t,
+            "action": h["action"],
+            "counterparty": counterparty,
+            "debit": debit or None,
+            "credit": credit or None,
+            "balance": balance,
+        }
+
+    if start and not opening_sent:
+        # nothing in the period: the statement is just the opening balance
+        yield opening_balance(start, balance)
+
+
+# ---------------------------
+# Encoders
+# ---------------------------
+def batched(records, size=CHUNK_ROWS):
+    batch = []
+    for r in records:
+        batch.append(r)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def csv_chunks(records, columns, chunk_rows=CHUNK_ROWS):
+    # UTF-8 with BOM so Excel shows the Arabic names; money as plain decimals
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    first = True
+    money = [c in MONEY_COLUMNS for c in columns]
+
+    for batch in batched(records, chunk_rows):
+        for r in batch:
+            writer.writerow(
+                [
+                    ("" if r[c] is None else format_money(r[c], thousands=False)) if m else r[c]
+                    for c, m in zip(columns, money)
+                ]
+            )
+        data = buf.getvalue().encode("utf-8-sig" if first else "utf-8")
+        buf.seek(0)
+        buf.truncate()
+        first = False
+        yield data
+
+    if first:  # no rows: just the header
+        yield buf.getvalue().encode("utf-8-sig")
+
+
+class _Drain(io.RawIOBase):
+    # file-like sink for ParquetWriter; the bytes are taken after each chunk
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.parts.append(bytes(b))
+        self.size += len(b)
+        return len(b)
+
+    def tell(self):
+        return self.size
+
+    def take(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def parquet_chunks(records, columns, chunk_rows=CHUNK_ROWS):
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow).")
+
+    money_type = pa.decimal128(20, 2)
+    schema = pa.schema(
+        [(c, money_type if c in MONEY_COLUMNS else pa.string()) for c in columns]
+    )
+    cent = pa.scalar(Decimal("0.01"), pa.decimal128(3, 2))
+
+    def column(batch, c):
+        values = [r[c] for r in batch]
+        if c not in MONEY_COLUMNS:
+            return pa.array(values, pa.string())
+        # exact: int piastres -> decimal * 0.01
+        return pc.multiply(pa.array(values, pa.int64()).cast(pa.decimal128(20, 0)), cent).cast(
+            money_type
+        )
+
+    sink = _Drain()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for batch in batched(records, chunk_rows):
+            writer.write_table(pa.table([column(batch, c) for c in columns], schema=schema))
+            yield sink.take()
+    yield sink.take()  # footer
+
+
+def encode(records, columns, fmt="csv", chunk_rows=CHUNK_ROWS):
+    if fmt == "csv":
+        return csv_chunks(records, columns, chunk_rows)
+    if fmt == "parquet":
+        return parquet_chunks(records, columns, chunk_rows)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+def export_history(db, fmt="csv", **filters):
+    return encode(history_records(db, **filters), HISTORY_COLUMNS, fmt)
+
+
+def export_statement(db, acc_id, start=None, end=None, fmt="csv"):
+    return encode(statement_records(db, acc_id, start, end), STATEMENT_COLUMNS, fmt)
+
+
+# ---------------------------
+# Sinks
+# ---------------------------
+def export_to_file(path, chunks):
+    size = 0
+    try:
+        with open(path, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return size
@@ -1,6 +1,6 @@
 # ============================================================
-# Bank Management System (Single File Version)
-# Streamlit + JSON
+# Bank Management System (Streamlit UI)
+# The banking logic lives in bank_core.py, storage in storage.py.
 # Each section is labeled with the team member name.
 # File name suggestion: bank_system.py
 # Run: py -3.12 -m streamlit run final2.py
@@ -11,359 +11,233 @@
 # المكاتب المستخدمه في البروجيكت
 # =========================================
 import streamlit as st
-from datetime import datetime, date
-import json
+from datetime import datetime, date, timedelta
 import os
 import base64
-
-
-# =========================================
-# دي داله تحول الصوره ل Binary
-# =========================================
-def set_background(image_path: str):
-    with open(image_path, "rb") as f:
-        img = base64.b64encode(f.read()).decode()
-
-
-
-
-# =========================================
-# استخدمنا css عشان نظبط شكل الصوره 
-# =========================================
-    st.markdown(
-        f"""
-    <style>
-    /* background image */
-    .stApp {{
-        background-image: url("data:image/png;base64,{img}");
-        background-size: cover;
-        background-position: center;
-        background-attachment: fixed;
-    }}
-    </style>
-    """,
-        unsafe_allow_html=True,
-    )
-st.write(
-    "Welcome To The Bank. 👋 You can visit our website (https://bms-mufai.streamlit.app/)."
+import html
+import secrets
+import shutil
+import time
+from urllib.parse import quote
+
+from analytics import net_flow, top_accounts
+from appointments import (
+    APPOINTMENT_STATUSES,
+    BRANCHES,
+    SERVICES,
+    appointment_page,
+    free_slots,
+    reserve_slot,
+    set_appointments_status,
+    status_counts,
 )
+from bank_core import (
+    Bank_Rafaa,
+    add_customer_to_account_batta,
+    create_account_auto_id_eid,
+    deposit_abo_elgabal,
+    get_account_history_feshawy,
+    get_dashboard_metrics_sobhy,
+    history_page,
+    parse_batch_csv,
+    post_batch,
+    search_customers,
+    update_status_eid,
+    withdraw_abo_elgabal,
+)
+from bank_service import get_database, save_database, verify_bank
+from export import (
+    CONTENT_TYPES,
+    EXPORT_FORMATS,
+    export_history,
+    export_statement,
+    export_to_file,
+    parquet_available,
+)
+from fx import CURRENCIES, convert, convert_many, convert_to_all, fx
+from metrics import ENABLED as METRICS_ENABLED, prometheus_text, snapshot, timer
+from money import format_money, to_piastres, to_pounds
+from stats import DAILY_ACTIONS, daily_range
 
 
-# ============================================================
-# Database
-# ============================================================
-DB_FILE = "database.json"
-def load_database():
-    if os.path.exists(DB_FILE):
-        with open(DB_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-            if "accounts" not in data:
-                data["accounts"] = {}
-            if "history" not in data:
-                data["history"] = []
-            if "appointments" not in data:
-                data["appointments"] = []  # ✅ السطر المهم
-
-            return data
-
-    return {"accounts": {}, "history": [], "appointments": []}
-
-
-def save_database(data):
-    with open(DB_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
-
-
-def add_history(db, action, account_id, amount=0, to_acc=None):
-    db["history"].append(
-        {
-            "action": action,
-            "account": account_id,
-            "to_account": to_acc,
-            "amount": float(amount),
-            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        }
-    )    
-
-
-# ============================================================
-#  محمد رافع
-# منطق التحويل , نفس الحساب ,
-# ============================================================
-class Account_Rafaa:
-    def __init__(self, acc_id, owner, balance=0.0, status="Active"):
-        self.acc_id = acc_id
-        self.owner = owner
-        self.balance = float(balance)
-        self.status = status
-        
-    def is_active(self):
-        return self.status == "Active"
-
-    def can_receive(self):
-        return self.status in ("Active", "Frozen")
-
-    def __repr__(self):
-        return f"{self.acc_id}:{self.balance:.2f}({self.status})"
-
-
-class Bank_Rafaa:
-    def __init__(self, db):
-        self.db = db
-        self.accounts = db["accounts"]
-
-    def get(self, acc_id):
-        return self.accounts.get(acc_id)
-
-    def transfer(self, src, dst, amt):
-        if src == dst:
-            return False, "You can't transfer to the same account."
-
-        s = self.get(src)
-        r = self.get(dst)
-
-        if not s or not r:
-            return False, "One of the accounts does not exist."
-
-        if amt <= 0:
-            return False, "Amount must be greater than 0 LE."
-
-        if s.get("status") != "Active":
-            return False, f"Source account is not active ({s.get('status')})."
-
-        if r.get("status") not in ("Active", "Frozen"):
-            return (
-                False,
-                f"Reciver account does not accept transfers ({r.get('status')}).",
-            )
-
-        if s.get("balance", 0) < amt:
-            return False, "Insufficient balance."
-
-        
-        s["balance"] -= float(amt)
-        r["balance"] += float(amt)
-
-        add_history(self.db, "Transfer", src, amt, to_acc=dst)
-        return True, f"Transferred {amt:.2f} EGP from {src} to {dst}."
-
+# history rows hold integer piastres; shown as pounds
+def display_rows(rows):
+    return [{**h, "amount": format_money(h.get("amount", 0))} for h in rows]
 
-# ============================================================
-# Author: مصطفى عيد
-# صحه البيانات , انشاء , تحديث  , حفظ
-# ============================================================
-def validate_name_eid(name: str) -> bool:
-    return bool(name.strip()) and all(c.isalpha() or c.isspace() for c in name)
 
+# export: the file is streamed chunk by chunk (export.py) into
+# static/exports/<random token>/ and linked, so the browser downloads it from
+# Streamlit's static file route and the app never holds it in memory.
+# One file per session and key: the previous one is deleted when a new
+# export is made, and exports older than EXPORT_TTL are swept.
+# Without static serving, st.download_button has to read the file into
+# memory, so that path is capped at INLINE_EXPORT_MAX bytes.
+EXPORT_TTL = 3600
+INLINE_EXPORT_MAX = 50 * 1024 * 1024
 
-def validate_phone_eid(phone: str) -> bool:
-    phone = str(phone).strip()
-    if not phone.isdigit():
-        return False
-    if len(phone) != 11:
-        return False
-    if not phone.startswith(("010", "011", "012", "015")):
-        return False
-    return True
 
+def _drop_export(path):
+    shutil.rmtree(os.path.dirname(path), ignore_errors=True)
 
-def generate_account_id_eid(db, start_from=1001) -> str:
-    accounts = db.get("accounts", {})
-    if not accounts:
-        return str(start_from)
 
-    numeric_ids = []
-    for k in accounts.keys():
+def _sweep_exports(export_dir):
+    now = time.time()
+    for token in os.listdir(export_dir):
+        folder = os.path.join(export_dir, token)
         try:
-            numeric_ids.append(int(k))
-        except ValueError:
+            if now - os.path.getmtime(folder) > EXPORT_TTL:
+                shutil.rmtree(folder, ignore_errors=True)
+        except OSError:
             pass
 
-    if not numeric_ids:
-        return str(start_from)
-
-    return str(max(numeric_ids) + 1)
-
-
-def create_account_auto_id_eid(db, name, phone, national_id="", balance=50.0):
-    if not validate_name_eid(name):
-        return False, None, "Invalid name (letters and spaces only)."
 
-    if not validate_phone_eid(phone):
-        return (
-            False,
-            None,
-            "Invalid phone number (Must begain with 010 | 011 | 012 | 015). ",
+def export_controls(key, make_chunks, file_stem):
+    formats = [f for f in EXPORT_FORMATS if f != "parquet" or parquet_available()]
+    fmt = st.selectbox("Format:", formats, key=f"{key}_fmt")
+    if st.button("Prepare export", key=f"{key}_btn"):
+        old = st.session_state.pop(key, None)
+        if old:
+            _drop_export(old[0])
+        export_dir = os.path.join(STATIC_DIR, "exports")
+        os.makedirs(export_dir, exist_ok=True)
+        _sweep_exports(export_dir)
+        token = secrets.token_urlsafe(16)
+        file_name = f"{file_stem}.{fmt}"
+        os.makedirs(os.path.join(export_dir, token))
+        path = os.path.join(export_dir, token, file_name)
+        export_to_file(path, make_chunks(fmt))
+        st.session_state[key] = (path, file_name, fmt)
+
+    ready = st.session_state.get(key)
+    if not ready or not os.path.exists(ready[0]):
+        return
+    path, file_name, fmt = ready
+    if st.get_option("server.enableStaticServing"):
+        token = os.path.basename(os.path.dirname(path))
+        url = f"app/static/exports/{token}/{quote(file_name)}"
+        st.markdown(
+            f'<a href="{url}" download="{html.escape(file_name)}">'
+            f"⬇️ Download {html.escape(file_name)}</a>",
+            unsafe_allow_html=True,
         )
-
-    acc_id = generate_account_id_eid(db)
-
-    db["accounts"][acc_id] = {
-        "name": name,
-        "phone": phone,
-        "national_id": national_id,
-        "balance": float(balance),
-        "status": "Active",
-        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-    }
-
-    add_history(db, "Create", acc_id, amount=float(balance))
-    return True, acc_id, "Account created successfully ✅"
-
-
-def update_status_eid(db, acc_id, new_status):
-    acc = db["accounts"].get(acc_id)
-    if not acc:
-        return False, "Account not found."
-
-    if new_status not in ("Active", "Frozen", "Closed"):
-        return False, "Invalid status."
-
-    acc["status"] = new_status
-    add_history(db, "Update Status", acc_id, amount=0)
-    return True, f"Status updated to {new_status} ✅"
-
-
-# ============================================================
-# Author: أبو الجبل
-#  سحب ايداع حاله حفظ
-# ============================================================
-def deposit_abo_elgabal(db, acc_id, amount):
-    if amount <= 0:
-        return False, "Invalid deposit amount."
-
-    acc = db["accounts"].get(acc_id)
-    if not acc:
-        return False, "Account not found."
-
-    # If Closed, no operations are allowed
-    if acc.get("status") == "Closed":
-        return False, "Account is Closed and does not accept operations."
-
-    acc["balance"] += float(amount)
-    add_history(db, "Deposit", acc_id, amount=float(amount))
-    return True, f"Deposited {amount:.2f} EGP ✅"
-
-
-def withdraw_abo_elgabal(db, acc_id, amount):
-    if amount <= 0:
-        return False, "Invalid withdrawal amount."
-
-    acc = db["accounts"].get(acc_id)
-    if not acc:
-        return False, "Account not found."
-
-    # Active فقط للسحب
-    if acc.get("status") != "Active":
-        return (
-            False,
-            f"Account is not active ({acc.get('status')}) and does not allow withdrawal.",
+    elif os.path.getsize(path) > INLINE_EXPORT_MAX:
+        st.warning(
+            f"{file_name} is too large to download here; enable static serving "
+            "or use the API export (GET /history/export)."
         )
+    else:
+        with open(path, "rb") as f:
+            st.download_button(
+                f"⬇️ Download {file_name}",
+                f,
+                file_name=file_name,
+                mime=CONTENT_TYPES[fmt],
+                key=f"{key}_download",
+            )
 
-    if acc["balance"] < float(amount):
-        return False, "Insufficient balance."
-
-    acc["balance"] -= float(amount)
-    add_history(db, "Withdraw", acc_id, amount=float(amount))
-    return True, f"Withdrawn {amount:.2f} EGP ✅"
-
-
-# ============================================================
-# Author: مصطفى الفيشاوي
-# Transaction history helpers (account history / filters)
-# ============================================================
-def get_account_history_feshawy(db, acc_id):
-    return [
-        h
-        for h in db["history"]
-        if h.get("account") == acc_id or h.get("to_account") == acc_id
-    ]
-
-
-# ============================================================
-# Author: صبحي
-# Dashboard metrics (based on real db not random)
-# ============================================================
 
+# =========================================
+# صورة الخلفية
+# The image is served once as a static file (./static, enableStaticServing
+# in .streamlit/config.toml) so the browser caches it; every rerun only
+# sends the small CSS below, which is itself built once per process.
+# A downscaled WebP copy is made at startup when Pillow is installed.
+# =========================================
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+BACKGROUND_MAX_SIZE = (1920, 1080)
+
+
+def _is_fresh(target, source):
+    return os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source)
+
+
+def publish_background(image_path: str) -> str:
+    os.makedirs(STATIC_DIR, exist_ok=True)
+    name = os.path.splitext(os.path.basename(image_path))[0]
+
+    try:
+        from PIL import Image
+    except ImportError:
+        Image = None
+
+    if Image is not None:
+        target = os.path.join(STATIC_DIR, name + ".webp")
+        if not _is_fresh(target, image_path):
+            with Image.open(image_path) as img:
+                img.thumbnail(BACKGROUND_MAX_SIZE)
+                img.save(target, "WEBP", quality=80)
+    else:
+        target = os.path.join(STATIC_DIR, os.path.basename(image_path))
+        if not _is_fresh(target, image_path):
+            shutil.copyfile(image_path, target)
+
+    return "app/static/" + os.path.basename(target)
+
+
+@st.cache_resource
+def background_css(image_path: str) -> str:
+    if st.get_option("server.enableStaticServing"):
+        url = publish_background(image_path)
+    else:
+        # static serving turned off: fall back to inlining, still only
+        # encoded once per process
+        with open(image_path, "rb") as f:
+            url = "data:image/png;base64," + base64.b64encode(f.read()).decode()
+
+    # =========================================
+    # استخدمنا css عشان نظبط شكل الصوره
+    # =========================================
+    return f"""
+    <style>
+    /* background image */
+    .stApp {{
+        background-image: url("{url}");
+        background-size: cover;
+        background-position: center;
+        background-attachment: fixed;
+    }}
+    </style>
+    """
 
-def get_dashboard_metrics_sobhy(db):
-    accounts = db["accounts"]
-    history = db["history"]
 
-    total_accounts = len(accounts)
-    total_balance = sum(acc.get("balance", 0) for acc in accounts.values())
+def set_background(image_path: str):
+    st.markdown(background_css(image_path), unsafe_allow_html=True)
 
-    today_str = date.today().strftime("%Y-%m-%d")
-    today_deposits = sum(
-        h["amount"]
-        for h in history
-        if h["action"] == "Deposit" and h["time"].startswith(today_str)
-    )
-    today_withdraws = sum(
-        h["amount"]
-        for h in history
-        if h["action"] == "Withdraw" and h["time"].startswith(today_str)
-    )
-    today_transfers = sum(
-        h["amount"]
-        for h in history
-        if h["action"] == "Transfer" and h["time"].startswith(today_str)
-    )
 
-    return {
-        "total_accounts": total_accounts,
-        "total_balance": total_balance,
-        "today_deposits": today_deposits,
-        "today_withdraws": today_withdraws,
-        "today_transfers": today_transfers,
-    }
+st.write(
+    "Welcome To The Bank. 👋 You can visit our website (https://bms-mufai.streamlit.app/)."
+)
 
 
 # ============================================================
-# Author: بطه
-# Customer data validation + attach to account
+# Streamlit UI (Main App)
 # ============================================================
-def validate_customer_batta(name: str, phone: str, email: str) -> bool:
-    if name == "" or phone == "" or email == "":
-        return False
-    if not str(phone).isdigit():
-        return False
-    if "@" not in email:
-        return False
-    return True
+st.set_page_config(page_title="Bank Management System", layout="wide")
 
+set_background("bg5.png")
+st.title("🏦 Bank Management System")
 
-def add_customer_to_account_batta(db, acc_id: str, name: str, phone: str, email: str):
-    if acc_id not in db["accounts"]:
-        return False, "Account not found."
+# one in-memory database for the whole process, shared by every session
+db = get_database()
 
-    if not validate_customer_batta(name, phone, email):
-        return False, "Invalid customer data."
 
-    db["accounts"][acc_id]["customer"] = {"name": name, "phone": phone, "email": email}
-    add_history(db, "Customer Update", acc_id, amount=0)
-    return True, "Customer data saved successfully ✅"
+# optional: serve the HTTP/JSON API (bank_api.py) from this process too,
+# so it works on the same in-memory database as the UI
+@st.cache_resource
+def start_api(port: int):
+    import bank_api
 
+    return bank_api.start_in_thread(os.environ.get("BANK_API_HOST", "127.0.0.1"), port)
 
-# ============================================================
-# Streamlit UI (Main App)
-# ============================================================
-st.set_page_config(page_title="Bank Management System", layout="wide")
-
-set_background("bg5.png")
-st.title("🏦 Bank Management System")
 
-# Session init
-if "db" not in st.session_state:
-    st.session_state.db = load_database()
+if os.environ.get("BANK_API_PORT"):
+    start_api(int(os.environ["BANK_API_PORT"]))
 
 if "role" not in st.session_state:
     st.session_state.role = "customer"
     st.session_state.username = "customer"
     st.session_state.logged_in = False
 
-db = st.session_state.db
 db.setdefault("accounts", {})
 db.setdefault("history", [])
 db.setdefault("appointments", [])
@@ -409,6 +283,7 @@ if st.session_state.role in ["admin", "employee"]:
         "Deposit",
         "Withdraw",
         "Transfer",
+        "Upload Batch",
         "Account Details",
         "Customer Data",
         "History",
@@ -419,6 +294,9 @@ if st.session_state.role in ["admin", "employee"]:
 else:
     tab_names = ["Open Account", "Currency Exchange", "Book Appointment"]
 
+if st.session_state.role == "admin":
+    tab_names.append("Performance")
+
 
 tabs = st.tabs(tab_names)
 accounts = db["accounts"]
@@ -428,21 +306,68 @@ bank_rafaa = Bank_Rafaa(db)
 # Dashboard (صبحي)
 # ---------------------------
 if "Dashboard" in tab_names:
-    with tabs[tab_names.index("Dashboard")]:
+    with tabs[tab_names.index("Dashboard")], timer("tab:Dashboard"):
         st.header("📊 Dashboard")
 
-        metrics = get_dashboard_metrics_sobhy(db)
+        day_val = st.date_input("Day:", value=date.today(), key="dash_day")
+        is_today = day_val == date.today()
+        label = "Today's" if is_today else f"{day_val}"
+
+        metrics = get_dashboard_metrics_sobhy(db, day=str(day_val))
         c1, c2, c3, c4 = st.columns(4)
         c1.metric("Total Accounts", metrics["total_accounts"])
-        c2.metric("Total Balance", f"{metrics['total_balance']:.2f} EGP")
-        c3.metric("Today's Deposits", f"{metrics['today_deposits']:.2f} EGP")
-        c4.metric("Today's Withdrawals", f"{metrics['today_withdraws']:.2f} EGP")
-        st.metric("Today's Transfers", f"{metrics['today_transfers']:.2f} EGP")
+        c2.metric("Total Balance", format_money(metrics["total_balance"], "EGP"))
+        c3.metric(f"{label} Deposits", format_money(metrics["today_deposits"], "EGP"))
+        c4.metric(f"{label} Withdrawals", format_money(metrics["today_withdraws"], "EGP"))
+        st.metric(f"{label} Transfers", format_money(metrics["today_transfers"], "EGP"))
+
+        # total balance in every currency: one conversion each (fx.py)
+        st.write("**Total balance in other currencies**")
+        in_currencies = convert_to_all(metrics["total_balance"], "EGP")
+        fx_cols = st.columns(len(in_currencies) - 1)
+        for col, (currency, value) in zip(
+            fx_cols, [(c, v) for c, v in in_currencies.items() if c != "EGP"]
+        ):
+            col.metric(currency, format_money(value, currency))
+
+        # the 30-day chart reads the per-day totals (stats.py); the rankings
+        # scan the whole history (analytics.py), so they are computed on
+        # request and kept until the data changes
+        st.markdown("---")
+        st.subheader("📈 Last 30 days (EGP)")
+        daily = daily_range(db, day_val - timedelta(days=29), day_val)
+        if daily["day"]:
+            st.line_chart(
+                {"day": daily["day"], **{a: [to_pounds(v) for v in daily[a]] for a in DAILY_ACTIONS}},
+                x="day",
+            )
+        else:
+            st.info("No activity in this period.")
+
+        if st.checkbox("Show account rankings (whole history)", key="dash_rankings"):
+            c1, c2 = st.columns(2)
+            with c1:
+                st.subheader("🏆 Top accounts by volume")
+                top = db.cached("top_accounts", lambda: top_accounts(db, 10))
+                if top:
+                    st.bar_chart(
+                        {
+                            "account": [t["account"] for t in top],
+                            "in": [to_pounds(t["in"]) for t in top],
+                            "out": [to_pounds(t["out"]) for t in top],
+                        },
+                        x="account",
+                    )
+            with c2:
+                st.subheader("🔁 Largest net flows")
+                flows = db.cached("net_flow", lambda: net_flow(db, 10))
+                if flows:
+                    st.table([{**f, "net": format_money(f["net"])} for f in flows])
 
 # ---------------------------
 # فتح حساب (مصطفى عيد)
 # ---------------------------
-with tabs[tab_names.index("Open Account")]:
+with tabs[tab_names.index("Open Account")], timer("tab:Open Account"):
     st.header("➕ Open Account")
 
     name = st.text_input("Customer Name:", key="open_name")
@@ -467,7 +392,7 @@ with tabs[tab_names.index("Open Account")]:
 # تحديث حالة حساب (مصطفى عيد)
 # ---------------------------
 if "Update Account Status" in tab_names:
-    with tabs[tab_names.index("Update Account Status")]:
+    with tabs[tab_names.index("Update Account Status")], timer("tab:Update Account Status"):
         st.header("🧊 Update Account Status (Active / Frozen / Closed)")
 
         if st.session_state.role not in ["admin", "employee"]:
@@ -492,7 +417,7 @@ if "Update Account Status" in tab_names:
 # إيداع (أبو الجبل)
 # ---------------------------
 if "Deposit" in tab_names:
-    with tabs[tab_names.index("Deposit")]:
+    with tabs[tab_names.index("Deposit")], timer("tab:Deposit"):
         st.header("💰 Deposit")
 
         acc_id = st.text_input("Account Number:", key="dep_acc")
@@ -511,7 +436,7 @@ if "Deposit" in tab_names:
 # سحب (أبو الجبل)
 # ---------------------------
 if "Withdraw" in tab_names:
-    with tabs[tab_names.index("Withdraw")]:
+    with tabs[tab_names.index("Withdraw")], timer("tab:Withdraw"):
         st.header("🏧 Withdrawal")
 
         acc_id = st.text_input("Account Number:", key="wd_acc")
@@ -530,7 +455,7 @@ if "Withdraw" in tab_names:
 # تحويل (محمد رافع)
 # ---------------------------
 if "Transfer" in tab_names:
-    with tabs[tab_names.index("Transfer")]:
+    with tabs[tab_names.index("Transfer")], timer("tab:Transfer"):
         st.header("🔁 Transfer Between Accounts")
 
         from_acc = st.text_input("Source Account Number:", key="tr_from")
@@ -546,15 +471,91 @@ if "Transfer" in tab_names:
                 st.error(msg)
 
 
+# ---------------------------
+# تحويلات مجمعة (Upload Batch)
+# ---------------------------
+if "Upload Batch" in tab_names:
+    with tabs[tab_names.index("Upload Batch")], timer("tab:Upload Batch"):
+        st.header("📦 Upload Batch (salaries / bulk payments)")
+        st.caption("CSV columns: src,dst,amount (header row optional)")
+
+        batch_file = st.file_uploader("Batch file:", type=["csv"], key="batch_file")
+        mode = st.radio(
+            "If some rows are invalid:",
+            ["Reject the whole batch", "Post the valid rows only"],
+            key="batch_mode",
+        )
+
+        if batch_file is not None and st.button("Post Batch", key="batch_btn"):
+            rows, errors = parse_batch_csv(batch_file.getvalue().decode("utf-8-sig"))
+            atomic = mode == "Reject the whole batch"
+
+            if atomic and errors:
+                ok, posted = False, 0
+            else:
+                ok, posted, check_errors = post_batch(db, rows, atomic=atomic)
+                errors += check_errors
+
+            if ok and posted:
+                save_database(db)  # one write for the whole batch
+                st.success(f"Posted {posted} of {len(rows)} transfers ✅")
+            elif ok:
+                st.warning("Nothing was posted.")
+            else:
+                st.error("Batch rejected, nothing was posted.")
+
+            if errors:
+                st.write("### Rows with errors")
+                st.table(sorted(errors, key=lambda e: e["row"]))
+
+
 # ---------------------------
 # (تفاصيل: UI عامة + History: مصطفى الفيشاوي)
 # ---------------------------
 if "Account Details" in tab_names:
-    with tabs[tab_names.index("Account Details")]:
+    with tabs[tab_names.index("Account Details")], timer("tab:Account Details"):
         st.header("🔍 Account Details")
+
+        def open_account_details(acc_id):
+            st.session_state.details_acc = acc_id
+            st.session_state.details_open = True
+
+        query = st.text_input(
+            "Find a customer (name, phone, national ID or email):", key="details_query"
+        )
+        if query.strip():
+            found = search_customers(db, query)
+            if not found:
+                st.info("No matching customers.")
+            else:
+                st.table(
+                    [
+                        {
+                            "Account": a,
+                            "Name": accounts[a].get("name", "-"),
+                            "Phone": accounts[a].get("phone", "-"),
+                            "National ID": accounts[a].get("national_id") or "-",
+                            "Email": (accounts[a].get("customer") or {}).get("email", "-"),
+                            "Status": accounts[a].get("status", "-"),
+                        }
+                        for a in found
+                        if a in accounts
+                    ]
+                )
+                f1, f2 = st.columns([3, 1])
+                picked = f1.selectbox("Matching accounts:", found, key="details_pick")
+                f2.button(
+                    "Open",
+                    key="details_pick_btn",
+                    on_click=open_account_details,
+                    args=(picked,),
+                )
+
         acc_id = st.text_input("Account Number to Search:", key="details_acc")
 
-        if st.button("View Details", key="details_btn"):
+        if st.button("View Details", key="details_btn") or st.session_state.pop(
+            "details_open", False
+        ):
             if acc_id not in accounts:
                 st.error("Account not found.")
             else:
@@ -571,7 +572,7 @@ if "Account Details" in tab_names:
 
                 with c2:
                     st.write("### 💰 Balance Information")
-                    st.write(f"**Current Balance:** {acc.get('balance',0):.2f} EGP")
+                    st.write(f"**Current Balance:** {format_money(acc.get('balance', 0), 'EGP')}")
                     st.write(f"**Status:** {acc.get('status','-')}")
 
                 with c3:
@@ -583,15 +584,29 @@ if "Account Details" in tab_names:
                 st.write("### 📜 Account Transaction History")
                 hist = get_account_history_feshawy(db, acc_id)
                 if hist:
-                    st.table(hist)
+                    st.table(display_rows(hist))
                 else:
                     st.info("No transactions for this account.")
 
+        if acc_id in accounts:
+            st.markdown("---")
+            st.write("### 📤 Account Statement (running balance)")
+            s1, s2 = st.columns(2)
+            stmt_start = s1.date_input(
+                "From:", value=date.today().replace(day=1), key="stmt_start"
+            )
+            stmt_end = s2.date_input("To:", value=date.today(), key="stmt_end")
+            export_controls(
+                "stmt_export",
+                lambda fmt: export_statement(db, acc_id, stmt_start, stmt_end, fmt),
+                f"statement-{acc_id}-{stmt_start}-{stmt_end}",
+            )
+
 # ---------------------------
 # بيانات العميل (بطه)
 # ---------------------------
 if "Customer Data" in tab_names:
-    with tabs[tab_names.index("Customer Data")]:
+    with tabs[tab_names.index("Customer Data")], timer("tab:Customer Data"):
         st.header("🪪 Add / Update Customer Data on Account")
 
         acc_id = st.text_input("Account Number:", key="cust_acc")
@@ -611,7 +626,7 @@ if "Customer Data" in tab_names:
 # السجل (History)
 # ---------------------------
 if "History" in tab_names:
-    with tabs[tab_names.index("History")]:
+    with tabs[tab_names.index("History")], timer("tab:History"):
         st.header("📜 History")
 
         col1, col2, col3 = st.columns(3)
@@ -636,46 +651,66 @@ if "History" in tab_names:
         with col3:
             today_only = st.checkbox("Show today's transactions only", key="hist_today")
 
-        filtered = db["history"]
+        page_size = st.selectbox(
+            "Rows per page:", [25, 50, 100, 200], index=1, key="hist_page_size"
+        )
 
-        if action_filter != "All":
-            filtered = [h for h in filtered if h["action"] == action_filter]
+        today_str = date.today().strftime("%Y-%m-%d") if today_only else None
+        filters = {
+            "start": today_str,
+            "end": today_str,
+            "action": None if action_filter == "All" else action_filter,
+            "acc_id": acc_filter or None,
+        }
 
-        if acc_filter:
-            filtered = [
-                h
-                for h in filtered
-                if acc_filter == h.get("account") or acc_filter == h.get("to_account")
-            ]
+        # cursor stack: the "after" cursor of every page visited so far;
+        # changing a filter or the page size starts again from page 1
+        page_key = (tuple(filters.values()), page_size)
+        if st.session_state.get("hist_page_key") != page_key:
+            st.session_state.hist_page_key = page_key
+            st.session_state.hist_cursors = [None]
+        cursors = st.session_state.hist_cursors
 
-        if today_only:
-            today_str = date.today().strftime("%Y-%m-%d")
-            filtered = [h for h in filtered if h["time"].startswith(today_str)]
+        rows, next_cursor, has_more = history_page(
+            db, page_size=page_size, after=cursors[-1], **filters
+        )
 
-        if filtered:
-            st.table(filtered)
+        if rows:
+            st.table(display_rows(rows))
         else:
             st.info("No transactions match the current filters.")
 
+        p1, p2, p3 = st.columns(3)
+        with p1:
+            if st.button("⬅️ Previous", key="hist_prev", disabled=len(cursors) == 1):
+                cursors.pop()
+                st.rerun()
+        with p2:
+            st.write(f"Page {len(cursors)}")
+        with p3:
+            if st.button("Next ➡️", key="hist_next", disabled=not has_more):
+                cursors.append(next_cursor)
+                st.rerun()
+
+        st.markdown("---")
+        st.write("### 📤 Export (current filters, all pages)")
+        export_controls(
+            "hist_export", lambda fmt: export_history(db, fmt, **filters), "history"
+        )
+
 
 # ---------------------------
 # (محمد ايمن)تحويل عملات
 # ---------------------------
 if "Currency Exchange" in tab_names:
-    with tabs[tab_names.index("Currency Exchange")]:
+    with tabs[tab_names.index("Currency Exchange")], timer("tab:Currency Exchange"):
         st.header("💱Currency Exchange")
 
-        currency_list = ["EGP", "USD", "EUR", "GBP", "SAR", "AED", "KWD"]
-        currency_rates = {
-            "EGP": 1,
-            "USD": 47.5,  
-            "EUR": 55.8,   
-            "GBP": 63.8,   
-            "SAR": 12.7,   
-            "AED": 13.0,   
-            "KWD": 155,   
-        }
-        
+        # cached rate table (fx.py): reloaded from the file / feed every few
+        # minutes, not on every rerun
+        currency_list = CURRENCIES
+        rates = fx.table()
+
         amount = st.number_input("Amount", min_value=0.0, value=1.0, key="fx_amt")
         from_currency = st.selectbox(
             "From Currency", currency_list, index=1, key="fx_from"
@@ -683,135 +718,253 @@ if "Currency Exchange" in tab_names:
         to_currency = st.selectbox("To Currency", currency_list, index=0, key="fx_to")
 
         if st.button("Convert", key="fx_btn"):
-            amount_in_egp = amount * currency_rates[from_currency]
-            final_amount = amount_in_egp / currency_rates[to_currency]
+            final_amount = convert(to_piastres(amount), from_currency, to_currency, rates)
 
             st.success(
-                f"{amount:.2f} {from_currency} = {final_amount:.2f} {to_currency}"
+                f"{amount:.2f} {from_currency} = {format_money(final_amount, to_currency)}"
             )
-            st.caption("Note: Rates are approximate and fixed (for testing only).")
+            st.caption("Note: Rates are approximate (for testing only).")
+
+        st.markdown("---")
+        st.write("### 📋 Convert a list of amounts")
+        batch_text = st.text_area(
+            f"Amounts in {from_currency} (one per line):", key="fx_batch"
+        )
+        if st.button("Convert all", key="fx_batch_btn"):
+            try:
+                lines = [line for line in batch_text.splitlines() if line.strip()]
+                amounts = [to_piastres(line) for line in lines]
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                converted = convert_many(amounts, from_currency, to_currency, rates)
+                st.table(
+                    [
+                        {
+                            from_currency: format_money(a),
+                            to_currency: format_money(c),
+                        }
+                        for a, c in zip(amounts, converted)
+                    ]
+                )
+
+        st.markdown("---")
+        st.write("### 💹 Cross rates")
+        st.table(
+            [
+                {"1 unit of": src, **{dst: f"{rates.rate(src, dst):.4f}" for dst in currency_list}}
+                for src in currency_list
+            ]
+        )
+        st.caption(
+            f"Source: {rates.source}"
+            + (f" (updated {rates.updated})" if rates.updated else "")
+            + f", loaded {datetime.fromtimestamp(rates.loaded_at):%H:%M:%S}"
+        )
+        if fx.last_error:
+            st.warning(f"Last rate refresh failed, using the previous rates: {fx.last_error}")
+        if st.button("🔄 Reload rates", key="fx_reload"):
+            fx.refresh()
+            st.rerun()
 
 # ---------------------------
 # حجز موعد 🗓️
 # ---------------------------
 if "Book Appointment" in tab_names:
-    with tabs[tab_names.index("Book Appointment")]:
+    with tabs[tab_names.index("Book Appointment")], timer("tab:Book Appointment"):
         # ...
         st.header("🗓️ Book an Appointment at the Branch")
 
-        branches = [
-            "Nasr City",
-            "New Cairo",
-            "Heliopolis",
-            "Maadi",
-            "Dokki",
-            "Mohandessin",
-            "6th of October",
-            "Giza",
-            "Alexandria - Smouha",
-            "Alexandria - Miami",
-            "Mansoura",
-            "Tanta",
-        ]
-        services = [
-            "Open Account",
-            "Deposit / Withdrawal",
-            "Update Data",
-            "Inquiry",
-            "Complaint",
-        ]
-
         name = st.text_input("Name", key="appt_name")
         phone = st.text_input("Phone Number", key="appt_phone")
-        branch = st.selectbox("Branch", branches, key="appt_branch")
-        service = st.selectbox("Service Type", services, key="appt_service")
+        branch = st.selectbox("Branch", BRANCHES, key="appt_branch")
+        service = st.selectbox("Service Type", SERVICES, key="appt_service")
         date_val = st.date_input("Date", key="appt_date")
-        time_val = st.selectbox(
-            "Time",
-            [
-                "09:00",
-                "09:30",
-                "10:00",
-                "10:30",
-                "11:00",
-                "11:30",
-                "12:00",
-                "12:30",
-                "13:00",
-                "13:30",
-                "14:00",
-            ],
-            key="appt_time",
-        )
+        # only the slots still free at this branch on that day
+        open_slots = free_slots(db, branch, date_val)
+        time_val = st.selectbox("Time", open_slots, key="appt_time")
+        if not open_slots:
+            st.warning("No free time slots left at this branch on this day")
 
         if st.button("Confirm Booking", key="appt_btn"):
-            if not name or not phone:
-                st.error("Please enter your name and phone number")
+            ok, appt, msg = reserve_slot(
+                db, name, phone, branch, service, date_val, time_val
+            )
+            if ok:
+                save_database(db)
+                st.success(msg)
             else:
-                conflict = False
-                for a in db["appointments"]:
-                    if (
-                        a["branch"] == branch
-                        and a["date"] == str(date_val)
-                        and a["time"] == time_val
-                        and a["status"] in ["Pending", "Approved"]
-                    ):
-                        conflict = True
-                        break
-
-                if conflict:
-                    st.error("❌ This time slot is already booked at this branch")
-                else:
-                    new_id = len(db["appointments"]) + 1
-                    db["appointments"].append(
-                        {
-                            "id": new_id,
-                            "name": name,
-                            "phone": phone,
-                            "branch": branch,
-                            "service": service,
-                            "date": str(date_val),
-                            "time": time_val,
-                            "status": "Pending",
-                            "note": "",
-                        }
-                    )
-                    save_database(db)
-                    st.success(
-                        "✅ Appointment booked successfully, awaiting confirmation"
-                    )
+                st.error(msg)
 
 
 # ---------------------------
 # إدارة المواعيد
 # ---------------------------
 if "Manage Appointments" in tab_names:
-    with tabs[tab_names.index("Manage Appointments")]:
+    with tabs[tab_names.index("Manage Appointments")], timer("tab:Manage Appointments"):
         st.header("🛠️ Branch Appointments Management")
 
-        if not db.get("appointments", []):
-            st.info("No appointments yet")
+        counts = status_counts(db)
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Pending", counts["Pending"])
+        c2.metric("Approved", counts["Approved"])
+        c3.metric("Rejected", counts["Rejected"])
+
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            branch_filter = st.selectbox("Branch:", ["All"] + BRANCHES, key="mappt_branch")
+        with col2:
+            status_filter = st.selectbox(
+                "Status:", ["All"] + APPOINTMENT_STATUSES, index=1, key="mappt_status"
+            )
+        with col3:
+            service_filter = st.selectbox("Service:", ["All"] + SERVICES, key="mappt_service")
+        with col4:
+            use_date = st.checkbox("Filter by date", key="mappt_use_date")
+            date_filter = st.date_input("Date:", key="mappt_date") if use_date else None
+
+        page_size = st.selectbox(
+            "Rows per page:", [25, 50, 100], key="mappt_page_size"
+        )
+        filters = {
+            "branch": None if branch_filter == "All" else branch_filter,
+            "day": str(date_filter) if date_filter else None,
+            "status": None if status_filter == "All" else status_filter,
+            "service": None if service_filter == "All" else service_filter,
+        }
+
+        # same cursor stack as the History tab
+        page_key = (tuple(filters.values()), page_size)
+        if st.session_state.get("mappt_page_key") != page_key:
+            st.session_state.mappt_page_key = page_key
+            st.session_state.mappt_cursors = [None]
+        cursors = st.session_state.mappt_cursors
+
+        rows, next_cursor, has_more = appointment_page(
+            db, page_size=page_size, after=cursors[-1], **filters
+        )
+
+        if not rows:
+            st.info("No appointments match the current filters.")
         else:
-            for a in db["appointments"]:
-                st.markdown("---")
-                st.write(f"🆔 Booking ID: {a['id']}")
-                st.write(f"👤 Name: {a['name']}")
-                st.write(f"📞 Phone: {a['phone']}")
-                st.write(f"🏢 Branch: {a['branch']}")
-                st.write(f"🧾 Service: {a['service']}")
-                st.write(f"📅 Date: {a['date']} – ⏰ {a['time']}")
-                st.write(f"📌 Current Status: {a['status']}")
-
-                col1, col2 = st.columns(2)
-
-                with col1:
-                    if st.button(f"✅ Approve {a['id']}", key=f"appt_ok_{a['id']}"):
-                        a["status"] = "Approved"
-                        save_database(db)
-                        st.success("Appointment approved")
-
-                with col2:
-                    if st.button(f"❌ Reject {a['id']}", key=f"appt_no_{a['id']}"):
-                        a["status"] = "Rejected"
-                        save_database(db)
-                        st.error("Appointment rejected")
+            st.table(
+                [
+                    {
+                        "ID": a["id"],
+                        "Name": a["name"],
+                        "Phone": a["phone"],
+                        "Branch": a["branch"],
+                        "Service": a["service"],
+                        "Date": a["date"],
+                        "Time": a["time"],
+                        "Status": a["status"],
+                    }
+                    for a in rows
+                ]
+            )
+
+            page_ids = [a["id"] for a in rows]
+            select_all = st.checkbox("Select the whole page", key="mappt_all")
+            selected = st.multiselect(
+                "Selected bookings:",
+                page_ids,
+                default=page_ids if select_all else [],
+                key=f"mappt_sel_{len(cursors)}_{select_all}",
+            )
+
+            b1, b2 = st.columns(2)
+            new_status = None
+            with b1:
+                if st.button("✅ Approve selected", key="mappt_ok", disabled=not selected):
+                    new_status = "Approved"
+            with b2:
+                if st.button("❌ Reject selected", key="mappt_no", disabled=not selected):
+                    new_status = "Rejected"
+
+            if new_status:
+                # every change in one journal append
+                changed, errors = set_appointments_status(db, selected, new_status)
+                if changed:
+                    save_database(db, touched_appointments=changed)
+                    st.success(f"{len(changed)} appointment(s) {new_status.lower()}")
+                for appt_id, msg in errors:
+                    st.error(f"#{appt_id}: {msg}")
+
+        p1, p2, p3 = st.columns(3)
+        with p1:
+            if st.button("⬅️ Previous", key="mappt_prev", disabled=len(cursors) == 1):
+                cursors.pop()
+                st.rerun()
+        with p2:
+            st.write(f"Page {len(cursors)}")
+        with p3:
+            if st.button("Next ➡️", key="mappt_next", disabled=not has_more):
+                cursors.append(next_cursor)
+                st.rerun()
+
+
+# ---------------------------
+# الأداء (admin only)
+# ---------------------------
+if "Performance" in tab_names:
+    with tabs[tab_names.index("Performance")]:
+        st.header("⏱️ Performance")
+
+        if not METRICS_ENABLED:
+            st.info("Metrics are disabled (BANK_METRICS=0).")
+        else:
+            st.caption(
+                "Per-process counters since the server started. "
+                "Tab renders are timed up to the previous rerun."
+            )
+            rows = snapshot()
+            if rows:
+                st.table(rows)
+            else:
+                st.info("No operations recorded yet.")
+
+            st.download_button(
+                "Download Prometheus metrics",
+                prometheus_text(),
+                file_name="bank_metrics.prom",
+                mime="text/plain",
+                key="perf_prom_btn",
+            )
+
+        st.subheader("🔍 Balance Verification")
+        st.caption(
+            "Replays the history (Create / Deposit / Withdraw / Transfer) and "
+            "compares every rebuilt balance with the stored one."
+        )
+        full = st.checkbox("Full replay (ignore the last checkpoint)", key="verify_full")
+        if st.button("Verify balances", key="verify_btn"):
+            report = verify_bank(incremental=not full)
+            st.write(
+                f"{report['rows']} history rows ({report['replayed']} replayed"
+                f"{', from checkpoint' if report['from_checkpoint'] else ''}), "
+                f"{report['accounts']} accounts in {report['seconds']:.2f}s"
+            )
+            if report["mismatches"]:
+                st.error(f"{len(report['mismatches'])} balance(s) do not match the history")
+                st.table(
+                    [
+                        {
+                            "Account": m["account"],
+                            "Stored": format_money(m["stored"]),
+                            "Replayed": format_money(m["replayed"]),
+                            "Difference": format_money(m["diff"]),
+                        }
+                        for m in report["mismatches"]
+                    ]
+                )
+            else:
+                st.success("All balances match the history.")
+            if report["unknown_accounts"]:
+                st.warning(
+                    "History moves money for unknown accounts: "
+                    + ", ".join(report["unknown_accounts"][:20])
+                )
+            if report["missing_create"]:
+                st.warning(
+                    "Accounts with no Create row: " + ", ".join(report["missing_create"][:20])
+                )
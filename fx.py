@@ -0,0 +1,171 @@
+# ============================================================
+# FX rates: one cached rate table, all cross rates precomputed
+# The table comes from a feed (BANK_FX_FEED, an http(s) URL) or a local
+# file (BANK_FX_FILE, default fx_rates.json), both in the same JSON shape:
+#   {"base": "EGP", "rates": {"USD": 47.5, ...}, "updated": "..."}
+# where each rate is the price of one unit of the currency in the base.
+# A load builds every pair of CURRENCIES once (cross[src][dst]), so a
+# conversion is two dict lookups and a multiply. The table is kept for
+# BANK_FX_TTL seconds (default 300); if a reload fails the last good
+# table stays in use, and the built-in DEFAULT_RATES if there never was
+# one.
+# Amounts are in hundredths (piastres for EGP, cents for USD ...), as
+# integers, like money.py:
+#   convert(5000, "USD", "EGP")              one amount
+#   convert_many([...], "USD", "EGP")         a list / NumPy array at once
+#   convert_balances(db, acc_ids, "USD")      account balances (EGP), batched
+#   convert_to_all(total, "EGP")              one amount in every currency
+# ============================================================
+import json
+import os
+import threading
+import time
+from urllib.request import urlopen
+
+from metrics import timed
+
+CURRENCIES = ["EGP", "USD", "EUR", "GBP", "SAR", "AED", "KWD"]
+BASE_CURRENCY = "EGP"
+
+# the rates the Currency Exchange tab used to hard-code (approximate)
+DEFAULT_RATES = {
+    "EGP": 1,
+    "USD": 47.5,
+    "EUR": 55.8,
+    "GBP": 63.8,
+    "SAR": 12.7,
+    "AED": 13.0,
+    "KWD": 155,
+}
+
+FX_FILE = os.environ.get("BANK_FX_FILE", "fx_rates.json")
+FX_FEED = os.environ.get("BANK_FX_FEED")
+FX_TTL = float(os.environ.get("BANK_FX_TTL", 300))
+FEED_TIMEOUT = 5
+
+
+class RateTable:
+    # immutable once built; a refresh makes a new one
+    def __init__(self, rates, base=BASE_CURRENCY, source="built-in", updated=None):
+        if base not in rates:
+            rates = {**rates, base: 1}
+        missing = [c for c in CURRENCIES if c not in rates]
+        if missing:
+            raise ValueError(f"Missing FX rate(s): {', '.join(missing)}")
+        for c, r in rates.items():
+            if not isinstance(r, (int, float)) or not r > 0:
+                raise ValueError(f"Invalid FX rate for {c}: {r}")
+
+        # value of one unit in the base, normalised so base == 1
+        unit = {c: float(rates[c]) / float(rates[base]) for c in CURRENCIES}
+        self.base = base
+        self.rates = unit
+        self.cross = {
+            src: {dst: unit[src] / unit[dst] for dst in CURRENCIES} for src in CURRENCIES
+        }
+        self.source = source
+        self.updated = updated
+        self.loaded_at = time.time()
+
+    def rate(self, src, dst):
+        try:
+            return self.cross[src][dst]
+        except KeyError:
+            raise ValueError(f"Unknown currency: {src if src not in self.cross else dst}")
+
+
+def parse_rates(payload, source):
+    data = json.loads(payload)
+    return RateTable(
+        data["rates"], data.get("base", BASE_CURRENCY), source, data.get("updated")
+    )
+
+
+def read_rates(feed=None, path=None):
+    # feed first, then the local file, then the built-in table
+    if feed:
+        with urlopen(feed, timeout=FEED_TIMEOUT) as r:
+            return parse_rates(r.read(), feed)
+    if path and os.path.exists(path):
+        with open(path, "rb") as f:
+            return parse_rates(f.read(), path)
+    return RateTable(DEFAULT_RATES)
+
+
+class FxEngine:
+    def __init__(self, feed=FX_FEED, path=FX_FILE, ttl=FX_TTL):
+        self.feed = feed
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self._table = None
+        self.expires = 0.0
+        self.last_error = None
+
+    def table(self):
+        # the cached table; one caller reloads it once it is older than ttl
+        now = time.monotonic()
+        table = self._table
+        if table is not None and now < self.expires:
+            return table
+        with self.lock:
+            if self._table is None or time.monotonic() >= self.expires:
+                self._reload()
+            return self._table
+
+    def refresh(self):
+        with self.lock:
+            self._reload()
+            return self._table
+
+    @timed("fx_refresh")
+    def _reload(self):
+        try:
+            self._table = read_rates(self.feed, self.path)
+            self.last_error = None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            # keep serving the last good rates
+            self.last_error = str(e)
+            if self._table is None:
+                self._table = RateTable(DEFAULT_RATES)
+        self.expires = time.monotonic() + self.ttl
+
+
+fx = FxEngine()
+
+
+# ---------------------------
+# Conversions (integer hundredths in, integer hundredths out)
+# ---------------------------
+def convert(amount, src, dst, table=None):
+    return round(amount * (table or fx.table()).rate(src, dst))
+
+
+@timed("fx_convert_many")
+def convert_many(amounts, src, dst, table=None):
+    # a NumPy array comes back as an int64 array (one multiply + rint);
+    # anything else as a list
+    rate = (table or fx.table()).rate(src, dst)
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+
+    if np is not None and isinstance(amounts, np.ndarray):
+        return np.rint(amounts * rate).astype(np.int64)
+    return [round(a * rate) for a in amounts]
+
+
+def convert_to_all(amount, src, table=None):
+    # {currency: amount in it} for every currency
+    table = table or fx.table()
+    return {dst: convert(amount, src, dst, table) for dst in CURRENCIES}
+
+
+def convert_balances(db, acc_ids, dst, table=None):
+    # {acc_id: balance in dst} for many accounts in one batch (balances
+    # are EGP piastres); unknown ids are left out
+    accounts = db["accounts"]
+    found = [a for a in acc_ids if a in accounts]
+    converted = convert_many([accounts[a]["balance"] for a in found], BASE_CURRENCY, dst, table)
+    return dict(zip(found, converted))
@@ -0,0 +1,181 @@
+# ============================================================
+# Lazy history: line-delimited rows, memory-mapped, parsed on demand
+# With lazy loading on (BANK_LAZY_HISTORY=1) the snapshot is split:
+#   database.json          accounts, appointments, meta, and
+#                          "history_file" / "history_rows"
+#   database.history       one compact JSON row per line, append-only
+#   database.history.idx   uint64 byte offset of every line (+ the end)
+# Opening it maps both files and parses nothing, so startup does not
+# depend on the length of the history. LazyHistory behaves like the
+# history list: len(), history[pos], iteration, append(). Rows are parsed
+# when read; sequential reads parse a block of lines with one json.loads,
+# which is as fast as reading the whole file at once. Rows added after
+# opening live in memory (the tail) until the next compaction appends
+# them to the file.
+# ============================================================
+import json
+import mmap
+import os
+from array import array
+
+BLOCK_ROWS = 1024
+
+
+def history_line(row):
+    return (json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def index_path(path):
+    return path + ".idx"
+
+
+def parse_lines(chunk):
+    # many "{...}\n" lines -> list of rows, with a single json.loads
+    if not chunk:
+        return []
+    return json.loads(b"[" + chunk.rstrip(b"\n").replace(b"\n", b",") + b"]")
+
+
+def _map(path, size):
+    if size == 0:
+        return b""
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+
+
+class LazyHistory:
+    def __init__(self, path, rows):
+        self.path = path
+        self.rows = rows  # rows in the file that belong to this history
+        self.tail = []  # rows added since it was opened
+        # index -> offsets of rows 0..rows (the last one is where row
+        # `rows` would start, i.e. the end of the data we use)
+        if rows:
+            self.offsets = memoryview(_map(index_path(path), (rows + 1) * 8)).cast("Q")
+        else:
+            self.offsets = array("Q", [0])
+        self.data = _map(path, self.offsets[rows])
+        self._block = (0, [])
+
+    def __len__(self):
+        return self.rows + len(self.tail)
+
+    def __getitem__(self, pos):
+        if isinstance(pos, slice):
+            return list(self.iter_range(*pos.indices(len(self))[:2]))
+        if pos < 0:
+            pos += len(self)
+        if pos >= self.rows:
+            return self.tail[pos - self.rows]
+        if pos < 0:
+            raise IndexError("history position out of range")
+
+        start, block = self._block
+        if start <= pos < start + len(block):
+            return block[pos - start]
+        if pos == start + len(block):
+            # reading forward: parse the next block in one go
+            block = self._parse(pos, min(pos + BLOCK_ROWS, self.rows))
+            self._block = (pos, block)
+            return block[0]
+        off = self.offsets
+        return json.loads(self.data[off[pos] : off[pos + 1]])
+
+    def _parse(self, start, end):
+        return parse_lines(self.data[self.offsets[start] : self.offsets[end]])
+
+    def iter_range(self, start=0, end=None):
+        end = len(self) if end is None else min(end, len(self))
+        pos = start
+        while pos < min(end, self.rows):
+            stop = min(pos + BLOCK_ROWS * 16, end, self.rows)
+            yield from self._parse(pos, stop)
+            pos = stop
+        if end > self.rows:
+            yield from self.tail[max(pos, self.rows) - self.rows : end - self.rows]
+
+    def __iter__(self):
+        return self.iter_range()
+
+    def append(self, row):
+        self.tail.append(row)
+
+    def extend(self, rows):
+        self.tail.extend(rows)
+
+    def raw(self):
+        # the mapped lines, as they are in the file
+        return self.data[: self.offsets[self.rows]]
+
+
+def iter_rows(history, start=0, end=None):
+    # rows [start, end) of a list or a LazyHistory, in bulk
+    if isinstance(history, LazyHistory):
+        return history.iter_range(start, end)
+    # a slice, not islice: islice would walk the first `start` rows
+    return iter(history[start:end])
+
+
+# ---------------------------
+# Writing
+# ---------------------------
+def write_history(path, history):
+    # the whole history as a new file pair (temp files, then replace);
+    # returns the number of rows
+    tmp, tmp_idx = path + ".tmp", index_path(path) + ".tmp"
+    offsets = array("Q", [0])
+    with open(tmp, "wb") as f:
+        if isinstance(history, LazyHistory):
+            # the mapped part is copied as it is, not parsed
+            f.write(history.raw())
+            offsets = array("Q")
+            offsets.frombytes(bytes(history.offsets[: history.rows + 1]))
+            rows = history.tail
+        else:
+            rows = history
+        pos = offsets[-1]
+        for row in rows:
+            line = history_line(row)
+            f.write(line)
+            pos += len(line)
+            offsets.append(pos)
+        f.flush()
+        os.fsync(f.fileno())
+    with open(tmp_idx, "wb") as f:
+        offsets.tofile(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    os.replace(tmp_idx, index_path(path))
+    return len(offsets) - 1
+
+
+def append_history(path, rows_before, rows):
+    # add rows after the first rows_before ones; anything past them (a
+    # crash between this and the snapshot write) is cut first. Returns the
+    # new number of rows.
+    idx_path = index_path(path)
+    with open(idx_path, "r+b") as f:
+        f.seek(rows_before * 8)
+        end = array("Q")
+        end.fromfile(f, 1)
+        pos = end[0]
+        f.truncate((rows_before + 1) * 8)
+
+        offsets = array("Q")
+        with open(path, "r+b") as h:
+            h.truncate(pos)
+            h.seek(pos)
+            for row in rows:
+                line = history_line(row)
+                h.write(line)
+                pos += len(line)
+                offsets.append(pos)
+            h.flush()
+            os.fsync(h.fileno())
+
+        f.seek(0, os.SEEK_END)
+        offsets.tofile(f)
+        f.flush()
+        os.fsync(f.fileno())
+    return rows_before + len(offsets)
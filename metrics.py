@@ -0,0 +1,148 @@
+# ============================================================
+# Hot-path instrumentation
+# Counters + latency histograms for load/save, every mutating bank
+# function and every tab render, kept per process.
+#   @timed("deposit")          wrap a function
+#   with timer("tab:History"):  wrap a block
+# Read them with snapshot() (Performance tab) or prometheus_text()
+# (GET /metrics on bank_api.py).
+# BANK_METRICS=0 turns it off: @timed then returns the function itself
+# and timer() is an empty context manager, so the cost is ~nothing.
+# ============================================================
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+ENABLED = os.environ.get("BANK_METRICS", "1") != "0"
+
+# upper bounds in seconds (the last bucket is +Inf)
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, float("inf"))
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds, failed=False):
+        i = 0
+        while seconds > BUCKETS[i]:
+            i += 1
+        with self.lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+            if failed:
+                self.errors += 1
+
+    def quantile(self, q):
+        # upper bound of the bucket holding the q-th observation
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if seen >= target and n:
+                return min(bound, self.max)
+        return self.max
+
+
+_histograms = {}
+_registry_lock = threading.Lock()
+
+
+def histogram(name):
+    h = _histograms.get(name)
+    if h is None:
+        with _registry_lock:
+            h = _histograms.setdefault(name, Histogram())
+    return h
+
+
+def timed(name):
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+        h = histogram(name)
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            failed = True
+            try:
+                result = fn(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                h.observe(time.perf_counter() - t0, failed)
+
+        return wrapper
+
+    return decorate
+
+
+@contextmanager
+def _timer(name):
+    h = histogram(name)
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        # Streamlit's st.rerun() / st.stop() end a tab with an exception;
+        # that still counts as a render
+        h.observe(time.perf_counter() - t0)
+
+
+def timer(name):
+    return _timer(name) if ENABLED else nullcontext()
+
+
+def snapshot():
+    rows = []
+    for name in sorted(_histograms):
+        h = _histograms[name]
+        if not h.count:
+            continue
+        rows.append(
+            {
+                "operation": name,
+                "count": h.count,
+                "errors": h.errors,
+                "avg_ms": round(h.total / h.count * 1000, 3),
+                "p50_ms": round(h.quantile(0.50) * 1000, 3),
+                "p99_ms": round(h.quantile(0.99) * 1000, 3),
+                "max_ms": round(h.max * 1000, 3),
+            }
+        )
+    return rows
+
+
+def prometheus_text(prefix="bank_operation"):
+    lines = [
+        f"# HELP {prefix}_seconds Latency of bank operations and UI renders.",
+        f"# TYPE {prefix}_seconds histogram",
+    ]
+    for name in sorted(_histograms):
+        h = _histograms[name]
+        label = name.replace("\\", "\\\\").replace('"', '\\"')
+        cumulative = 0
+        for bound, n in zip(BUCKETS, h.counts):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'{prefix}_seconds_bucket{{op="{label}",le="{le}"}} {cumulative}')
+        lines.append(f'{prefix}_seconds_sum{{op="{label}"}} {h.total}')
+        lines.append(f'{prefix}_seconds_count{{op="{label}"}} {h.count}')
+
+    lines.append(f"# HELP {prefix}_errors_total Calls that raised an exception.")
+    lines.append(f"# TYPE {prefix}_errors_total counter")
+    for name in sorted(_histograms):
+        label = name.replace("\\", "\\\\").replace('"', '\\"')
+        lines.append(f'{prefix}_errors_total{{op="{label}"}} {_histograms[name].errors}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,89 @@
+# ============================================================
+# Money: exact integer piastres (1 EGP = 100 piastres)
+# Balances, history amounts and the dashboard aggregates are stored as
+# ints, so adding and subtracting never rounds and sums never drift
+# (floats lose cents above ~1e13 and accumulate error on every +=).
+# Pounds only exist at the edges:
+#   to_piastres(50.25) / to_piastres("50.25")  ->  5025   (input)
+#   format_money(5025)                         ->  "50.25" (display)
+#   to_pounds(5025)                            ->  50.25   (JSON / charts)
+# Totals are plain int sums; the vectorized dashboard reports sum int64
+# arrays exactly in analytics.group_sum.
+# Old files (float pounds) are converted once by migrate_money(), called
+# by the stores on load; meta["money_unit"] marks a converted database.
+# ============================================================
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+PIASTRES_PER_POUND = 100
+MONEY_UNIT = "piastre"
+
+
+def to_piastres(value):
+    # ints are exact; floats go through their shortest repr ("12.345", not
+    # the binary 12.3449999...) and everything is rounded half-up like
+    # text, so 0.125 and "0.125" both give 13. Thousands separators are
+    # rejected, not stripped: "1,5" is not 15.00.
+    if type(value) is int:
+        return value * PIASTRES_PER_POUND
+    if type(value) is float:
+        text = repr(value)
+    elif isinstance(value, Decimal):
+        text = value
+    else:
+        text = str(value).strip()
+        if "," in text:
+            raise ValueError(f"Invalid amount: {value}")
+    try:
+        d = Decimal(text)
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {value}")
+    if not d.is_finite():
+        raise ValueError(f"Invalid amount: {value}")
+    return int((d * PIASTRES_PER_POUND).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def to_pounds(piastres):
+    return piastres / PIASTRES_PER_POUND
+
+
+def format_money(piastres, currency=None, thousands=True):
+    # exact: no float on the way; thousands=False for files (CSV)
+    sign = "-" if piastres < 0 else ""
+    pounds, rest = divmod(abs(int(piastres)), PIASTRES_PER_POUND)
+    text = f"{sign}{pounds:,}.{rest:02d}" if thousands else f"{sign}{pounds}.{rest:02d}"
+    return f"{text} {currency}" if currency else text
+
+
+# ---------------------------
+# Migration of float-pound databases
+# ---------------------------
+def is_migrated(db):
+    return db.get("meta", {}).get("money_unit") == MONEY_UNIT
+
+
+def migrate_money(db):
+    # returns True when something was converted (the caller persists it)
+    meta = db.setdefault("meta", {})
+    if meta.get("money_unit") == MONEY_UNIT:
+        return False
+
+    for acc in db["accounts"].values():
+        acc["balance"] = to_piastres(acc.get("balance", 0))
+    for h in db["history"]:
+        h["amount"] = to_piastres(h.get("amount", 0))
+
+    # rebuilt from the converted rows by ensure_stats()
+    meta.pop("stats", None)
+    meta.pop("daily", None)
+    meta["money_unit"] = MONEY_UNIT
+    return True
+
+
+def coerce_piastres(db):
+    # SQLite REAL columns hand ints back as floats (5025 -> 5025.0)
+    for acc in db["accounts"].values():
+        if type(acc.get("balance")) is float:
+            acc["balance"] = int(acc["balance"])
+    for h in db["history"]:
+        if type(h.get("amount")) is float:
+            h["amount"] = int(h["amount"])
@@ -0,0 +1,371 @@
+# ============================================================
+# Compact typed records: accounts and history
+# The JSON shape (a dict per account and per history row) costs hundreds
+# of bytes per record. With BANK_COMPACT_RECORDS=1 the store keeps the
+# live database in this form instead (compact_database(), called on load):
+#   accounts   AccountTable of AccountRecord: __slots__ for the usual
+#              fields, a side dict for anything else ("customer", ...)
+#   history    HistoryColumns, one typed array per column:
+#       action      array("B")  code into ACTIONS (interned strings)
+#       account     array("q")  account id as int
+#       to_account  array("q")  same, NO_ACCOUNT for None
+#       amount      array("q")  integer piastres (money.py)
+#       time        array("q")  epoch seconds ("%Y-%m-%d %H:%M:%S" as UTC)
+# Both behave like what they replace: an account reads and writes like
+# its dict, and the history supports len(), history[pos], slices,
+# iteration and append(). History rows are decoded into new dicts when
+# read, so they are read-only copies (the code never changes a row once
+# added); accounts are still changed in place, through the record.
+# Anything that does not fit (an id that is not a plain int, an odd time
+# string, a float amount from an unmigrated file, extra keys) goes to a
+# small side table, so HistoryColumns.from_rows(rows).to_rows() == rows
+# and AccountRecord.from_dict(acc).to_dict() == acc. json_default() turns
+# both back into plain JSON when a snapshot is written.
+# analytics.py builds its NumPy views on HistoryColumns. The arrays
+# support the buffer protocol: numpy.frombuffer() reads them without a
+# copy.
+# ============================================================
+import calendar
+import time
+from array import array
+from collections.abc import MutableMapping
+
+HISTORY_KEYS = ("action", "account", "to_account", "amount", "time")
+
+# known actions first so their codes are stable; new ones are added on sight
+ACTIONS = [
+    "Create",
+    "Deposit",
+    "Withdraw",
+    "Transfer",
+    "Update Status",
+    "Customer Update",
+]
+
+NO_ACCOUNT = -1
+# ids that are not canonical ints are stored as OTHER_ACCOUNT - index
+OTHER_ACCOUNT = -2
+
+
+class _Missing:
+    def __repr__(self):
+        return "<missing>"
+
+
+_MISSING = _Missing()  # marks a key the original row did not have
+
+
+# ---------------------------
+# Accounts
+# ---------------------------
+ACCOUNT_FIELDS = ("name", "phone", "national_id", "balance", "status", "created_at")
+_ACCOUNT_FIELD_SET = frozenset(ACCOUNT_FIELDS)
+
+
+class AccountRecord(MutableMapping):
+    __slots__ = ACCOUNT_FIELDS + ("extra",)
+
+    def __init__(self):
+        for field in ACCOUNT_FIELDS:
+            setattr(self, field, _MISSING)
+        self.extra = None  # {key: value} beyond ACCOUNT_FIELDS
+
+    @classmethod
+    def from_dict(cls, acc):
+        record = cls()
+        for key, value in acc.items():
+            record[key] = value
+        return record
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __getitem__(self, key):
+        if key in _ACCOUNT_FIELD_SET:
+            value = getattr(self, key)
+            if value is not _MISSING:
+                return value
+        elif self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in _ACCOUNT_FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key):
+        if key in _ACCOUNT_FIELD_SET and getattr(self, key) is not _MISSING:
+            setattr(self, key, _MISSING)
+        elif self.extra is not None and key in self.extra:
+            del self.extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        for field in ACCOUNT_FIELDS:
+            if getattr(self, field) is not _MISSING:
+                yield field
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"AccountRecord({self.to_dict()!r})"
+
+
+class AccountTable(dict):
+    # account id -> AccountRecord; a plain dict stored into it (a new
+    # account, a replayed journal record) is converted on the way in
+    def __setitem__(self, acc_id, acc):
+        if not isinstance(acc, AccountRecord):
+            acc = AccountRecord.from_dict(acc)
+        super().__setitem__(acc_id, acc)
+
+    @classmethod
+    def from_dict(cls, accounts):
+        table = cls()
+        for acc_id, acc in accounts.items():
+            table[acc_id] = acc
+        return table
+
+
+# ---------------------------
+# History
+# ---------------------------
+
+
+class HistoryColumns:
+    def __init__(self):
+        self.action = array("B")
+        self.account = array("q")
+        self.to_account = array("q")
+        self.amount = array("q")
+        self.time = array("q")
+
+        self.actions = list(ACTIONS)
+        self.action_codes = {a: i for i, a in enumerate(self.actions)}
+        self.other_ids = []  # non-int account ids, see OTHER_ACCOUNT
+        self.other_id_codes = {}
+        self.odd_times = {}  # position -> time string that did not parse
+        self.odd_amounts = {}  # position -> amount that is not an int
+        self.extras = {}  # position -> {key: value} beyond HISTORY_KEYS
+        self._day_epochs = {}
+        self._day_names = {}
+
+    @classmethod
+    def from_rows(cls, rows):
+        cols = cls()
+        cols.extend(rows)
+        return cols
+
+    def __len__(self):
+        # the column written last (append, extend)
+        return len(self.time)
+
+    # ---------- encoding ----------
+    def action_code(self, action):
+        code = self.action_codes.get(action)
+        if code is None:
+            if len(self.actions) >= 256:
+                raise ValueError("more than 256 distinct history actions")
+            code = self.action_codes[action] = len(self.actions)
+            self.actions.append(action)
+        return code
+
+    def account_code(self, acc_id):
+        if acc_id is None:
+            return NO_ACCOUNT
+        if type(acc_id) is str and acc_id.isdigit() and (acc_id == "0" or acc_id[0] != "0"):
+            n = int(acc_id)
+            if n < 2**63:
+                return n
+        code = self.other_id_codes.get(acc_id)
+        if code is None:
+            code = self.other_id_codes[acc_id] = OTHER_ACCOUNT - len(self.other_ids)
+            self.other_ids.append(acc_id)
+        return code
+
+    def account_id(self, code):
+        if code >= 0:
+            return str(code)
+        if code == NO_ACCOUNT:
+            return None
+        return self.other_ids[OTHER_ACCOUNT - code]
+
+    def day_base(self, day):
+        # epoch of midnight, computed once per day; -1 if not a real date
+        base = self._day_epochs.get(day)
+        if base is None:
+            try:
+                base = calendar.timegm(time.strptime(day, "%Y-%m-%d"))
+            except ValueError:
+                base = -1
+            if base != -1 and time.strftime("%Y-%m-%d", time.gmtime(base)) != day:
+                base = -1
+            self._day_epochs[day] = base
+        return base
+
+    @staticmethod
+    def clock_seconds(text):
+        # " HH:MM:SS" -> seconds since midnight, -1 if it is anything else
+        if len(text) != 9 or text[0] != " " or text[3] != ":" or text[6] != ":":
+            return -1
+        hh, mm, ss = text[1:3], text[4:6], text[7:9]
+        if not (hh.isdigit() and mm.isdigit() and ss.isdigit()):
+            return -1
+        if hh > "23" or mm > "59" or ss > "59":
+            return -1
+        return int(hh) * 3600 + int(mm) * 60 + int(ss)
+
+    def epoch(self, t):
+        if type(t) is not str or len(t) != 19:
+            return None
+        base = self.day_base(t[:10])
+        seconds = self.clock_seconds(t[10:])
+        if base == -1 or seconds == -1:
+            return None
+        return base + seconds
+
+    def time_text(self, value):
+        day, seconds = divmod(value, 86400)
+        name = self._day_names.get(day)
+        if name is None:
+            name = self._day_names[day] = time.strftime("%Y-%m-%d", time.gmtime(day * 86400))
+        minutes, ss = divmod(seconds, 60)
+        hh, mm = divmod(minutes, 60)
+        return f"{name} {hh:02d}:{mm:02d}:{ss:02d}"
+
+    def append(self, row):
+        # everything is encoded before the first column grows, and time,
+        # which sets len(), goes last: a reader on another thread never
+        # sees a half-written row
+        pos = len(self)
+        action = self.action_code(row["action"])
+        account = self.account_code(row["account"])
+        to_account = self.account_code(row.get("to_account"))
+        amount = row["amount"]
+        if not (type(amount) is int and -(2**63) <= amount < 2**63):
+            self.odd_amounts[pos] = amount
+            amount = 0
+        t = row["time"]
+        value = self.epoch(t)
+        if value is None:
+            self.odd_times[pos] = t
+            value = 0
+        if len(row) != len(HISTORY_KEYS) or "to_account" not in row:
+            extra = {k: v for k, v in row.items() if k not in HISTORY_KEYS}
+            if "to_account" not in row:
+                extra["to_account"] = _MISSING
+            self.extras[pos] = extra
+
+        self.action.append(action)
+        self.account.append(account)
+        self.to_account.append(to_account)
+        self.amount.append(amount)
+        self.time.append(value)
+
+    def extend(self, rows):
+        # append() for many rows: the usual row shape is encoded from
+        # caches (ids, days, clock times) in one tight loop; any other row
+        # goes through append() and its side tables
+        day_epochs, action_codes = self._day_epochs, self.action_codes
+        ids, clock = {}, {}
+        col_action, col_account = self.action.append, self.account.append
+        col_to, col_amount, col_time = self.to_account.append, self.amount.append, self.time.append
+
+        for row in rows:
+            try:
+                if len(row) != 5:
+                    raise KeyError
+                action = action_codes[row["action"]]
+                t = row["time"]
+                acc, to_acc, amount = row["account"], row["to_account"], row["amount"]
+                day, hms = t[:10], t[10:]
+                base = day_epochs[day] if day in day_epochs else self.day_base(day)
+                seconds = clock[hms] if hms in clock else clock.setdefault(hms, self.clock_seconds(hms))
+                acc = ids[acc] if acc in ids else ids.setdefault(acc, self.account_code(acc))
+                to_acc = ids[to_acc] if to_acc in ids else ids.setdefault(to_acc, self.account_code(to_acc))
+            except (KeyError, TypeError):
+                self.append(row)
+                continue
+            if base == -1 or seconds == -1 or len(t) != 19 or type(amount) is not int:
+                self.append(row)
+                continue
+            if not -(2**63) <= amount < 2**63:
+                self.append(row)
+                continue
+            col_action(action)
+            col_account(acc)
+            col_to(to_acc)
+            col_amount(amount)
+            col_time(base + seconds)
+
+    # ---------- decoding ----------
+    def row(self, pos):
+        t = self.odd_times.get(pos)
+        if t is None:
+            t = self.time_text(self.time[pos])
+        row = {
+            "action": self.actions[self.action[pos]],
+            "account": self.account_id(self.account[pos]),
+            "to_account": self.account_id(self.to_account[pos]),
+            "amount": self.odd_amounts.get(pos, self.amount[pos]),
+            "time": t,
+        }
+        extra = self.extras.get(pos)
+        if extra:
+            for k, v in extra.items():
+                if v is _MISSING:
+                    del row[k]
+                else:
+                    row[k] = v
+        return row
+
+    def __getitem__(self, pos):
+        if isinstance(pos, slice):
+            return [self.row(i) for i in range(*pos.indices(len(self)))]
+        if pos < 0:
+            pos += len(self)
+        if not 0 <= pos < len(self):
+            raise IndexError("history position out of range")
+        return self.row(pos)
+
+    def __iter__(self):
+        for pos in range(len(self)):
+            yield self.row(pos)
+
+    def to_rows(self):
+        return list(self)
+
+    def nbytes(self):
+        return sum(
+            col.itemsize * len(col)
+            for col in (self.action, self.account, self.to_account, self.amount, self.time)
+        )
+
+
+# ---------------------------
+# The live database in compact form
+# ---------------------------
+def compact_database(db):
+    # in place; a history that is not a plain list (lazy_history's mapped
+    # file, already columns) is left as it is
+    if not isinstance(db["accounts"], AccountTable):
+        db["accounts"] = AccountTable.from_dict(db["accounts"])
+    if type(db["history"]) is list:
+        db["history"] = HistoryColumns.from_rows(db["history"])
+
+
+def json_default(obj):
+    # json.dump(..., default=json_default) writes compact records as JSON
+    if isinstance(obj, AccountRecord):
+        return obj.to_dict()
+    if isinstance(obj, HistoryColumns):
+        return obj.to_rows()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
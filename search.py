@@ -0,0 +1,245 @@
+# ============================================================
+# Customer search: find accounts by name, phone, national ID or email
+# One in-memory index over db["accounts"] (the account's own fields and
+# the nested "customer" record from Customer Data):
+#   phone / national_id / email   exact key -> account ids (hash lookups)
+#   words                         normalized name word -> account ids, plus
+#                                 the sorted list of distinct words, so a
+#                                 name prefix is a binary search
+# A key held by one account maps to its id, a shared one to a set of ids
+# (most phones and national IDs are unique: no million one-item sets).
+# Names are normalized before indexing and searching: case-folded,
+# Arabic diacritics and tatweel dropped, and the letter variants people
+# type interchangeably folded together (أ إ آ -> ا, ى -> ي, ة -> ه ...),
+# so "احمد" finds "أحمد". Every word of a name query has to start a word of
+# the name ("mo ali" finds "Mohamed Ali").
+# Accounts only gain or change these fields through a Create or a
+# Customer Update row, so the index follows the history from the position
+# it was built at (Database.search_customers in storage.py).
+# ============================================================
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from functools import lru_cache
+
+from lazy_history import iter_rows
+
+DEFAULT_LIMIT = 20
+INDEXED_ACTIONS = ("Create", "Customer Update")
+
+_NOT_DIGITS = re.compile(r"[^0-9]")
+_ARABIC_DIGITS = str.maketrans("٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹", "01234567890123456789")
+_ARABIC_VARIANTS = str.maketrans(
+    {"أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا", "ى": "ي", "ئ": "ي", "ؤ": "و", "ة": "ه", "ـ": None}
+)
+
+
+def id_order(acc_id):
+    # numeric account ids in number order, anything else after them
+    return (0, int(acc_id), "") if str(acc_id).isdigit() else (1, 0, str(acc_id))
+
+
+# names repeat a lot (first names, family names), so are normalized once
+@lru_cache(maxsize=65536)
+def normalize_name(text):
+    if text.isascii():
+        return text.casefold()
+    text = unicodedata.normalize("NFKD", text).casefold()
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return unicodedata.normalize("NFC", text.translate(_ARABIC_VARIANTS))
+
+
+def name_words(text):
+    return normalize_name(str(text)).split()
+
+
+def normalize_digits(text):
+    # ASCII digits only (Arabic-Indic digits converted, the rest dropped)
+    text = str(text)
+    if not (text.isascii() and text.isdigit()):
+        text = _NOT_DIGITS.sub("", text.translate(_ARABIC_DIGITS))
+    return text
+
+
+def normalize_phone(phone):
+    # +20 / 0020 in front of a mobile number -> local form
+    digits = normalize_digits(phone)
+    if digits.startswith("00"):
+        digits = digits[2:]
+    if digits.startswith("20") and len(digits) == 12:
+        digits = "0" + digits[2:]
+    return digits
+
+
+def normalize_email(email):
+    return str(email).strip().casefold()
+
+
+def _unique(*values):
+    return tuple(dict.fromkeys(v for v in values if v))
+
+
+def account_words(acc):
+    customer = acc.get("customer") or {}
+    words = name_words(acc.get("name") or "")
+    if customer.get("name"):
+        return _unique(*words, *name_words(customer["name"]))
+    return words
+
+
+def account_keys(acc):
+    # (phones, national ids, emails, name words) of one account
+    customer = acc.get("customer") or {}
+    phone = normalize_phone(acc.get("phone") or "")
+    national_id = normalize_digits(acc.get("national_id") or "")
+    return (
+        _unique(phone, normalize_phone(customer.get("phone") or "")),
+        (national_id,) if national_id else (),
+        _unique(normalize_email(customer.get("email") or "")),
+        account_words(acc),
+    )
+
+
+def _put(index, key, acc_id):
+    ids = index.get(key)
+    if ids is None:
+        index[key] = acc_id
+    elif type(ids) is set:
+        ids.add(acc_id)
+    elif ids != acc_id:
+        index[key] = {ids, acc_id}
+
+
+def _drop(index, key, acc_id):
+    # True when no account has the key any more
+    ids = index.get(key)
+    if type(ids) is set:
+        ids.discard(acc_id)
+        if len(ids) == 1:
+            index[key] = ids.pop()
+    elif ids == acc_id:
+        del index[key]
+        return True
+    return False
+
+
+def _ids(value):
+    if value is None:
+        return ()
+    return value if type(value) is set else (value,)
+
+
+class CustomerIndex:
+    def __init__(self, accounts):
+        self.accounts = accounts
+        self.phone = {}
+        self.national_id = {}
+        self.email = {}
+        self.words = {}
+        self.sorted_words = []
+        # keys of the accounts with a customer record: a Customer Update
+        # replaces that record, so the old keys are kept to take them out
+        # (an account's own name / phone / national ID never change)
+        self.customer_keys = {}
+        self.position = 0  # history rows already followed
+
+    @classmethod
+    def build(cls, accounts, position=0):
+        # position: the history length taken before reading the accounts,
+        # so an account created meanwhile is picked up by follow()
+        index = cls(accounts)
+        for acc_id, acc in list(accounts.items()):
+            index._add(acc_id, acc)
+        index.sorted_words = sorted(index.words)
+        index.position = position
+        return index
+
+    def _maps(self):
+        return self.phone, self.national_id, self.email, self.words
+
+    def _add(self, acc_id, acc):
+        if acc.get("customer"):
+            keys = self.customer_keys[acc_id] = account_keys(acc)
+            for index, values in zip(self._maps(), keys):
+                for value in values:
+                    _put(index, value, acc_id)
+            return
+        # the common case, without building the keys tuple
+        phone = normalize_phone(acc.get("phone") or "")
+        if phone:
+            _put(self.phone, phone, acc_id)
+        national_id = normalize_digits(acc.get("national_id") or "")
+        if national_id:
+            _put(self.national_id, national_id, acc_id)
+        for word in account_words(acc):
+            _put(self.words, word, acc_id)
+
+    def update(self, acc_id, acc):
+        # (re)index one account after it was created or changed
+        old = self.customer_keys.pop(acc_id, None)
+        new = account_keys(acc) if acc is not None else ((), (), (), ())
+        if old is not None:
+            for index, old_values, new_values in zip(self._maps(), old, new):
+                for value in old_values:
+                    if value not in new_values and _drop(index, value, acc_id):
+                        if index is self.words:
+                            del self.sorted_words[bisect_left(self.sorted_words, value)]
+        if acc is not None:
+            for word in new[3]:
+                if word not in self.words:
+                    insort(self.sorted_words, word)
+            self._add(acc_id, acc)
+
+    def follow(self, history):
+        # re-index the accounts touched by the rows added since last time
+        end = len(history)
+        for row in iter_rows(history, self.position, end):
+            if row.get("action") in INDEXED_ACTIONS:
+                acc_id = row.get("account")
+                self.update(acc_id, self.accounts.get(acc_id))
+        self.position = end
+
+    # ---------------------------
+    # Lookups
+    # ---------------------------
+    def words_with_prefix(self, prefix):
+        words = self.sorted_words
+        i = bisect_left(words, prefix)
+        while i < len(words) and words[i].startswith(prefix):
+            yield words[i]
+            i += 1
+
+    def search_name(self, query, limit=DEFAULT_LIMIT):
+        terms = name_words(query)
+        if not terms:
+            return []
+        # walk the longest term's matches, check the others per account
+        terms.sort(key=len, reverse=True)
+        first, rest = terms[0], terms[1:]
+        accounts = self.accounts
+        found, seen = [], set()
+        for word in self.words_with_prefix(first):
+            for acc_id in _ids(self.words[word]):
+                if acc_id in seen or acc_id not in accounts:
+                    continue
+                seen.add(acc_id)
+                words = account_words(accounts[acc_id])
+                if all(any(w.startswith(t) for w in words) for t in rest):
+                    found.append(acc_id)
+                    if len(found) >= limit:
+                        return found
+        return found
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        # account ids matching the query: an email, a phone number or
+        # national ID (digits), or else a name
+        query = str(query).strip()
+        if "@" in query:
+            found = set(_ids(self.email.get(normalize_email(query))))
+        elif not any(c.isalpha() for c in query):
+            digits = normalize_digits(query)
+            found = set(_ids(self.phone.get(normalize_phone(digits))))
+            found.update(_ids(self.national_id.get(digits)))
+        else:
+            found = self.search_name(query, limit)
+        return sorted(found, key=id_order)[:limit]
@@ -0,0 +1,86 @@
+# ============================================================
+# Running dashboard aggregates
+# Kept inside db["meta"] so they are saved with the database:
+#   meta["stats"] = {"total_balance": ..., "account_count": ...}
+#   meta["daily"] = {"YYYY-MM-DD": {"Deposit": ..., "Withdraw": ..., "Transfer": ...}}
+# Every history row updates them in O(1); the dashboard just reads them
+# (the 30-day chart too: one lookup per day, no history scan).
+# All amounts are integer piastres (money.py), so the totals are exact.
+# ============================================================
+from datetime import timedelta
+
+DAILY_ACTIONS = ("Deposit", "Withdraw", "Transfer")
+
+# how each action moves the bank's total balance
+BALANCE_SIGN = {"Create": 1, "Deposit": 1, "Withdraw": -1}
+
+
+def empty_day():
+    return {action: 0 for action in DAILY_ACTIONS}
+
+
+def apply_row(meta, row):
+    stats = meta.get("stats")
+    if stats is None:
+        # not built yet, ensure_stats() will rebuild from scratch
+        return
+
+    action = row["action"]
+    amount = row.get("amount", 0)
+
+    if action == "Create":
+        stats["account_count"] += 1
+    sign = BALANCE_SIGN.get(action)
+    if sign:
+        stats["total_balance"] += sign * amount
+
+    if action in DAILY_ACTIONS:
+        day = row["time"][:10]
+        totals = meta["daily"].get(day)
+        if totals is None:
+            totals = meta["daily"][day] = empty_day()
+        totals[action] += amount
+
+
+def rebuild_stats(db):
+    meta = db.setdefault("meta", {})
+    accounts = db["accounts"]
+    meta["stats"] = {
+        "total_balance": sum(acc.get("balance", 0) for acc in accounts.values()),
+        "account_count": len(accounts),
+    }
+
+    daily = meta["daily"] = {}
+    for h in db["history"]:
+        if h["action"] in DAILY_ACTIONS:
+            day = h["time"][:10]
+            totals = daily.get(day)
+            if totals is None:
+                totals = daily[day] = empty_day()
+            totals[h["action"]] += h.get("amount", 0)
+
+
+def ensure_stats(db):
+    # one full pass the first time an old database.json is opened
+    meta = db.setdefault("meta", {})
+    if "stats" not in meta or "daily" not in meta:
+        rebuild_stats(db)
+
+
+def day_totals(db, day):
+    return db["meta"]["daily"].get(day) or empty_day()
+
+
+def daily_range(db, start, end):
+    # {"day": [...], "Deposit": [...], ...} for the days from start to end
+    # (dates) with activity, in date order
+    daily = db["meta"]["daily"]
+    out = {"day": [], **{action: [] for action in DAILY_ACTIONS}}
+    for n in range((end - start).days + 1):
+        day = str(start + timedelta(days=n))
+        totals = daily.get(day)
+        if totals:
+            out["day"].append(day)
+            for action in DAILY_ACTIONS:
+                out[action].append(totals[action])
+    return out
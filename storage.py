@@ -0,0 +1,744 @@
+# ============================================================
+# Storage engine (snapshot + append-only journal)
+# database.json is a snapshot of the whole bank; every change made
+# after it is appended to database.journal as one JSON line.
+# Loading = read snapshot + replay journal.
+# Saving  = append only the new records (fsync'd), not the whole file.
+# Every COMPACT_EVERY records the journal is rotated to database.journal.1
+# and a background thread folds it into a new snapshot, written to a temp
+# file, fsync'd and renamed into place (a reader never sees half a file).
+# With lazy_history (BANK_LAZY_HISTORY=1) the history is kept out of the
+# snapshot, in an append-only line file that is memory-mapped on load
+# (lazy_history.py); compaction then appends to it instead of rewriting
+# it, and the history indexes are built the first time a query needs them.
+# With compact_records (BANK_COMPACT_RECORDS=1) the loaded accounts and
+# history are kept as records.py's slotted records and typed columns; they
+# are turned back into JSON when written.
+# ============================================================
+import json
+import os
+import tempfile
+import threading
+from bisect import bisect_left, bisect_right, insort
+
+try:
+    import fcntl
+except ImportError:  # not on POSIX: no cross-process guard
+    fcntl = None
+
+from lazy_history import LazyHistory, append_history, iter_rows, write_history
+from money import migrate_money
+from records import compact_database, json_default
+from search import CustomerIndex
+from stats import apply_row, ensure_stats
+
+COMPACT_EVERY = 1000
+
+# One writer per data file: a store takes an exclusive flock on
+# <name>.lock when it opens the data and keeps it until close(). Journal
+# records carry whole account copies, so a second process writing the
+# same files would overwrite the first one's balances; it fails at open
+# instead (StoreLocked). Tools that only read use read_database().
+
+
+class StoreLocked(RuntimeError):
+    pass
+
+
+def lock_data_file(lock_path):
+    # -> the open lock file, held until it is closed
+    f = open(lock_path, "a+")
+    if fcntl is not None:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            raise StoreLocked(
+                f"{lock_path} is held by another store: the data files have one writer"
+            ) from None
+    return f
+
+
+class Database(dict):
+    # Plain dict (so the UI keeps using db["accounts"] etc.) that also
+    # remembers how much of its history / appointments is already on disk,
+    # and keeps in-memory indexes over the history list.
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.synced_history = 0
+        self.synced_appointments = 0
+        # history position -> copies of the accounts the row touched, taken
+        # when the row was added; dropped once the row is on disk
+        self.captured_accounts = {}
+        # bumped on every save; with the history length it stamps the
+        # derived views in cached()
+        self.version = 0
+        self.view_cache = {}
+        # account id -> positions in db["history"] (sender and receiver)
+        self.account_index = {}
+        # history partitioned by day: "YYYY-MM-DD" -> positions, plus the
+        # sorted list of days so a date range is two binary searches
+        self.day_index = {}
+        self.days = []
+        self.indexed_history = 0
+        # False while a lazily loaded history has not been indexed yet: the
+        # history indexes are then built by the first query that needs them
+        self.history_indexed = True
+        # appointment id -> position in db["appointments"]; every live slot
+        # (branch, date, time) -> id of the booking holding it; and for the
+        # Manage Appointments filters, field -> value -> positions (in order)
+        # plus status -> sorted list of positions
+        self.appointment_pos = {}
+        self.slot_index = {}
+        self.appointment_index = {f: {} for f in APPOINTMENT_FIELDS}
+        self.status_index = {}
+        self.indexed_appointments = 0
+        # customer search (search.py): built by the first search, then kept
+        # current from the Create / Customer Update rows
+        self.customer_index = None
+        self.customer_index_build = threading.Lock()
+        self.index_lock = threading.RLock()
+
+    def capture_accounts(self, pos, row):
+        accounts = self["accounts"]
+        self.captured_accounts[pos] = {
+            acc_id: dict(accounts[acc_id])
+            for acc_id in (row.get("account"), row.get("to_account"))
+            if acc_id in accounts
+        }
+
+    def unsynced_rows(self, end):
+        # (row, accounts touched by it) for every row not yet on disk
+        accounts = self["accounts"]
+        history = self["history"]
+        for pos in range(self.synced_history, end):
+            row = history[pos]
+            touched = self.captured_accounts.pop(pos, None)
+            if touched is None:
+                touched = {
+                    acc_id: accounts[acc_id]
+                    for acc_id in (row.get("account"), row.get("to_account"))
+                    if acc_id in accounts
+                }
+            yield row, touched
+
+    def cached(self, key, compute):
+        # compute() once per version of the data (a report over the whole
+        # history, say); any save or new row makes it stale
+        stamp = (self.version, len(self["history"]))
+        hit = self.view_cache.get(key)
+        if hit is not None and hit[0] == stamp:
+            return hit[1]
+        value = compute()
+        self.view_cache[key] = (stamp, value)
+        return value
+
+    def sync_indexes(self):
+        with self.index_lock:
+            if self.history_indexed:
+                self._index_new_rows()
+            self._index_new_appointments()
+            if self.customer_index is not None:
+                self.customer_index.follow(self["history"])
+
+    def sync_history_index(self):
+        with self.index_lock:
+            self.history_indexed = True
+            self.sync_indexes()
+
+    def _index_new_rows(self):
+        history = self["history"]
+        index = self.account_index
+        start, end = self.indexed_history, len(history)
+        for pos, h in enumerate(iter_rows(history, start, end), start):
+            acc_id = h.get("account")
+            index.setdefault(acc_id, []).append(pos)
+            to_acc = h.get("to_account")
+            if to_acc is not None and to_acc != acc_id:
+                index.setdefault(to_acc, []).append(pos)
+
+            day = h["time"][:10]
+            positions = self.day_index.get(day)
+            if positions is None:
+                positions = self.day_index[day] = []
+                if not self.days or day > self.days[-1]:
+                    self.days.append(day)
+                else:
+                    insort(self.days, day)
+            positions.append(pos)
+        self.indexed_history = end
+
+    def _index_new_appointments(self):
+        appointments = self["appointments"]
+        for pos in range(self.indexed_appointments, len(appointments)):
+            appt = appointments[pos]
+            self.appointment_pos[appt.get("id")] = pos
+            for field, index in self.appointment_index.items():
+                index.setdefault(appt.get(field), []).append(pos)
+            self._index_status(pos, appt)
+        self.indexed_appointments = len(appointments)
+
+    def _index_status(self, pos, appt):
+        insort(self.status_index.setdefault(appt.get("status"), []), pos)
+        key = appointment_slot(appt)
+        holder = self.slot_index.get(key)
+        if appt.get("status") in ACTIVE_APPOINTMENT_STATUSES:
+            if holder is None:
+                self.slot_index[key] = appt.get("id")
+        elif holder == appt.get("id"):
+            del self.slot_index[key]
+
+    def _unindex_status(self, pos, appt):
+        positions = self.status_index.get(appt.get("status"), [])
+        i = bisect_left(positions, pos)
+        if i < len(positions) and positions[i] == pos:
+            del positions[i]
+        key = appointment_slot(appt)
+        if self.slot_index.get(key) == appt.get("id"):
+            del self.slot_index[key]
+
+    def change_appointment_status(self, appt, status):
+        # the only field that changes after booking; branch / date / time /
+        # service stay as they were
+        with self.index_lock:
+            self.sync_indexes()
+            pos = self.appointment_pos[appt.get("id")]
+            self._unindex_status(pos, appt)
+            appt["status"] = status
+            self._index_status(pos, appt)
+
+    def put_appointment(self, pos, appt):
+        # an appointment rewritten by a later journal record
+        with self.index_lock:
+            old = self["appointments"][pos]
+            self["appointments"][pos] = appt
+            if pos < self.indexed_appointments:
+                self._unindex_status(pos, old)
+                self._index_status(pos, appt)
+
+    def account_positions(self, acc_id):
+        self.sync_history_index()
+        return self.account_index.get(acc_id, [])
+
+    def account_history(self, acc_id):
+        history = self["history"]
+        return [history[pos] for pos in self.account_positions(acc_id)]
+
+    def search_customers(self, query, limit):
+        index = self.customer_index
+        if index is None:
+            index = self._build_customer_index()
+        with self.index_lock:
+            self.sync_indexes()
+            return index.search(query, limit)
+
+    def _build_customer_index(self):
+        # the build takes seconds at a million accounts, so it runs without
+        # index_lock (add_history needs it on every write); only catching
+        # up with the rows added meanwhile and installing it are locked
+        with self.customer_index_build:
+            index = self.customer_index
+            while index is None:
+                accounts = self["accounts"]
+                built = CustomerIndex.build(accounts, len(self["history"]))
+                with self.index_lock:
+                    if self["accounts"] is accounts:  # not reloaded meanwhile
+                        built.follow(self["history"])
+                        self.customer_index = index = built
+            return index
+
+    def appointment(self, appt_id):
+        self.sync_indexes()
+        pos = self.appointment_pos.get(appt_id)
+        return None if pos is None else self["appointments"][pos]
+
+    def slot_holder(self, key):
+        self.sync_indexes()
+        return self.slot_index.get(key)
+
+    def appointment_positions(self, filters, status=None, after=None):
+        # positions after `after` matching at least the most selective
+        # filter, in order; the caller still checks the others on each
+        # appointment
+        with self.index_lock:
+            self.sync_indexes()
+            best = None
+            for field, value in filters.items():
+                positions = self.appointment_index[field].get(value, [])
+                if best is None or len(positions) < len(best):
+                    best = positions
+            if status is not None:
+                positions = self.status_index.get(status, [])
+                if best is None or len(positions) < len(best):
+                    best = positions
+            if best is None:
+                return range(0 if after is None else after + 1, self.indexed_appointments)
+        return self._positions_after(best, after)
+
+    def _positions_after(self, positions, after, chunk=256):
+        # the index lists change under a reader (a status change moves a
+        # position between lists): read them a chunk at a time, each time
+        # from the last position handed out, so a page costs O(log P + page)
+        while True:
+            with self.index_lock:
+                i = bisect_right(positions, after) if after is not None else 0
+                part = positions[i : i + chunk]
+            if not part:
+                return
+            yield from part
+            after = part[-1]
+
+    def day_positions(self, start=None, end=None):
+        # positions of every row whose day is in [start, end]; days outside
+        # the range are skipped without being touched
+        self.sync_history_index()
+        lo = bisect_left(self.days, start[:10]) if start else 0
+        hi = bisect_right(self.days, end[:10]) if end else len(self.days)
+        for day in self.days[lo:hi]:
+            yield from self.day_index[day]
+
+
+class NewRows(list):
+    # history rows to append after the first `after` rows of the file
+    def __init__(self, after):
+        super().__init__()
+        self.after = after
+
+
+def empty_database():
+    return {"accounts": {}, "history": [], "appointments": [], "meta": {}}
+
+
+def _with_defaults(data):
+    data.setdefault("accounts", {})
+    data.setdefault("history", [])
+    data.setdefault("appointments", [])
+    data.setdefault("meta", {})
+    return data
+
+
+class JournalStore:
+    def __init__(
+        self,
+        snapshot_path,
+        journal_path=None,
+        compact_every=COMPACT_EVERY,
+        lazy_history=False,
+        compact_records=False,
+    ):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path or os.path.splitext(snapshot_path)[0] + ".journal"
+        self.history_path = os.path.splitext(snapshot_path)[0] + ".history"
+        self.lazy_history = lazy_history
+        self.compact_records = compact_records
+        self.rotated_path = self.journal_path + ".1"
+        self.compact_every = compact_every
+        self.seq = 0
+        self.pending = 0  # records in the live journal since the last rotation
+        self.lock = threading.RLock()
+        self.compactor = None
+        self.lock_path = os.path.splitext(snapshot_path)[0] + ".lock"
+        self.lock_file = None
+
+    # ---------------------------
+    # Load: snapshot + replay
+    # ---------------------------
+    def load(self):
+        with self.lock:
+            self._claim()
+            data = self._read_snapshot(self.lazy_history)
+            split = isinstance(data["history"], LazyHistory)
+            db = Database(data)
+            db.history_indexed = not split
+            self.seq = db["meta"].get("journal_seq", 0)
+            appt_pos = {a.get("id"): i for i, a in enumerate(db["appointments"])}
+            self._replay(db, self.rotated_path, appt_pos)
+            self.pending = self._replay(db, self.journal_path, appt_pos)
+
+            db.synced_history = len(db["history"])
+            db.synced_appointments = len(db["appointments"])
+            db.sync_indexes()
+            migrated = migrate_money(db)
+            ensure_stats(db)
+            ensure_account_sequence(db)
+            ensure_appointment_sequence(db)
+            if migrated or (self.lazy_history and not split and db["history"]):
+                # float pounds -> integer piastres, or a whole-file snapshot
+                # to split for lazy loading: written once as a new snapshot
+                self.compact(db)
+            if self.compact_records:
+                compact_database(db)
+
+            # a compaction was interrupted (crash / restart): finish it
+            if os.path.exists(self.rotated_path) and not self._compacting():
+                self._start_compactor()
+        return db
+
+    def _claim(self):
+        if self.lock_file is None:
+            self.lock_file = lock_data_file(self.lock_path)
+
+    def close(self):
+        self.wait_for_compaction()
+        with self.lock:
+            if self.lock_file is not None:
+                self.lock_file.close()
+                self.lock_file = None
+
+    def _read_snapshot(self, lazy):
+        # a split snapshot's history is mapped (LazyHistory), or read into
+        # a list when lazy is False
+        data = empty_database()
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                data = _with_defaults(json.load(f))
+
+        history_file = data.pop("history_file", None)
+        rows = data.pop("history_rows", 0)
+        if history_file is not None:
+            folder = os.path.dirname(os.path.abspath(self.snapshot_path))
+            history = LazyHistory(os.path.join(folder, history_file), rows)
+            data["history"] = history if lazy else list(history)
+        return data
+
+    def _write_snapshot(self, path, data):
+        # -> temp file path; with lazy_history the history goes to its own
+        # file first (appended to when `data` holds only the new rows)
+        if self.lazy_history:
+            history = data["history"]
+            if isinstance(history, NewRows):
+                rows = append_history(self.history_path, history.after, history)
+            else:
+                rows = write_history(self.history_path, history)
+            data = {k: v for k, v in data.items() if k != "history"}
+            data["history_file"] = os.path.basename(self.history_path)
+            data["history_rows"] = rows
+        return write_temp_snapshot(path, data)
+
+    def _replay(self, db, path, appt_pos):
+        applied, self.seq = replay_journal(db, path, self.seq, appt_pos)
+        return applied
+
+    # ---------------------------
+    # Save: append new records only
+    # ---------------------------
+    def commit(self, db, touched_appointments=()):
+        if not isinstance(db, Database):
+            # not loaded through this store, nothing to diff against
+            self.compact(db)
+            return
+
+        with self.lock:
+            # other sessions may keep appending while we write: only what is
+            # collected here counts as synced
+            history_end = len(db["history"])
+            appts_end = len(db["appointments"])
+            records = self._collect(db, history_end, appts_end, touched_appointments)
+            if records:
+                self._append(records)
+                db.synced_history = history_end
+                db.synced_appointments = appts_end
+                db.version += 1
+
+            if self.pending >= self.compact_every and not self._compacting():
+                if os.path.exists(self.rotated_path):
+                    # the previous compaction failed; retry it before rotating again
+                    self._start_compactor()
+                else:
+                    self._rotate()
+
+    def _collect(self, db, history_end, appts_end, touched_appointments):
+        records = []
+
+        for row, touched in db.unsynced_rows(history_end):
+            self.seq += 1
+            records.append({"seq": self.seq, "history": row, "accounts": touched})
+
+        new_appts = db["appointments"][db.synced_appointments : appts_end]
+        for appt in list(touched_appointments) + new_appts:
+            self.seq += 1
+            records.append({"seq": self.seq, "appointment": appt})
+
+        return records
+
+    def _append(self, records):
+        payload = "".join(
+            json.dumps(r, ensure_ascii=False, separators=(",", ":"), default=json_default)
+            + "\n"
+            for r in records
+        ).encode("utf-8")
+        with open(self.journal_path, "ab") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        self.pending += len(records)
+
+    # ---------------------------
+    # Compaction: journal -> snapshot
+    # ---------------------------
+    def _compacting(self):
+        return self.compactor is not None and self.compactor.is_alive()
+
+    def _rotate(self):
+        # O(1) on the request thread: new appends go to a fresh journal file
+        os.replace(self.journal_path, self.rotated_path)
+        self.pending = 0
+        self._start_compactor()
+
+    def _start_compactor(self):
+        self.compactor = threading.Thread(
+            target=self._compact_rotated, name="journal-compactor", daemon=True
+        )
+        self.compactor.start()
+
+    def _compact_rotated(self):
+        # runs on the background thread; only reads files, never the live db.
+        # It works under the store's writer lock, so no other store compacts
+        # the same files; a journal.1 that is gone was folded in already.
+        with self.lock:
+            try:
+                self._claim()
+            except StoreLocked:
+                return
+            if not os.path.exists(self.rotated_path):
+                return
+
+        data = self._read_snapshot(lazy=True)
+        history = data["history"]
+        if isinstance(history, LazyHistory):
+            if self.lazy_history and "stats" in data["meta"]:
+                # only the journal's rows are added to the history file
+                data["history"] = NewRows(len(history))
+            else:
+                data["history"] = list(history)
+
+        base_seq = data["meta"].get("journal_seq", 0)
+        appt_pos = {a.get("id"): i for i, a in enumerate(data["appointments"])}
+        _, last_seq = replay_journal(data, self.rotated_path, base_seq, appt_pos)
+        ensure_stats(data)
+        ensure_account_sequence(data)
+        ensure_appointment_sequence(data)
+        data["meta"]["journal_seq"] = last_seq
+
+        tmp_path = self._write_snapshot(self.snapshot_path, data)
+        with self.lock:
+            if not os.path.exists(self.rotated_path):
+                os.remove(tmp_path)
+                return
+            os.replace(tmp_path, self.snapshot_path)
+            fsync_dir(self.snapshot_path)
+            os.remove(self.rotated_path)
+
+    def wait_for_compaction(self, timeout=None):
+        if self.compactor is not None:
+            self.compactor.join(timeout)
+
+    # full rewrite, for data that was not loaded through this store
+    def compact(self, db):
+        self.wait_for_compaction()
+        with self.lock:
+            self._claim()
+            _with_defaults(db)
+            db["meta"]["journal_seq"] = self.seq
+            os.replace(self._write_snapshot(self.snapshot_path, db), self.snapshot_path)
+            fsync_dir(self.snapshot_path)
+
+            for path in (self.rotated_path, self.journal_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self.pending = 0
+            if isinstance(db, Database):
+                db.synced_history = len(db["history"])
+                db.synced_appointments = len(db["appointments"])
+
+
+# ---------------------------
+# Snapshot / journal file helpers
+# ---------------------------
+def write_temp_snapshot(path, data):
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=os.path.basename(path) + ".", suffix=".tmp",
+        dir=os.path.dirname(os.path.abspath(path)),
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4, ensure_ascii=False, default=json_default)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path
+
+
+def write_snapshot(path, data):
+    os.replace(write_temp_snapshot(path, data), path)
+    fsync_dir(path)
+
+
+def fsync_dir(path):
+    # make the rename itself durable (no-op where directories can't be opened)
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def replay_journal(db, path, after_seq, appt_pos, repair=True):
+    applied = 0
+    last_seq = after_seq
+    if not os.path.exists(path):
+        return applied, last_seq
+
+    good_end = 0
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                if not line.endswith(b"\n"):
+                    raise ValueError("incomplete record")
+                rec = json.loads(line)
+            except ValueError:
+                # torn tail from a crash mid-append: drop it
+                break
+            good_end += len(line)
+
+            if rec["seq"] <= after_seq:
+                continue
+            apply_record(db, rec, appt_pos)
+            last_seq = rec["seq"]
+            applied += 1
+
+    if repair and good_end != os.path.getsize(path):
+        with open(path, "r+b") as f:
+            f.truncate(good_end)
+    return applied, last_seq
+
+
+# ---------------------------
+# Read-only view of a store's files
+# ---------------------------
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns
+
+
+def read_database(snapshot_path, journal_path=None, lazy_history=False):
+    # the data load() would give, for tools that run next to a live bank
+    # (verify.py, the SQLite migrator): no writer lock, no money migration,
+    # no compaction or compactor, a torn journal tail is skipped but left
+    # in place. If the store rotates or compacts meanwhile, read again.
+    files = JournalStore(snapshot_path, journal_path, lazy_history=lazy_history)
+    while True:
+        before = _file_stamp(files.snapshot_path), os.path.exists(files.rotated_path)
+        data = files._read_snapshot(lazy_history)
+        db = Database(data)
+        db.history_indexed = not isinstance(data["history"], LazyHistory)
+        seq = db["meta"].get("journal_seq", 0)
+        appt_pos = {a.get("id"): i for i, a in enumerate(db["appointments"])}
+        for path in (files.rotated_path, files.journal_path):
+            _, seq = replay_journal(db, path, seq, appt_pos, repair=False)
+        if (_file_stamp(files.snapshot_path), os.path.exists(files.rotated_path)) == before:
+            break
+    db.synced_history = len(db["history"])
+    db.synced_appointments = len(db["appointments"])
+    db.sync_indexes()
+    return db
+
+
+# Streamlit re-executes final2.py on every rerun, but imported modules stay
+# loaded, so the store (and its sequence counter) lives here, one per file.
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def open_store(
+    path, journal_path=None, backend="journal", lazy_history=False, compact_records=False
+):
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            if backend == "sqlite":
+                from storage_sqlite import SQLiteStore
+
+                store = SQLiteStore(path, compact_records=compact_records)
+            else:
+                store = JournalStore(
+                    path, journal_path, lazy_history=lazy_history, compact_records=compact_records
+                )
+            _stores[path] = store
+        return store
+
+
+# ---------------------------
+# Account id sequence: meta["next_account_id"]
+# ---------------------------
+FIRST_ACCOUNT_ID = 1001
+
+
+def ensure_account_sequence(db, start_from=FIRST_ACCOUNT_ID):
+    # one scan of the account ids the first time an old database is opened
+    meta = db.setdefault("meta", {})
+    if "next_account_id" not in meta:
+        numeric_ids = [int(k) for k in db["accounts"] if str(k).isdigit()]
+        meta["next_account_id"] = max(numeric_ids) + 1 if numeric_ids else start_from
+
+
+def advance_account_sequence(meta, acc_id):
+    if "next_account_id" in meta and str(acc_id).isdigit():
+        meta["next_account_id"] = max(meta["next_account_id"], int(acc_id) + 1)
+
+
+# ---------------------------
+# Appointments: slots and the id sequence meta["next_appointment_id"]
+# ---------------------------
+# a slot is taken by a Pending or Approved booking; Rejected frees it
+ACTIVE_APPOINTMENT_STATUSES = ("Pending", "Approved")
+# indexed for filtering (status has its own index, it changes)
+APPOINTMENT_FIELDS = ("branch", "date", "service")
+
+
+def appointment_slot(appt):
+    return (appt.get("branch"), str(appt.get("date"))[:10], appt.get("time"))
+
+
+def ensure_appointment_sequence(db):
+    meta = db.setdefault("meta", {})
+    if "next_appointment_id" not in meta:
+        ids = [a["id"] for a in db.get("appointments", []) if isinstance(a.get("id"), int)]
+        meta["next_appointment_id"] = max(ids) + 1 if ids else 1
+
+
+def advance_appointment_sequence(meta, appt_id):
+    if "next_appointment_id" in meta and isinstance(appt_id, int):
+        meta["next_appointment_id"] = max(meta["next_appointment_id"], appt_id + 1)
+
+
+def apply_record(db, rec, appt_pos):
+    if "history" in rec:
+        row = rec["history"]
+        db["accounts"].update(rec["accounts"])
+        db["history"].append(row)
+        apply_row(db["meta"], row)
+        if row["action"] == "Create":
+            advance_account_sequence(db["meta"], row["account"])
+
+    if "appointment" in rec:
+        appt = rec["appointment"]
+        pos = appt_pos.get(appt.get("id"))
+        if pos is None:
+            appt_pos[appt.get("id")] = len(db["appointments"])
+            db["appointments"].append(appt)
+        elif isinstance(db, Database):
+            db.put_appointment(pos, appt)
+        else:
+            db["appointments"][pos] = appt
+        advance_appointment_sequence(db["meta"], appt.get("id"))
@@ -0,0 +1,354 @@
+# ============================================================
+# SQLite storage backend
+# Same interface as storage.JournalStore (load / commit / compact), so
+# load_database / save_database and the domain functions run unchanged.
+# Each save is one small transaction: the new history rows, the accounts
+# they touched and any new / edited appointments.
+# Select it with BANK_STORAGE=sqlite (file: database.db).
+# Money columns hold integer piastres (money.py); files created before
+# that have REAL columns, which hand the ints back as floats on read.
+#
+# One-shot migration from the JSON files:
+#   python storage_sqlite.py migrate [database.json] [database.db]
+# ============================================================
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+from money import coerce_piastres, migrate_money, to_piastres
+from records import compact_database
+from stats import ensure_stats, rebuild_stats
+from storage import (
+    Database,
+    empty_database,
+    ensure_account_sequence,
+    ensure_appointment_sequence,
+    lock_data_file,
+    read_database,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+    id          TEXT PRIMARY KEY,
+    name        TEXT,
+    phone       TEXT,
+    national_id TEXT,
+    balance     INTEGER NOT NULL DEFAULT 0,
+    status      TEXT,
+    created_at  TEXT,
+    extra       TEXT
+);
+CREATE TABLE IF NOT EXISTS history (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    action      TEXT NOT NULL,
+    account     TEXT,
+    to_account  TEXT,
+    amount      INTEGER NOT NULL DEFAULT 0,
+    time        TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_history_account ON history(account);
+CREATE INDEX IF NOT EXISTS idx_history_to_account ON history(to_account);
+CREATE INDEX IF NOT EXISTS idx_history_action ON history(action);
+CREATE INDEX IF NOT EXISTS idx_history_time ON history(time);
+CREATE TABLE IF NOT EXISTS appointments (
+    id      INTEGER PRIMARY KEY,
+    name    TEXT,
+    phone   TEXT,
+    branch  TEXT,
+    service TEXT,
+    date    TEXT,
+    time    TEXT,
+    status  TEXT,
+    note    TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+ACCOUNT_COLUMNS = ("name", "phone", "national_id", "balance", "status", "created_at")
+HISTORY_COLUMNS = ("action", "account", "to_account", "amount", "time")
+APPOINTMENT_COLUMNS = ("id", "name", "phone", "branch", "service", "date", "time", "status", "note")
+
+
+# ---------------------------
+# row <-> dict
+# ---------------------------
+def account_to_row(acc_id, acc):
+    # anything outside the fixed columns (e.g. the "customer" object) goes to extra
+    extra = {k: v for k, v in acc.items() if k not in ACCOUNT_COLUMNS}
+    return (
+        acc_id,
+        acc.get("name"),
+        acc.get("phone"),
+        acc.get("national_id"),
+        acc.get("balance", 0),
+        acc.get("status"),
+        acc.get("created_at"),
+        json.dumps(extra, ensure_ascii=False) if extra else None,
+    )
+
+
+def row_to_account(row):
+    acc_id, name, phone, national_id, balance, status, created_at, extra = row
+    acc = {"name": name, "phone": phone}
+    if national_id is not None:
+        acc["national_id"] = national_id
+    acc["balance"] = balance
+    acc["status"] = status
+    acc["created_at"] = created_at
+    if extra:
+        acc.update(json.loads(extra))
+    return acc_id, acc
+
+
+def history_to_row(h):
+    return tuple(h.get(c) for c in HISTORY_COLUMNS)
+
+
+def appointment_to_row(a):
+    return tuple(a.get(c) for c in APPOINTMENT_COLUMNS)
+
+
+class SQLiteStore:
+    def __init__(self, path, compact_records=False):
+        self.path = path
+        self.compact_records = compact_records  # see records.py
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.executescript(SCHEMA)
+        self.lock_file = None
+
+    def _claim(self):
+        # one writer per database file (storage.lock_data_file)
+        if self.lock_file is None:
+            self.lock_file = lock_data_file(self.path + ".lock")
+
+    def load(self):
+        with self.lock:
+            self._claim()
+            data = empty_database()
+            for row in self.conn.execute(
+                "SELECT id, name, phone, national_id, balance, status, created_at, extra"
+                " FROM accounts ORDER BY rowid"
+            ):
+                acc_id, acc = row_to_account(row)
+                data["accounts"][acc_id] = acc
+
+            data["history"] = [
+                dict(zip(HISTORY_COLUMNS, row))
+                for row in self.conn.execute(
+                    "SELECT action, account, to_account, amount, time FROM history ORDER BY id"
+                )
+            ]
+            data["appointments"] = [
+                dict(zip(APPOINTMENT_COLUMNS, row))
+                for row in self.conn.execute(
+                    "SELECT id, name, phone, branch, service, date, time, status, note"
+                    " FROM appointments ORDER BY id"
+                )
+            ]
+            meta = data["meta"]
+            for key, value in self.conn.execute("SELECT key, value FROM meta"):
+                if key.startswith("daily:"):
+                    meta.setdefault("daily", {})[key[len("daily:") :]] = json.loads(value)
+                else:
+                    meta[key] = json.loads(value)
+            if "stats" in meta:
+                meta.setdefault("daily", {})
+
+            db = Database(data)
+            db.synced_history = len(db["history"])
+            db.synced_appointments = len(db["appointments"])
+            db.sync_indexes()
+            migrated = migrate_money(db)
+            if not migrated:
+                coerce_piastres(db)
+            ensure_stats(db)
+            ensure_account_sequence(db)
+            ensure_appointment_sequence(db)
+            if migrated:
+                self.compact(db)
+            if self.compact_records:
+                compact_database(db)
+        return db
+
+    def commit(self, db, touched_appointments=()):
+        if not isinstance(db, Database):
+            self.compact(db)
+            return
+
+        with self.lock, self.conn:
+            history_end = len(db["history"])
+            appts_end = len(db["appointments"])
+            new_rows = []
+            touched = {}
+            for row, accounts in db.unsynced_rows(history_end):
+                new_rows.append(row)
+                touched.update(accounts)
+
+            self._insert_history(new_rows)
+            self._upsert_accounts(touched.items())
+            self._upsert_appointments(
+                list(touched_appointments)
+                + db["appointments"][db.synced_appointments : appts_end]
+            )
+            # only the days that just got new rows are rewritten
+            self._upsert_meta(db.get("meta", {}), days={h["time"][:10] for h in new_rows})
+
+            db.synced_history = history_end
+            db.synced_appointments = appts_end
+            db.version += 1
+
+    # full rewrite, for data that was not loaded through this store
+    def compact(self, db):
+        with self.lock, self.conn:
+            self._claim()
+            for table in ("accounts", "history", "appointments", "meta"):
+                self.conn.execute(f"DELETE FROM {table}")
+            self._upsert_accounts(db.get("accounts", {}).items())
+            self._insert_history(db.get("history", []))
+            self._upsert_appointments(db.get("appointments", []))
+            self._upsert_meta(db.get("meta", {}))
+
+            if isinstance(db, Database):
+                db.synced_history = len(db["history"])
+                db.synced_appointments = len(db["appointments"])
+
+    def wait_for_compaction(self, timeout=None):
+        pass
+
+    def close(self):
+        self.conn.close()
+        if self.lock_file is not None:
+            self.lock_file.close()
+            self.lock_file = None
+
+    # ---------------------------
+    # statements
+    # ---------------------------
+    def _insert_history(self, rows):
+        self.conn.executemany(
+            "INSERT INTO history (action, account, to_account, amount, time)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (history_to_row(h) for h in rows),
+        )
+
+    def _upsert_accounts(self, items):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO accounts"
+            " (id, name, phone, national_id, balance, status, created_at, extra)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (account_to_row(acc_id, acc) for acc_id, acc in items),
+        )
+
+    def _upsert_appointments(self, appts):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO appointments"
+            " (id, name, phone, branch, service, date, time, status, note)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (appointment_to_row(a) for a in appts),
+        )
+
+    def _upsert_meta(self, meta, days=None):
+        # the per-day totals are stored one row per day ("daily:YYYY-MM-DD")
+        daily = meta.get("daily", {})
+        rows = [
+            (k, json.dumps(v, ensure_ascii=False))
+            for k, v in meta.items()
+            if k not in ("journal_seq", "daily")
+        ]
+        rows += [
+            (f"daily:{day}", json.dumps(daily[day]))
+            for day in (daily if days is None else days)
+            if day in daily
+        ]
+        self.conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", rows)
+
+
+# ============================================================
+# Migration: database.json (+ journal) and the legacy files
+# accounts.json / customers.json / transactions.json -> SQLite
+# ============================================================
+LEGACY_ACTIONS = {"Account Opened": "Create"}
+
+
+def read_json(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def merge_legacy(data, folder):
+    legacy_accounts = read_json(os.path.join(folder, "accounts.json"))
+    legacy_customers = read_json(os.path.join(folder, "customers.json"))
+    legacy_transactions = read_json(os.path.join(folder, "transactions.json"))
+
+    for acc_id, old in legacy_accounts.items():
+        if acc_id in data["accounts"]:
+            # database.json is newer than the legacy files, it wins
+            continue
+
+        customer = legacy_customers.get(acc_id, {})
+        acc = {
+            "name": old.get("name", customer.get("name", "")),
+            "phone": customer.get("phone", ""),
+            "national_id": "",
+            "balance": to_piastres(old.get("balance", 0)),
+            "status": old.get("status", "Active"),
+            "created_at": str(old.get("created_date", ""))[:19],
+        }
+        if customer:
+            acc["customer"] = customer
+        data["accounts"][acc_id] = acc
+
+        for t in legacy_transactions.get(acc_id, []):
+            data["history"].append(
+                {
+                    "action": LEGACY_ACTIONS.get(t.get("action"), t.get("action")),
+                    "account": acc_id,
+                    "to_account": None,
+                    "amount": to_piastres(t.get("amount", 0)),
+                    "time": str(t.get("date", ""))[:19],
+                }
+            )
+
+    # keep history in time order (stable, so same-second rows keep their order)
+    data["history"].sort(key=lambda h: h["time"])
+    return data
+
+
+def migrate(json_path="database.json", sqlite_path="database.db"):
+    # read-only on the JSON side: database.json and its journals stay as
+    # they are, a fallback if the SQLite file is not wanted after all
+    data = read_database(json_path)
+    migrate_money(data)
+    ensure_account_sequence(data)
+    ensure_appointment_sequence(data)
+    data = merge_legacy(data, os.path.dirname(os.path.abspath(json_path)))
+    # the aggregates, with the legacy accounts / rows in
+    rebuild_stats(data)
+
+    store = SQLiteStore(sqlite_path)
+    store.compact(data)
+    store.close()
+    return data
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "migrate":
+        print("usage: python storage_sqlite.py migrate [database.json] [database.db]")
+        sys.exit(1)
+
+    migrated = migrate(*sys.argv[2:4])
+    print(
+        f"Migrated {len(migrated['accounts'])} accounts, "
+        f"{len(migrated['history'])} history rows, "
+        f"{len(migrated['appointments'])} appointments."
+    )
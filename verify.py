@@ -0,0 +1,212 @@
+# ============================================================
+# Balance verifier: rebuild every balance from the history
+# The history is the event stream; each balance must equal its replay:
+#   Create / Deposit   +amount on account
+#   Withdraw           -amount on account
+#   Transfer           -amount on account, +amount on to_account
+# (Update Status / Customer Update carry no money). verify_balances()
+# replays it, compares with db["accounts"] and reports:
+#   mismatches         stored balance != replayed balance
+#   unknown_accounts   ids the history moves money for, with no account
+#   missing_create     accounts with no Create row
+# Big histories are cut into position ranges replayed by a process pool
+# (fork: the workers read the parent's history in place, nothing is
+# pickled but the per-account sums coming back), then merged per account.
+# With a checkpoint file only the rows after the last run are replayed.
+# The CLI only reads the data files (storage.read_database), so it can be
+# pointed at a running bank.
+# Run: python verify.py [--workers N] [--checkpoint FILE] [database.json]
+# ============================================================
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from bank_core import account_locks
+from lazy_history import iter_rows
+from storage import Database, write_snapshot
+
+PARALLEL_MIN_ROWS = 1_000_000
+CHUNKS_PER_WORKER = 4
+
+
+def replay(rows):
+    # -> ({acc_id: net amount}, {acc_id: number of Create rows})
+    deltas, created = {}, {}
+    get = deltas.get
+    for h in rows:
+        action = h["action"]
+        if action == "Transfer":
+            amount = h["amount"]
+            src, dst = h["account"], h["to_account"]
+            deltas[src] = get(src, 0) - amount
+            deltas[dst] = get(dst, 0) + amount
+        elif action == "Deposit":
+            acc = h["account"]
+            deltas[acc] = get(acc, 0) + h["amount"]
+        elif action == "Withdraw":
+            acc = h["account"]
+            deltas[acc] = get(acc, 0) - h["amount"]
+        elif action == "Create":
+            acc = h["account"]
+            deltas[acc] = get(acc, 0) + h["amount"]
+            created[acc] = created.get(acc, 0) + 1
+    return deltas, created
+
+
+# set in the parent right before the pool forks; the workers inherit it
+_history = None
+
+
+def _replay_range(bounds):
+    return replay(iter_rows(_history, *bounds))
+
+
+def _merge(into, part):
+    for acc, amount in part.items():
+        into[acc] = into.get(acc, 0) + amount
+
+
+def default_workers(rows):
+    if rows < PARALLEL_MIN_ROWS or "fork" not in multiprocessing.get_all_start_methods():
+        return 1
+    return os.cpu_count() or 1
+
+
+def replay_history(history, start=0, end=None, workers=None):
+    global _history
+    end = len(history) if end is None else end
+    if workers is None:
+        workers = default_workers(end - start)
+    if workers <= 1:
+        return replay(iter_rows(history, start, end))
+
+    step = max(1, -(-(end - start) // (workers * CHUNKS_PER_WORKER)))
+    bounds = [(i, min(i + step, end)) for i in range(start, end, step)]
+    _history = history
+    try:
+        with multiprocessing.get_context("fork").Pool(workers) as pool:
+            deltas, created = {}, {}
+            for part_deltas, part_created in pool.imap_unordered(_replay_range, bounds):
+                _merge(deltas, part_deltas)
+                _merge(created, part_created)
+    finally:
+        _history = None
+    return deltas, created
+
+
+# ---------------------------
+# Checkpoints: the replayed balances up to a history position
+# ---------------------------
+def load_checkpoint(path, history):
+    # -> (position, balances, created), or a fresh start when the file is
+    # missing or the history no longer starts the same way
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cp = json.load(f)
+    except (OSError, ValueError):
+        return 0, {}, {}
+    pos = cp.get("position", 0)
+    if not 0 < pos <= len(history) or history[pos - 1] != cp.get("last_row"):
+        return 0, {}, {}
+    return pos, cp["balances"], cp["created"]
+
+
+def save_checkpoint(path, history, pos, balances, created):
+    write_snapshot(
+        path,
+        {
+            "position": pos,
+            "last_row": history[pos - 1] if pos else None,
+            "balances": balances,
+            "created": created,
+        },
+    )
+
+
+# ---------------------------
+# Verification
+# ---------------------------
+def recheck(db, acc_id, replayed, end):
+    # a live bank keeps moving while we replay: under the account's lock,
+    # add what happened to it after `end` and compare again
+    with account_locks.hold(acc_id):
+        history = db["history"]
+        if isinstance(db, Database):
+            positions = [p for p in db.account_positions(acc_id) if p >= end]
+        else:
+            positions = [
+                p
+                for p in range(end, len(history))
+                if acc_id in (history[p].get("account"), history[p].get("to_account"))
+            ]
+        later, _ = replay(history[p] for p in positions)
+        acc = db["accounts"].get(acc_id)
+        return replayed + later.get(acc_id, 0), None if acc is None else acc.get("balance", 0)
+
+
+def verify_balances(db, workers=None, checkpoint=None):
+    t0 = time.perf_counter()
+    history = db["history"]
+    end = len(history)
+
+    start, balances, created = (0, {}, {})
+    if checkpoint:
+        start, balances, created = load_checkpoint(checkpoint, history)
+    deltas, new_created = replay_history(history, start, end, workers)
+    _merge(balances, deltas)
+    _merge(created, new_created)
+    if checkpoint:
+        save_checkpoint(checkpoint, history, end, balances, created)
+
+    accounts = db["accounts"]
+    mismatches = []
+    for acc_id, acc in list(accounts.items()):
+        if acc.get("balance", 0) != balances.get(acc_id, 0):
+            expected, stored = recheck(db, acc_id, balances.get(acc_id, 0), end)
+            if stored is not None and stored != expected:
+                mismatches.append(
+                    {"account": acc_id, "stored": stored, "replayed": expected, "diff": stored - expected}
+                )
+
+    return {
+        "rows": end,
+        "replayed": end - start,
+        "from_checkpoint": start > 0,
+        "accounts": len(accounts),
+        "mismatches": mismatches,
+        "unknown_accounts": sorted(str(a) for a in balances if a is not None and a not in accounts),
+        "missing_create": sorted(a for a in accounts if not created.get(a)),
+        "seconds": time.perf_counter() - t0,
+    }
+
+
+if __name__ == "__main__":
+    from money import is_migrated
+    from storage import read_database
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("database", nargs="?", default="database.json")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--checkpoint", default=None)
+    args = parser.parse_args()
+
+    # read-only: the bank may be running on these files
+    db = read_database(args.database)
+    if not is_migrated(db):
+        sys.exit(f"{args.database} still holds float pounds: open it once with the app to migrate it")
+    report = verify_balances(db, workers=args.workers, checkpoint=args.checkpoint)
+    print(
+        f"{report['rows']} history rows ({report['replayed']} replayed"
+        f"{', from checkpoint' if report['from_checkpoint'] else ''}), "
+        f"{report['accounts']} accounts in {report['seconds']:.2f}s"
+    )
+    for m in report["mismatches"]:
+        print(f"  MISMATCH {m['account']}: stored {m['stored']} replayed {m['replayed']}")
+    if report["unknown_accounts"]:
+        print(f"  history names unknown accounts: {', '.join(report['unknown_accounts'][:20])}")
+    if report["missing_create"]:
+        print(f"  accounts with no Create row: {', '.join(report['missing_create'][:20])}")
+    sys.exit(1 if report["mismatches"] or report["unknown_accounts"] else 0)